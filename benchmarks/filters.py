@@ -0,0 +1,106 @@
+"""Compares filters' masks over the shared track store with their per-track path.
+
+The filters are run over a synthetic library (see `benchmarks.shuffle_modes`), once
+with their masks (the first run also adds the tracks to the store), and once with
+only their predicates, after the per-track lookups that they make are cached.
+
+Run with `python -m benchmarks.filters`.
+"""
+
+import argparse
+import time
+
+from tabulate import tabulate
+
+from benchmarks.shuffle_modes import _clear_caches, synthetic_library
+from mmmusic import processors
+from mmmusic.external.response_cache import configure_response_cache, set_offline
+from mmmusic.models.operations import CombinableListOperation, combinable_filter
+from mmmusic.track_store import get_track_store
+
+
+def per_track(filter_: CombinableListOperation) -> CombinableListOperation:
+    """Returns the filter without its mask."""
+    (step,) = filter_._steps
+
+    return combinable_filter(display_name=step.display_name, cost=step.cost)(
+        step.predicate
+    )
+
+
+def timed(operation, tracks) -> tuple[float, list]:
+    start = time.perf_counter()
+    result = operation(tracks)
+
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_response_cache(None)
+    set_offline(True)
+
+    filters = [
+        processors.filter_by_audio_feature("energy", lower_bound=0.5),
+        processors.filter_by_audio_feature("tempo", upper_bound=140),
+        processors.filter_by_mode("major"),
+        processors.filter_by_release_year(2000),
+        processors.filter_by_track_attribute("popularity", lower_bound=20),
+    ]
+
+    masked = filters[0]
+    unmasked = per_track(filters[0])
+
+    for filter_ in filters[1:]:
+        masked &= filter_
+        unmasked &= per_track(filter_)
+
+    rows = []
+
+    for number_of_tracks in args.tracks:
+        _clear_caches()
+        get_track_store.cache_clear()
+
+        library = synthetic_library(number_of_tracks, seed=args.seed)
+
+        store_seconds, _ = timed(masked, library)
+        masked_seconds, expected = timed(masked, library)
+
+        timed(unmasked, library)
+        per_track_seconds, result = timed(unmasked, library)
+
+        if result != expected:
+            raise AssertionError("masked and per-track results differ")
+
+        rows.append(
+            (
+                f"{number_of_tracks:,}",
+                f"{len(expected):,}",
+                f"{per_track_seconds:.3f}",
+                f"{masked_seconds:.3f}",
+                f"{store_seconds:.2f}",
+            )
+        )
+
+    print(masked.explain())  # noqa: T201
+    print()  # noqa: T201
+    print(  # noqa: T201
+        tabulate(
+            rows,
+            headers=(
+                "tracks",
+                "kept",
+                "per track (s)",
+                "masks (s)",
+                "adding to store (s)",
+            ),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compares the cold-start time of loading the genre positions from JSON and arrays.
+
+Each load runs in a new Python process, as a short-lived worker's would, and is
+timed from just before the genre positions are first needed until the default
+genre attributes (which read every coordinate) are worked out.
+
+Run with `python -m benchmarks.genre_positions`.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+from tabulate import tabulate
+
+_COLD_START = """
+import time
+
+from mmmusic.models import genre_attributes
+
+start = time.perf_counter()
+genre_attributes._load_genre_positions = genre_attributes.{loader}
+genre_attributes.get_default_genre_attributes()
+print(time.perf_counter() - start)
+"""
+
+LOADERS = {
+    "JSON": "_load_genre_json",
+    "arrays (memory-mapped)": "_load_genre_arrays",
+}
+
+
+def cold_start_seconds(loader: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", _COLD_START.format(loader=loader)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    return float(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = []
+
+    for name, loader in LOADERS.items():
+        seconds = [cold_start_seconds(loader) for _ in range(args.repeats)]
+
+        rows.append(
+            (
+                name,
+                f"{1000 * statistics.median(seconds):.1f}",
+                f"{1000 * min(seconds):.1f}",
+            )
+        )
+
+    print(tabulate(rows, headers=("loader", "median (ms)", "min (ms)")))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
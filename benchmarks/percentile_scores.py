@@ -0,0 +1,75 @@
+"""Compares per-value and vectorized percentile ranks of random track metrics.
+
+Run with `python -m benchmarks.percentile_scores`.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy.stats import percentileofscore
+from tabulate import tabulate
+
+from mmmusic.features import TRACK_FEATURES, get_percentile_ranks
+
+# Audio features, release year, and genre coordinates
+NUMBER_OF_METRICS = len(TRACK_FEATURES) + 3
+
+
+def percentile_ranks_per_value(values: np.ndarray) -> np.ndarray:
+    """The previous implementation, which compares every pair of values."""
+    ranks = values.copy()
+
+    for j, col in enumerate(values.T):
+        ranks[:, j] = [percentileofscore(col, x, kind="mean") for x in col]
+
+    return ranks
+
+
+def _time(func, *args) -> tuple[float, np.ndarray]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument(
+        "--max-per-value-size",
+        type=int,
+        default=10_000,
+        help="largest size at which to time the (quadratic) per-value ranks",
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    rows = []
+
+    for size in args.sizes:
+        values = rng.random((size, NUMBER_OF_METRICS)).round(3)  # with some ties
+
+        vectorized_seconds, ranks = _time(get_percentile_ranks, values)
+
+        if size <= args.max_per_value_size:
+            per_value_seconds, expected = _time(percentile_ranks_per_value, values)
+            np.testing.assert_array_equal(ranks, expected)
+            per_value = f"{per_value_seconds:.3f}"
+            speedup = f"{per_value_seconds / vectorized_seconds:.0f}x"
+        else:
+            per_value = speedup = "skipped"
+
+        rows.append((f"{size:,}", per_value, f"{vectorized_seconds:.4f}", speedup))
+
+    print(  # noqa: T201
+        tabulate(
+            rows,
+            headers=("tracks", "per-value (s)", "vectorized (s)", "speedup"),
+            disable_numparse=True,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
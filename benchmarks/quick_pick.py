@@ -0,0 +1,166 @@
+"""Compares the iterative quick_pick with the recursive implementation it replaced.
+
+Both are run with the smart shuffle's pickers over the same synthetic library and
+with the same seed, and must produce the same order.
+
+Run with `python -m benchmarks.quick_pick`.
+"""
+
+import argparse
+import time
+from unittest.mock import patch
+
+import numpy as np
+from tabulate import tabulate
+
+from mmmusic import shuffling
+from mmmusic.models.tracks import Track
+
+
+def recursive_quick_pick(items, add_to_left, seed_picker=None, left_neighbor=None):
+    """The recursive quick_pick, as it was before it was made iterative."""
+    items = list(items)
+
+    if len(items) < 2:
+        return items
+    shuffling._shuffle(items)
+
+    if seed_picker is None:
+        left_seed, right_seed = items[:2]
+    else:
+        left_seed, right_seed = seed_picker(items, left_neighbor=left_neighbor)
+    left = [left_seed]
+    right = [right_seed]
+
+    items.remove(left_seed)
+    items.remove(right_seed)
+
+    for item in items:
+        if add_to_left(left, right, item, items):
+            left.append(item)
+        else:
+            right.append(item)
+    if left_neighbor is not None and not add_to_left(left, right, left_neighbor, items):
+        left, right = right, left
+    new_left = recursive_quick_pick(left, add_to_left, seed_picker=seed_picker)
+    new_right = recursive_quick_pick(
+        right, add_to_left, seed_picker=seed_picker, left_neighbor=new_left[-1]
+    )
+
+    return new_left + new_right
+
+
+def _fake_library(number_of_tracks: int, *, seed: int) -> dict[Track, np.ndarray]:
+    rng = np.random.default_rng(seed)
+
+    tracks = [
+        Track(
+            name=f"Track {i}",
+            id=f"track_{i}",
+            album_id=f"album_{i // 10}",
+            artist_ids=(f"artist_{rng.integers(number_of_tracks // 20 + 1)}",),
+            popularity=50,
+        )
+        for i in range(number_of_tracks)
+    ]
+
+    return {track: rng.random(12) * 100 for track in tracks}
+
+
+def time_quick_pick(quick_pick, scores: dict[Track, np.ndarray], *, seed: int):
+    tracks = list(scores)
+
+    with (
+        patch.object(shuffling, "get_scores_for_tracks", return_value=scores),
+        patch.object(shuffling, "_shuffle", np.random.default_rng(seed).shuffle),
+    ):
+        start = time.perf_counter()
+        positions = quick_pick(
+            range(len(tracks)),
+            shuffling._radio_picker(tracks),
+            seed_picker=shuffling._smart_seed_picker(tracks),
+        )
+        elapsed = time.perf_counter() - start
+
+    return elapsed, positions
+
+
+def _add_to_smaller_side(left, right, item, items) -> bool:
+    return len(left) <= len(right)
+
+
+def _add_to_right(left, right, item, items) -> bool:
+    return False
+
+
+def time_engine(quick_pick, number_of_items: int, add_to_left, *, seed: int) -> str:
+    """Times quick_pick with a picker that costs next to nothing."""
+    with patch.object(shuffling, "_shuffle", np.random.default_rng(seed).shuffle):
+        start = time.perf_counter()
+        try:
+            quick_pick(range(number_of_items), add_to_left)
+        except RecursionError:
+            return "RecursionError"
+        elapsed = time.perf_counter() - start
+
+    return f"{elapsed:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, nargs="+", default=[1_000, 5_000, 11_000])
+    parser.add_argument("--items", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--one-sided-items", type=int, nargs="+", default=[5_000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = []
+
+    for number_of_tracks in args.tracks:
+        scores = _fake_library(number_of_tracks, seed=args.seed)
+
+        recursive_seconds, expected = time_quick_pick(
+            recursive_quick_pick, scores, seed=args.seed
+        )
+        iterative_seconds, positions = time_quick_pick(
+            shuffling.quick_pick, scores, seed=args.seed
+        )
+
+        if positions != expected:
+            raise AssertionError("quick_pick orders differ")
+
+        rows.append(
+            (
+                f"smart shuffle, {number_of_tracks:,} tracks",
+                f"{recursive_seconds:.2f}",
+                f"{iterative_seconds:.2f}",
+            )
+        )
+
+    # NOTE: One-sided splits take quadratic time, but are deeper than Python's
+    # recursion limit even for modest numbers of items.
+    engine_cases = [
+        *(("balanced splits", _add_to_smaller_side, n) for n in args.items),
+        *(("one-sided splits", _add_to_right, n) for n in args.one_sided_items),
+    ]
+
+    for description, add_to_left, number_of_items in engine_cases:
+        rows.append(
+            (
+                f"{description}, {number_of_items:,} items",
+                *(
+                    time_engine(
+                        quick_pick, number_of_items, add_to_left, seed=args.seed
+                    )
+                    for quick_pick in (recursive_quick_pick, shuffling.quick_pick)
+                ),
+            )
+        )
+
+    print(  # noqa: T201
+        tabulate(rows, headers=("", "recursive (s)", "iterative (s)"))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Measures the speed, memory use and quality of the shuffle modes, offline.
+
+Synthetic libraries are generated with realistic audio features, release years and
+genres, and with a few artists accounting for many of the tracks (as in real
+libraries). Everything that the shuffles need is primed into the Spotify loaders,
+and the client is offline, so no requests are made.
+
+Each mode is run twice with the same seed: once to time it and once to trace its
+peak memory use, which also shows whether its order is reproducible. (A smooth
+shuffle's order depends on how far its time budget gets, so it is only reproducible
+when the budget runs out first, or with no budget at all.)
+
+Run with `python -m benchmarks.shuffle_modes`.
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+from tabulate import tabulate
+
+from mmmusic import shuffling
+from mmmusic.external import spotify
+from mmmusic.external.response_cache import configure_response_cache, set_offline
+from mmmusic.features import get_scores_for_tracks
+from mmmusic.genres import get_artist_genres
+from mmmusic.log_utils import get_logger
+from mmmusic.models import albums, artists, tracks
+from mmmusic.models.genre_attributes import get_genre_attributes
+from mmmusic.models.tracks import Track
+
+TRACKS_PER_ARTIST = 15
+TRACKS_PER_ALBUM = 12
+
+# Audio features that range from 0 to 1, with the (beta distribution) parameters of
+# their artists' typical values.
+_UNIT_FEATURES = {
+    "acousticness": (0.7, 2.0),
+    "danceability": (5.0, 3.0),
+    "energy": (4.0, 3.0),
+    "instrumentalness": (0.3, 1.5),
+    "liveness": (1.5, 8.0),
+    "speechiness": (1.0, 12.0),
+    "valence": (2.0, 2.0),
+}
+
+
+def _clear_caches():
+    for loader in (
+        spotify._album_loader,
+        spotify._artist_loader,
+        spotify._track_audio_features_loader,
+    ):
+        loader.clear()
+
+    for cached_func in (
+        albums.get_album,
+        artists.get_artist,
+        tracks.get_track_audio_features,
+    ):
+        cached_func.cache_clear()
+
+    get_artist_genres.cache_clear()
+
+
+def synthetic_library(number_of_tracks: int, *, seed: int) -> list[Track]:
+    """Generates a library and primes the Spotify loaders with its responses."""
+    rng = np.random.default_rng(seed)
+
+    number_of_artists = max(1, number_of_tracks // TRACKS_PER_ARTIST)
+
+    # NOTE: Artists' shares of the tracks follow Zipf's law.
+    shares = 1 / np.arange(1, number_of_artists + 1) ** 1.1
+    artist_of_track = np.sort(
+        rng.choice(number_of_artists, size=number_of_tracks, p=shares / shares.sum())
+    )
+
+    # Each artist has a few genres that lie close together on the genre map.
+    genre_attributes = get_genre_attributes()
+    genres = sorted(genre_attributes)
+    genre_positions = np.array([genre_attributes[genre] for genre in genres])
+
+    artist_jsons = {}
+
+    for artist in range(number_of_artists):
+        anchor = genre_positions[rng.integers(len(genres))]
+        nearest_genres = np.argsort(np.linalg.norm(genre_positions - anchor, axis=1))[
+            : rng.integers(1, 5)
+        ]
+
+        artist_jsons[f"artist-{artist}"] = {
+            "name": f"Artist {artist}",
+            "id": f"artist-{artist}",
+            "genres": [genres[genre] for genre in nearest_genres],
+            "popularity": int(rng.integers(0, 100)),
+        }
+
+    # Tracks vary around their artist's typical features.
+    artist_features = {
+        feature: rng.beta(a, b, size=number_of_artists)
+        for feature, (a, b) in _UNIT_FEATURES.items()
+    }
+    track_features = {
+        feature: np.clip(
+            values[artist_of_track] + rng.normal(0, 0.1, size=number_of_tracks), 0, 1
+        )
+        for feature, values in artist_features.items()
+    }
+    track_features["loudness"] = np.clip(
+        rng.normal(-8, 3, size=number_of_artists)[artist_of_track]
+        + rng.normal(0, 1.5, size=number_of_tracks),
+        -40,
+        0,
+    )
+    track_features["tempo"] = np.clip(
+        rng.normal(120, 20, size=number_of_artists)[artist_of_track]
+        + rng.normal(0, 15, size=number_of_tracks),
+        50,
+        220,
+    )
+
+    first_release_years = rng.integers(1960, 2020, size=number_of_artists)
+
+    library = []
+    album_jsons = {}
+    audio_features_jsons = {}
+
+    for i, artist in enumerate(artist_of_track.tolist()):
+        track_number = len(library) - int(np.searchsorted(artist_of_track, artist))
+        album_number = track_number // TRACKS_PER_ALBUM
+
+        track_id = f"track-{i}"
+        album_id = f"album-{artist}-{album_number}"
+
+        artist_ids = (f"artist-{artist}",)
+
+        # NOTE: Some tracks feature a second artist.
+        if rng.random() < 0.1:
+            artist_ids += (f"artist-{rng.integers(number_of_artists)}",)
+
+        release_year = min(2025, first_release_years[artist] + 2 * album_number)
+
+        album_jsons[album_id] = {
+            "name": album_id,
+            "id": album_id,
+            "album_type": "album",
+            "release_date": str(release_year),
+            "artists": [{"id": f"artist-{artist}"}],
+        }
+
+        audio_features_jsons[track_id] = {
+            "id": track_id,
+            **{feature: float(values[i]) for feature, values in track_features.items()},
+            "duration_ms": int(max(60_000, rng.normal(220_000, 50_000))),
+            "key": int(rng.integers(12)),
+            "mode": int(rng.random() < 0.65),
+            "time_signature": int(rng.choice([3, 4, 5], p=[0.08, 0.9, 0.02])),
+        }
+
+        library.append(
+            Track(
+                name=f"Track {i}",
+                id=track_id,
+                album_id=album_id,
+                artist_ids=artist_ids,
+                popularity=int(rng.integers(0, 100)),
+            )
+        )
+
+    spotify._artist_loader.put_many(artist_jsons)
+    spotify._album_loader.put_many(album_jsons)
+    spotify._track_audio_features_loader.put_many(audio_features_jsons)
+
+    return library
+
+
+def measure(shuffle, library: list[Track], *, seed: int) -> dict:
+    start = time.perf_counter()
+    shuffled = shuffle(library, rng=seed)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        reshuffled = shuffle(library, rng=seed)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": f"{elapsed:.2f}",
+        "peak MiB": f"{peak / 2**20:.1f}",
+        "neighbor similarity": f"{shuffling.transition_smoothness(shuffled):.3f}",
+        "same-artist adjacency": f"{shuffling.same_artist_adjacency(shuffled):.2%}",
+        "reproducible": shuffled == reshuffled,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--tracks", type=int, nargs="+", default=[1_000, 10_000, 50_000]
+    )
+    parser.add_argument("--time-budget", type=float, nargs="+", default=[0.0, 1.0])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_response_cache(None)
+    set_offline(True)
+    get_logger().setLevel(logging.WARNING)
+
+    modes = {
+        "smart shuffle": shuffling.smart_shuffle,
+        **{
+            f"smooth shuffle ({time_budget:g} s budget)": shuffling.smooth_shuffle(
+                time_budget=time_budget
+            )
+            for time_budget in args.time_budget
+        },
+    }
+
+    rows = []
+
+    for number_of_tracks in args.tracks:
+        _clear_caches()
+
+        library = synthetic_library(number_of_tracks, seed=args.seed)
+
+        # Hydrate the tracks first, so that no mode is charged for it.
+        get_scores_for_tracks(library)
+
+        for mode, shuffle in modes.items():
+            rows.append(
+                {
+                    "tracks": number_of_tracks,
+                    "mode": mode,
+                    **measure(shuffle, library, seed=args.seed),
+                }
+            )
+
+    print(tabulate(rows, headers="keys"))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
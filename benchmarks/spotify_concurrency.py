@@ -0,0 +1,137 @@
+"""Compares serial and concurrent hydration of a library against a fake Spotify API.
+
+Run with `python -m benchmarks.spotify_concurrency`.
+"""
+
+import argparse
+import logging
+import time
+from unittest.mock import patch
+
+from tabulate import tabulate
+
+from mmmusic.external import spotify
+from mmmusic.external.concurrency import set_concurrency
+from mmmusic.external.response_cache import configure_response_cache
+from mmmusic.log_utils import get_logger
+from mmmusic.models import albums, tracks
+
+
+class FakeSpotifyClient:
+    """Responds like the Spotify API after a fixed delay per request."""
+
+    def __init__(self, *, latency: float, tracks_per_album: int):
+        self.latency = latency
+        self.tracks_per_album = tracks_per_album
+        self.requests = 0
+
+    def _respond(self, response):
+        self.requests += 1
+        time.sleep(self.latency)
+        return response
+
+    def albums(self, album_ids):
+        return self._respond(
+            {
+                "albums": [
+                    _fake_album(id_, tracks_per_album=self.tracks_per_album)
+                    for id_ in album_ids
+                ]
+            }
+        )
+
+    def tracks(self, track_ids):
+        return self._respond({"tracks": [_fake_track(id_) for id_ in track_ids]})
+
+    def next(self, response):
+        return None
+
+
+def _fake_album(album_id: str, *, tracks_per_album: int) -> dict:
+    return {
+        "name": album_id,
+        "id": album_id,
+        "album_type": "album",
+        "release_date": "2000",
+        "artists": [{"id": f"{album_id}-artist"}],
+        "tracks": {
+            "items": [{"id": f"{album_id}-track-{i}"} for i in range(tracks_per_album)],
+            "next": None,
+        },
+    }
+
+
+def _fake_track(track_id: str) -> dict:
+    album_id = track_id.partition("-track-")[0]
+
+    return {
+        "name": track_id,
+        "id": track_id,
+        "album": {"id": album_id},
+        "artists": [{"id": f"{album_id}-artist"}],
+        "popularity": 50,
+    }
+
+
+def _clear_caches():
+    for loader in (spotify._album_loader, spotify._track_loader):
+        loader.clear()
+
+    for cached_func in (
+        spotify.get_album_tracks,
+        albums.get_album,
+        albums.get_album_tracks,
+        tracks.get_track,
+    ):
+        cached_func.cache_clear()
+
+
+def time_hydration(
+    *, number_of_albums: int, concurrency: int, latency: float, tracks_per_album: int
+) -> tuple[float, int]:
+    _clear_caches()
+    set_concurrency(concurrency)
+
+    client = FakeSpotifyClient(latency=latency, tracks_per_album=tracks_per_album)
+
+    album_ids = [f"album-{i}" for i in range(number_of_albums)]
+
+    with patch.object(
+        spotify, "get_client_credentials_managed_client", return_value=client
+    ):
+        start = time.perf_counter()
+        albums.get_tracks_from_albums(album_ids)
+        elapsed = time.perf_counter() - start
+
+    return elapsed, client.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--albums", type=int, default=200)
+    parser.add_argument("--tracks-per-album", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    configure_response_cache(None)
+    get_logger().setLevel(logging.INFO)
+
+    rows = []
+
+    for concurrency in args.concurrency:
+        elapsed, requests = time_hydration(
+            number_of_albums=args.albums,
+            concurrency=concurrency,
+            latency=args.latency,
+            tracks_per_album=args.tracks_per_album,
+        )
+        rows.append((concurrency, requests, f"{elapsed:.2f}"))
+
+    print(  # noqa: T201
+        tabulate(rows, headers=("concurrency", "requests", "seconds"))
+    )
+
+
+if __name__ == "__main__":
+    main()
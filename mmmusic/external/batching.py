@@ -0,0 +1,153 @@
+from collections.abc import Callable, Hashable, Iterable
+import threading
+from typing import Generic, Protocol, TypeVar
+
+from mmmusic.external.concurrency import map_concurrently
+from mmmusic.utils import take_x_at_a_time
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchFetcher = Callable[[list[K]], list[V]]
+
+
+class PersistentCache(Protocol[K, V]):
+    def get_many(self, keys: Iterable[K]) -> dict[K, V]: ...
+
+    def set_many(self, values: dict[K, V]) -> None: ...
+
+
+class BatchLoader(Generic[K, V]):
+    """Resolves keys in batches, remembering everything it has loaded.
+
+    Keys are queued with `prime` and resolved together the next time a value is
+    requested, so that many lookups share a single call to `fetch_many`. Pending keys
+    are looked up in `persistent_cache` (if given) before any are fetched.
+
+    Loaders are thread safe: a key that is already being fetched by one thread is
+    waited on, rather than fetched again, by the others.
+    """
+
+    def __init__(
+        self,
+        fetch_many: BatchFetcher[K, V],
+        *,
+        batch_size: int,
+        persistent_cache: PersistentCache[K, V] | None = None,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+
+        self._fetch_many = fetch_many
+        self.batch_size = batch_size
+        self._persistent_cache = persistent_cache
+
+        self._loaded: dict[K, V] = {}
+        self._pending: dict[K, None] = {}  # insertion-ordered set
+        self._in_flight: set[K] = set()
+
+        # NOTE: Guards the state above. Batches are fetched without holding it.
+        self._lock = threading.Condition()
+
+    def prime(self, keys: Iterable[K]) -> None:
+        """Queues keys to be fetched with the next batch."""
+        with self._lock:
+            for key in keys:
+                if key not in self._loaded and key not in self._in_flight:
+                    self._pending[key] = None
+
+    def put(self, key: K, value: V) -> None:
+        """Stores a value that was obtained elsewhere."""
+        self.put_many({key: value})
+
+    def put_many(self, values: dict[K, V]) -> None:
+        """Stores values that were obtained elsewhere, e.g. embedded in a response."""
+        with self._lock:
+            self._loaded.update(values)
+
+            for key in values:
+                self._pending.pop(key, None)
+
+        if self._persistent_cache is not None:
+            self._persistent_cache.set_many(values)
+
+    def flush(self) -> None:
+        """Fetches every pending key, fetching separate batches concurrently."""
+        with self._lock:
+            keys = list(self._pending)
+
+            self._pending.clear()
+            self._in_flight.update(keys)
+
+        try:
+            if keys and self._persistent_cache is not None:
+                found = self._persistent_cache.get_many(keys)
+
+                with self._lock:
+                    self._loaded.update(found)
+
+                to_fetch = [key for key in keys if key not in found]
+            else:
+                to_fetch = keys
+
+            map_concurrently(
+                self._fetch_batch, take_x_at_a_time(to_fetch, self.batch_size)
+            )
+        finally:
+            with self._lock:
+                # NOTE: Every key that was taken, including those found in the
+                # persistent cache, is no longer in flight.
+                self._in_flight.difference_update(keys)
+                self._lock.notify_all()
+
+    def _fetch_batch(self, batch: list[K]) -> None:
+        values = self._fetch_many(batch)
+
+        if len(values) != len(batch):
+            raise RuntimeError(
+                f"Expected {len(batch)} values from batch fetch, got {len(values)}"
+            )
+
+        fetched = dict(zip(batch, values, strict=True))
+
+        with self._lock:
+            self._loaded.update(fetched)
+
+        if self._persistent_cache is not None:
+            self._persistent_cache.set_many(fetched)
+
+    def load(self, key: K) -> V:
+        return self.load_many([key])[0]
+
+    def load_many(self, keys: Iterable[K]) -> list[V]:
+        keys = list(keys)
+
+        while True:
+            self.prime(keys)
+            self.flush()
+
+            with self._lock:
+                # Wait for keys that are being fetched by other threads. If any of
+                # those fetches fail, the keys are queued and fetched again.
+                while (
+                    missing := [key for key in keys if key not in self._loaded]
+                ) and self._in_flight.intersection(missing):
+                    self._lock.wait()
+
+                if not missing:
+                    return [self._loaded[key] for key in keys]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._loaded.clear()
+            self._pending.clear()
+            self._in_flight.clear()
+
+            # NOTE: Threads waiting on keys that were in flight fetch them again.
+            self._lock.notify_all()
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._loaded
+
+    def __len__(self) -> int:
+        return len(self._loaded)
@@ -0,0 +1,71 @@
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+from typing import TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+CONCURRENCY_ENV_VAR = "MMMUSIC_CONCURRENCY"
+DEFAULT_CONCURRENCY = 8
+
+_concurrency = int(os.environ.get(CONCURRENCY_ENV_VAR, DEFAULT_CONCURRENCY))
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+_worker_state = threading.local()
+
+
+def get_concurrency() -> int:
+    return _concurrency
+
+
+def set_concurrency(concurrency: int) -> None:
+    """Sets the maximum number of API requests that may be made in parallel."""
+    global _concurrency, _executor
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be positive")
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+
+        _concurrency = concurrency
+        _executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_concurrency,
+                thread_name_prefix="mmmusic",
+                initializer=_mark_as_worker,
+            )
+
+        return _executor
+
+
+def _mark_as_worker() -> None:
+    _worker_state.is_worker = True
+
+
+def map_concurrently(func: Callable[[T], R], items: Iterable[T]) -> list[R]:
+    """Applies func to each item using the shared worker pool, preserving order."""
+    items = list(items)
+
+    # NOTE: Calls made from within a worker run serially, since waiting on the
+    # (bounded) pool from inside it could deadlock.
+    if (
+        _concurrency == 1
+        or len(items) < 2
+        or getattr(_worker_state, "is_worker", False)
+    ):
+        return [func(item) for item in items]
+
+    return list(_get_executor().map(func, items))
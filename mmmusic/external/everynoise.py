@@ -1,10 +1,11 @@
-import json
 import re
 
 from bs4 import BeautifulSoup
 import cssutils
 import requests
 
+from mmmusic.models.genre_attributes import save_genre_positions
+
 _GENRE_CHARS_TO_SQUASH = re.compile("[^a-zA-Z0-9]+")
 
 
@@ -52,10 +53,7 @@ def get_genre_positions() -> dict:
 
 
 def refresh_genre_positions():
-    genre_positions = get_genre_positions()
-
-    with open("mmmusic/data/genre_positions.json", "w") as f:
-        json.dump(genre_positions, f)
+    save_genre_positions(get_genre_positions())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from functools import cache
+import threading
+import time
+
+import requests
+import requests.adapters
+
+from mmmusic.log_utils import get_logger
+
+logger = get_logger()
+
+TOO_MANY_REQUESTS = 429
+
+
+@dataclass
+class RateLimiterStats:
+    requests: int = 0
+    throttled_responses: int = 0
+    # Wall-clock time for which every request was paused by a Retry-After header.
+    paused_seconds: float = 0.0
+    # Total time that requests spent waiting for the limiter, summed over threads.
+    waiting_seconds: float = 0.0
+
+
+class RateLimiter:
+    """A token bucket shared by every request to an API.
+
+    The rate is halved whenever the API responds with 429 Too Many Requests (but only
+    once for the responses that arrive while requests are already paused), and
+    every request is held back until the response's Retry-After has passed. While
+    no requests are throttled, the rate recovers by `recovery_rate` requests per
+    second, every second, up to `max_rate`.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = 10.0,
+        min_rate: float = 0.5,
+        max_rate: float = 50.0,
+        recovery_rate: float = 0.5,
+        burst: int = 10,
+        default_retry_after: float = 1.0,
+    ):
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError("Expected 0 < min_rate <= rate <= max_rate")
+
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.recovery_rate = recovery_rate
+        self.burst = burst
+        self.default_retry_after = default_retry_after
+
+        self.stats = RateLimiterStats()
+
+        self._tokens = float(burst)
+        self._last_update = time.monotonic()
+        self._paused_until = 0.0
+
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Blocks until a request may be made."""
+        started = time.monotonic()
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                else:
+                    wait = (1 - self._tokens) / self.rate
+
+                # NOTE: Waiting releases the lock, and waiters are woken whenever
+                # the schedule changes.
+                self._condition.wait(wait)
+
+            self.stats.requests += 1
+            self.stats.waiting_seconds += time.monotonic() - started
+
+    def record_throttled(self, retry_after: float | None) -> None:
+        """Slows down after the API responded with 429 Too Many Requests."""
+        if retry_after is None:
+            retry_after = self.default_retry_after
+
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+
+            paused_until = now + retry_after
+
+            self.stats.throttled_responses += 1
+            self.stats.paused_seconds += max(
+                0.0, paused_until - max(now, self._paused_until)
+            )
+
+            # NOTE: Requests made before a pause may be throttled during it, e.g.,
+            # by every worker at once. Those responses are about the same excess,
+            # so the rate is only reduced once for them.
+            already_paused = now < self._paused_until
+
+            self._paused_until = max(self._paused_until, paused_until)
+            self._tokens = 0.0
+
+            if already_paused:
+                logger.debug(
+                    "Rate limited by API while paused. Pausing requests for %.1f "
+                    "seconds",
+                    retry_after,
+                )
+            else:
+                self.rate = max(self.min_rate, self.rate / 2)
+
+                logger.warning(
+                    "Rate limited by API. Pausing requests for %.1f seconds and "
+                    "reducing rate to %.2f requests per second",
+                    retry_after,
+                    self.rate,
+                )
+
+            self._condition.notify_all()
+
+    def _refill(self, now: float) -> None:
+        # NOTE: Assumes that the lock is held.
+        elapsed = max(0.0, now - max(self._last_update, self._paused_until))
+
+        self.rate = min(self.max_rate, self.rate + self.recovery_rate * elapsed)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_update = now
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses a Retry-After header, which is either in seconds or an HTTP date."""
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedAdapter(requests.adapters.HTTPAdapter):
+    """Sends every request through a rate limiter, retrying throttled requests."""
+
+    def __init__(
+        self,
+        *args,
+        rate_limiter: RateLimiter,
+        max_throttled_attempts: int = 10,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+
+        self.rate_limiter = rate_limiter
+        self.max_throttled_attempts = max_throttled_attempts
+
+    def send(self, request, **kwargs) -> requests.Response:
+        for attempt in range(1, self.max_throttled_attempts + 1):
+            self.rate_limiter.acquire()
+
+            response = super().send(request, **kwargs)
+
+            if (
+                response.status_code != TOO_MANY_REQUESTS
+                or attempt == self.max_throttled_attempts
+            ):
+                return response
+
+            self.rate_limiter.record_throttled(
+                parse_retry_after(response.headers.get("Retry-After"))
+            )
+
+            response.close()
+
+
+@cache
+def get_spotify_rate_limiter() -> RateLimiter:
+    return RateLimiter()
@@ -0,0 +1,309 @@
+from collections.abc import Callable, Iterable
+from functools import wraps
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any, TypeVar
+import zlib
+
+from mmmusic.log_utils import get_logger
+from mmmusic.utils import take_x_at_a_time
+
+logger = get_logger()
+
+T = TypeVar("T")
+
+CACHE_DIRECTORY_ENV_VAR = "MMMUSIC_CACHE_DIR"
+OFFLINE_ENV_VAR = "MMMUSIC_OFFLINE"
+
+_DAY = 24 * 60 * 60
+
+# Seconds for which a stored response is considered fresh. Albums and audio features
+# are effectively immutable, whereas artist popularity and genres drift over time.
+DEFAULT_TIME_TO_LIVE = {
+    "album": 180 * _DAY,
+    "album_tracks": 180 * _DAY,
+    "artist": 1 * _DAY,
+    "artist_related_artists": 7 * _DAY,
+    "track": 30 * _DAY,
+    "track_audio_features": 365 * _DAY,
+}
+
+DEFAULT_MAX_SIZE_BYTES = 512 * 1024 * 1024
+
+_SQLITE_MAX_PARAMETERS = 500
+
+
+class OfflineCacheMissError(LookupError):
+    pass
+
+
+class ResponseCache:
+    """Stores API responses in a SQLite database, keyed by resource and ID.
+
+    Entries expire according to their resource's time to live, and the least recently
+    used entries are evicted once the stored payloads exceed `max_size_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        time_to_live: dict[str, float] | None = None,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.time_to_live = {**DEFAULT_TIME_TO_LIVE, **(time_to_live or {})}
+        self.max_size_bytes = max_size_bytes
+
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(
+            self.directory / "responses.sqlite3", check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                resource TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (resource, key)
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_by_access ON responses (accessed_at)"
+        )
+        self._connection.commit()
+
+        (self._size_bytes,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def get_many(
+        self, resource: str, keys: Iterable[str], *, allow_stale: bool = False
+    ) -> dict[str, Any]:
+        """Returns the stored responses for whichever keys have one."""
+        now = time.time()
+
+        oldest_allowed = (
+            float("-inf")
+            if allow_stale
+            else now - self.time_to_live.get(resource, float("inf"))
+        )
+
+        found = {}
+
+        with self._lock:
+            for chunk in take_x_at_a_time(keys, _SQLITE_MAX_PARAMETERS):
+                placeholders = ", ".join("?" * len(chunk))
+
+                rows = self._connection.execute(
+                    "SELECT key, value FROM responses "
+                    f"WHERE resource = ? AND stored_at >= ? AND key IN ({placeholders})",
+                    (resource, oldest_allowed, *chunk),
+                ).fetchall()
+
+                found.update((key, _decode(value)) for key, value in rows)
+
+            if found:
+                self._connection.executemany(
+                    "UPDATE responses SET accessed_at = ? "
+                    "WHERE resource = ? AND key = ?",
+                    ((now, resource, key) for key in found),
+                )
+                self._connection.commit()
+
+        return found
+
+    def set_many(self, resource: str, values: dict[str, Any]) -> None:
+        if not values:
+            return
+
+        now = time.time()
+
+        encoded = {key: _encode(value) for key, value in values.items()}
+
+        with self._lock:
+            for chunk in take_x_at_a_time(encoded, _SQLITE_MAX_PARAMETERS):
+                placeholders = ", ".join("?" * len(chunk))
+
+                (replaced_size,) = self._connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM responses "
+                    f"WHERE resource = ? AND key IN ({placeholders})",
+                    (resource, *chunk),
+                ).fetchone()
+
+                self._size_bytes -= replaced_size
+
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO responses "
+                "(resource, key, value, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (resource, key, value, len(value), now, now)
+                    for key, value in encoded.items()
+                ),
+            )
+
+            self._size_bytes += sum(len(value) for value in encoded.values())
+
+            self._evict()
+
+            self._connection.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+            self._size_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _evict(self) -> None:
+        if self._size_bytes <= self.max_size_bytes:
+            return
+
+        # Evict down to a little under the limit so that the next few writes do not
+        # immediately trigger another eviction.
+        target_size = 0.9 * self.max_size_bytes
+
+        rows = self._connection.execute(
+            "SELECT resource, key, size FROM responses ORDER BY accessed_at"
+        )
+
+        to_evict = []
+
+        for resource, key, size in rows:
+            if self._size_bytes <= target_size:
+                break
+
+            to_evict.append((resource, key))
+            self._size_bytes -= size
+
+        self._connection.executemany(
+            "DELETE FROM responses WHERE resource = ? AND key = ?", to_evict
+        )
+
+        logger.debug("Evicted %d cached responses", len(to_evict))
+
+
+def _encode(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+
+
+def _decode(value: bytes) -> Any:
+    return json.loads(zlib.decompress(value))
+
+
+_response_cache: ResponseCache | None = None
+_response_cache_configured = False
+
+_offline = os.environ.get(OFFLINE_ENV_VAR, "") not in {"", "0"}
+
+
+def configure_response_cache(
+    directory: str | Path | None, **kwargs
+) -> ResponseCache | None:
+    """Sets the directory of the response cache. `None` disables the cache."""
+    global _response_cache, _response_cache_configured
+
+    if _response_cache is not None:
+        _response_cache.close()
+
+    _response_cache = None if directory is None else ResponseCache(directory, **kwargs)
+    _response_cache_configured = True
+
+    return _response_cache
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Returns the configured response cache, if any.
+
+    Unless configured otherwise, the cache is stored in the directory named by the
+    MMMUSIC_CACHE_DIR environment variable, and is disabled if it is not set.
+    """
+    if not _response_cache_configured:
+        configure_response_cache(os.environ.get(CACHE_DIRECTORY_ENV_VAR) or None)
+
+    return _response_cache
+
+
+def is_offline() -> bool:
+    return _offline
+
+
+def set_offline(offline: bool) -> None:
+    """Sets whether responses may only be served from the cache."""
+    global _offline
+
+    _offline = offline
+
+
+class ResourceCache:
+    """The entries of the response cache that belong to a single resource."""
+
+    def __init__(self, resource: str):
+        self.resource = resource
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+
+        cache = get_response_cache()
+
+        found = (
+            {}
+            if cache is None
+            else cache.get_many(self.resource, keys, allow_stale=is_offline())
+        )
+
+        if is_offline() and (missing := [key for key in keys if key not in found]):
+            raise OfflineCacheMissError(
+                f"{len(missing)} {self.resource} response(s) missing from the cache, "
+                f"including {missing[0]!r}"
+            )
+
+        return found
+
+    def set_many(self, values: dict[str, Any]) -> None:
+        if (cache := get_response_cache()) is not None:
+            cache.set_many(self.resource, values)
+
+
+def persistently_cached(
+    resource: str,
+) -> Callable[[Callable[[str], T]], Callable[[str], T]]:
+    """Stores the results of a function of one ID in the response cache."""
+    resource_cache = ResourceCache(resource)
+
+    def decorator(func: Callable[[str], T]) -> Callable[[str], T]:
+        @wraps(func)
+        def wrapper(key: str) -> T:
+            if found := resource_cache.get_many([key]):
+                return found[key]
+
+            value = func(key)
+
+            resource_cache.set_many({key: value})
+
+            return value
+
+        return wrapper
+
+    return decorator
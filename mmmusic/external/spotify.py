@@ -1,18 +1,42 @@
-from functools import cache
+from collections.abc import Iterable
+from functools import cache, wraps
+import threading
 
 import requests
-import requests.adapters
 import spotipy
 from spotipy.cache_handler import CacheFileHandler
-from spotipy.oauth2 import SpotifyClientCredentials
+from spotipy.oauth2 import SpotifyAuthBase, SpotifyClientCredentials
 import urllib3
 
+from mmmusic.external.batching import BatchLoader
+from mmmusic.external.concurrency import get_concurrency
+from mmmusic.external.rate_limiting import (
+    RateLimitedAdapter,
+    RateLimiter,
+    get_spotify_rate_limiter,
+)
+from mmmusic.external.response_cache import ResourceCache, persistently_cached
 from mmmusic.log_utils import get_logger
 
 logger = get_logger()
 
 
-def create_requests_session_for_spotify() -> requests.Session:
+def create_requests_session_for_spotify(
+    *, pool_size: int | None = None, rate_limiter: RateLimiter | None = None
+) -> requests.Session:
+    """Creates a session whose connection pool fits the configured concurrency.
+
+    Every request made with the session is scheduled by `rate_limiter`, which is
+    shared by all Spotify sessions unless given.
+    """
+    if pool_size is None:
+        pool_size = get_concurrency()
+
+    if rate_limiter is None:
+        rate_limiter = get_spotify_rate_limiter()
+
+    # NOTE: 429 responses are retried by the rate limiter, which honors Retry-After
+    # for every thread at once.
     retry = urllib3.Retry(
         total=10,
         connect=5,
@@ -20,10 +44,15 @@ def create_requests_session_for_spotify() -> requests.Session:
         allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
         status=5,
         backoff_factor=0.3,
-        status_forcelist=(429, 500, 502, 503, 504),
+        status_forcelist=(500, 502, 503, 504),
     )
 
-    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
+    adapter = RateLimitedAdapter(
+        max_retries=retry,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        rate_limiter=rate_limiter,
+    )
 
     session = requests.Session()
 
@@ -33,33 +62,114 @@ def create_requests_session_for_spotify() -> requests.Session:
     return session
 
 
-@cache
-def get_client_credentials_managed_client() -> spotipy.Spotify:
-    # NOTE: This is not thread safe.
+# NOTE: Shared by every client, since clients may share a token cache file.
+_token_lock = threading.RLock()
+
+
+def create_thread_safe_client(auth_manager: SpotifyAuthBase) -> spotipy.Spotify:
+    """Creates a client that can be shared between threads.
+
+    Requests share a pooled session, and reading or refreshing the access token is
+    serialized, so that concurrent requests do not refresh it more than once.
+    """
+    get_access_token = auth_manager.get_access_token
+
+    @wraps(get_access_token)
+    def get_access_token_with_lock(*args, **kwargs):
+        with _token_lock:
+            return get_access_token(*args, **kwargs)
+
+    auth_manager.get_access_token = get_access_token_with_lock
+
     return spotipy.Spotify(
-        auth_manager=SpotifyClientCredentials(
+        auth_manager=auth_manager,
+        requests_session=create_requests_session_for_spotify(),
+    )
+
+
+_client_lock = threading.Lock()
+
+
+def get_client_credentials_managed_client() -> spotipy.Spotify:
+    with _client_lock:  # ensures that only one client is ever created
+        return _get_client_credentials_managed_client()
+
+
+@cache
+def _get_client_credentials_managed_client() -> spotipy.Spotify:
+    return create_thread_safe_client(
+        SpotifyClientCredentials(
             cache_handler=CacheFileHandler(
                 cache_path=".cache-client-credentials-token-info"
             )
-        ),
-        requests_session=create_requests_session_for_spotify(),
+        )
     )
 
 
-@cache
+def _fetch_albums(album_ids: list[str]) -> list[dict]:
+    _get_albums = get_client_credentials_managed_client().albums
+    return _get_albums(album_ids)["albums"]
+
+
+def _fetch_artists(artist_ids: list[str]) -> list[dict]:
+    _get_artists = get_client_credentials_managed_client().artists
+    return _get_artists(artist_ids)["artists"]
+
+
+def _fetch_tracks(track_ids: list[str]) -> list[dict]:
+    _get_tracks = get_client_credentials_managed_client().tracks
+    return _get_tracks(track_ids)["tracks"]
+
+
+def _fetch_tracks_audio_features(track_ids: list[str]) -> list[dict | None]:
+    _get_tracks_audio_features = get_client_credentials_managed_client().audio_features
+
+    try:
+        return _get_tracks_audio_features(track_ids)
+    except Exception:
+        logger.error(f"Failed to get audio features for tracks {track_ids!r}")
+        raise
+
+
+# NOTE: Batch sizes are the maximum number of IDs accepted by each endpoint.
+_album_loader = BatchLoader(
+    _fetch_albums, batch_size=20, persistent_cache=ResourceCache("album")
+)
+_artist_loader = BatchLoader(
+    _fetch_artists, batch_size=50, persistent_cache=ResourceCache("artist")
+)
+_track_loader = BatchLoader(
+    _fetch_tracks, batch_size=50, persistent_cache=ResourceCache("track")
+)
+_track_audio_features_loader = BatchLoader(
+    _fetch_tracks_audio_features,
+    batch_size=100,
+    persistent_cache=ResourceCache("track_audio_features"),
+)
+
+
+def cache_albums(album_jsons: Iterable[dict]) -> None:
+    """Stores full album objects that were embedded in another response."""
+    _album_loader.put_many({album_json["id"]: album_json for album_json in album_jsons})
+
+
 def get_album(album_id: str) -> dict:
-    _get_album = get_client_credentials_managed_client().album
-    return _get_album(album_id)
+    return _album_loader.load(album_id)
+
+
+def get_albums(album_ids: Iterable[str]) -> list[dict]:
+    return _album_loader.load_many(album_ids)
 
 
 @cache
+@persistently_cached("album_tracks")
 def get_album_tracks(album_id: str) -> list[dict]:
-    _get_album_tracks = get_client_credentials_managed_client().album_tracks
     _next = get_client_credentials_managed_client().next
 
     tracks = []
 
-    response = _get_album_tracks(album_id)
+    # NOTE: Album objects include the first page of the album's tracks.
+    response = get_album(album_id)["tracks"]
 
     while response is not None and (items := response["items"]):
         tracks.extend(items)
@@ -69,13 +179,16 @@ def get_album_tracks(album_id: str) -> list[dict]:
     return tracks
 
 
-@cache
 def get_artist(artist_id: str) -> dict:
-    _get_artist = get_client_credentials_managed_client().artist
-    return _get_artist(artist_id)
+    return _artist_loader.load(artist_id)
+
+
+def get_artists(artist_ids: Iterable[str]) -> list[dict]:
+    return _artist_loader.load_many(artist_ids)
 
 
 @cache
+@persistently_cached("artist_related_artists")
 def get_artist_related_artists(artist_id: str) -> list[dict]:
     _get_artist_related_artists = (
         get_client_credentials_managed_client().artist_related_artists
@@ -83,21 +196,25 @@ def get_artist_related_artists(artist_id: str) -> list[dict]:
     return _get_artist_related_artists(artist_id)["artists"]
 
 
-@cache
+def cache_tracks(track_jsons: Iterable[dict]) -> None:
+    """Stores full track objects that were embedded in another response."""
+    _track_loader.put_many({track_json["id"]: track_json for track_json in track_jsons})
+
+
 def get_track(track_id: str) -> dict:
-    _get_track = get_client_credentials_managed_client().track
-    return _get_track(track_id)
+    return _track_loader.load(track_id)
+
+
+def get_tracks(track_ids: Iterable[str]) -> list[dict]:
+    return _track_loader.load_many(track_ids)
 
 
-@cache
 def get_track_audio_features(track_id: str) -> dict | None:
-    _get_track_audio_features = get_client_credentials_managed_client().audio_features
+    return _track_audio_features_loader.load(track_id)
 
-    try:
-        return _get_track_audio_features(track_id)[0]
-    except Exception:
-        logger.error(f"Failed to get audio feature for track {track_id!r}")
-        raise
+
+def get_tracks_audio_features(track_ids: Iterable[str]) -> list[dict | None]:
+    return _track_audio_features_loader.load_many(track_ids)
 
 
 def search_for_artist(search_text: str) -> dict:
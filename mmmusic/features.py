@@ -1,7 +1,7 @@
-from typing import Callable
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
 
 import numpy as np
-from scipy.stats import percentileofscore
 
 from mmmusic.genres import get_genre_attributes_for_track
 from mmmusic.log_utils import get_logger
@@ -24,11 +24,91 @@ TRACK_FEATURES = (
 )
 
 
+# Rows of similarities computed at once by similarity_matrix, which bounds the memory
+# used for intermediate results.
+DEFAULT_BLOCK_SIZE = 1024
+
+
 def similarity(u: Metrics, v: Metrics) -> float:
     """Calculates the cosine similarity of two vectors."""
     return np.dot(u, v) / np.sqrt(np.dot(u, u) * np.dot(v, v))
 
 
+def normalize_rows(vectors: np.ndarray | Iterable[Metrics]) -> np.ndarray:
+    """Scales each row to unit length (as float32). Zero rows are left as-is."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def similarities(u: Metrics, vectors: np.ndarray | Iterable[Metrics]) -> np.ndarray:
+    """Calculates the cosine similarity of a vector to each of many vectors."""
+    return normalize_rows(vectors) @ normalize_rows(u)
+
+
+def paired_similarities(
+    us: np.ndarray | Iterable[Metrics], vs: np.ndarray | Iterable[Metrics]
+) -> np.ndarray:
+    """Calculates the cosine similarity of each pair of corresponding rows."""
+    return np.einsum("ij,ij->i", normalize_rows(us), normalize_rows(vs))
+
+
+def iter_similarity_blocks(
+    vectors: np.ndarray | Iterable[Metrics],
+    others: np.ndarray | Iterable[Metrics] | None = None,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[tuple[slice, np.ndarray]]:
+    """Yields the similarity matrix of vectors and others, a block of rows at a time.
+
+    Each block holds the similarities of `block_size` vectors to every other vector
+    (or to every vector, if others are not given).
+    """
+    rows = normalize_rows(vectors)
+    columns = rows if others is None else normalize_rows(others)
+
+    for start in range(0, len(rows), block_size):
+        block = slice(start, min(start + block_size, len(rows)))
+
+        yield block, rows[block] @ columns.T
+
+
+def similarity_matrix(
+    vectors: np.ndarray | Iterable[Metrics],
+    others: np.ndarray | Iterable[Metrics] | None = None,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    path: str | Path | None = None,
+) -> np.ndarray:
+    """Calculates the (float32) cosine similarity of each vector to each other vector.
+
+    If `path` is given, the matrix is written to a memory-mapped .npy file there, so
+    that very large matrices need not fit in memory.
+    """
+    rows = normalize_rows(vectors)
+    columns = rows if others is None else normalize_rows(others)
+
+    shape = (len(rows), len(columns))
+
+    matrix = (
+        np.empty(shape, dtype=np.float32)
+        if path is None
+        else np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+    )
+
+    for block, similarities_in_block in iter_similarity_blocks(
+        rows, columns, block_size=block_size
+    ):
+        matrix[block] = similarities_in_block
+
+    if isinstance(matrix, np.memmap):
+        matrix.flush()
+
+    return matrix
+
+
 def get_metrics_for_track(track: Track) -> Metrics:
     if track.audio_features is None:
         raise ValueError(f"Track {track!r} is missing audio features")
@@ -40,19 +120,126 @@ def get_metrics_for_track(track: Track) -> Metrics:
     ]
 
 
+def get_percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """Calculates the percentile rank of each value within its column.
+
+    The ranks match those of scipy.stats.percentileofscore(column, value, kind="mean")
+    but are calculated by sorting, rather than by comparing each pair of values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    if len(values) == 0:
+        return values.copy()
+
+    return _get_percentile_ranks_within(np.sort(values, axis=0), values)
+
+
+def _get_percentile_ranks_within(
+    sorted_population: np.ndarray, values: np.ndarray
+) -> np.ndarray:
+    """Ranks values within the columns of a population that are already sorted."""
+    n = len(sorted_population)
+
+    ranks = np.empty_like(values, dtype=np.float64)
+
+    for j in range(values.shape[1]):
+        # Numbers of values strictly less than, and less than or equal to, each value
+        left = np.searchsorted(sorted_population[:, j], values[:, j], side="left")
+        right = np.searchsorted(sorted_population[:, j], values[:, j], side="right")
+
+        ranks[:, j] = (left + right) * (50.0 / n)
+
+    # Like percentileofscore, columns with missing values have no ranks.
+    ranks[:, np.isnan(sorted_population).any(axis=0)] = np.nan
+    ranks[np.isnan(values)] = np.nan
+
+    return ranks
+
+
 def get_percentile_scores_for_attributes_of_items(
     items: Items, *, item_attributes_func: Callable[[Item], Metrics]
 ) -> dict[Item, Metrics]:
     metrics = np.array([item_attributes_func(item) for item in items])
-    scores = metrics.copy()
 
-    for j, col in enumerate(metrics.T):
-        scores[:, j] = [percentileofscore(col, x, kind="mean") for x in col]
+    return dict(zip(items, get_percentile_ranks(metrics), strict=True))
+
+
+class ReferenceDistribution:
+    """Scores tracks by their percentile ranks within a fixed population of tracks.
+
+    Unlike get_scores_for_tracks, a track's score does not depend on the other
+    tracks being scored, so each track's score is calculated once and reused.
+    """
+
+    def __init__(self, sorted_metrics: np.ndarray):
+        if sorted_metrics.ndim != 2 or not len(sorted_metrics):
+            raise ValueError("Expected a non-empty matrix of metrics")
+
+        self._sorted_metrics = sorted_metrics
+        self._scores: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_tracks(cls, tracks: Iterable[Track]) -> "ReferenceDistribution":
+        """Uses the tracks (e.g. a user's whole library) as the population.
+
+        The tracks' own scores are kept, since their metrics are already known.
+        """
+        tracks = list({track.id: track for track in tracks}.values())
+        metrics = np.array([get_metrics_for_track(track) for track in tracks])
+
+        reference = cls(np.sort(metrics, axis=0))
+        reference._scores.update(
+            zip(
+                (track.id for track in tracks),
+                _get_percentile_ranks_within(reference._sorted_metrics, metrics),
+                strict=True,
+            )
+        )
+
+        return reference
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ReferenceDistribution":
+        """Loads a snapshot of a population that was saved with `save`."""
+        return cls(np.load(path))
+
+    def save(self, path: str | Path) -> None:
+        np.save(path, self._sorted_metrics)
+
+    def __len__(self) -> int:
+        return len(self._sorted_metrics)
+
+    def get_scores_for_tracks(self, tracks: Iterable[Track]) -> dict[Track, Metrics]:
+        tracks = list(tracks)
+
+        if unscored := {
+            track.id: track for track in tracks if track.id not in self._scores
+        }:
+            metrics = np.array(
+                [get_metrics_for_track(track) for track in unscored.values()]
+            )
+
+            self._scores.update(
+                zip(
+                    unscored,
+                    _get_percentile_ranks_within(self._sorted_metrics, metrics),
+                    strict=True,
+                )
+            )
+
+        return {track: self._scores[track.id] for track in tracks}
+
 
-    return dict(zip(items, scores))
+def get_scores_for_tracks(
+    tracks: list[Track], *, reference: ReferenceDistribution | None = None
+) -> dict[Track, Metrics]:
+    """Scores tracks by the percentile ranks of their metrics.
 
+    Metrics are ranked within `reference` if given, or within the tracks otherwise.
+    """
+    if reference is not None:
+        return reference.get_scores_for_tracks(tracks)
 
-def get_scores_for_tracks(tracks: list[Track]) -> dict[Track, Metrics]:
     return get_percentile_scores_for_attributes_of_items(
         tracks, item_attributes_func=get_metrics_for_track
     )
@@ -0,0 +1,126 @@
+from collections.abc import Sequence
+from functools import cache
+
+import numpy as np
+from scipy.spatial import KDTree
+
+from mmmusic.models.genre_attributes import (
+    GenreAttributes,
+    get_genre_coordinates,
+    get_genre_ids,
+)
+
+Position = str | GenreAttributes | tuple[float, float]
+
+
+class GenreMap:
+    """Finds genres by where they lie on the genre map, with a k-d tree.
+
+    Queries take either a genre or a (top, left) position, and visit only the parts
+    of the tree near it, rather than every genre.
+    """
+
+    def __init__(self, genres: Sequence[str], coordinates: np.ndarray):
+        if len(genres) != len(coordinates):
+            raise ValueError("Each genre must have one pair of coordinates")
+
+        self.genres = tuple(genres)
+        self._ids = {genre: genre_id for genre_id, genre in enumerate(self.genres)}
+        self._coordinates = coordinates
+        self._tree = KDTree(coordinates)
+
+    def position(self, genre: Position) -> GenreAttributes:
+        if isinstance(genre, str):
+            return GenreAttributes(*self._coordinates[self._ids[genre]])
+
+        return GenreAttributes(*genre)
+
+    def nearest(self, position: Position, k: int = 1) -> list[tuple[str, float]]:
+        """Returns the k genres nearest to position, with their distances."""
+        k = min(k, len(self.genres))
+
+        if k < 1:
+            return []
+
+        # NOTE: A list of ks gives arrays, even when k is 1.
+        distances, genre_ids = self._tree.query(
+            self.position(position), k=list(range(1, k + 1))
+        )
+
+        return [
+            (self.genres[genre_id], distance)
+            for genre_id, distance in zip(
+                genre_ids.tolist(), distances.tolist(), strict=True
+            )
+        ]
+
+    def within(self, position: Position, radius: float) -> list[str]:
+        """Returns the genres within radius of position, nearest first."""
+        point = np.asarray(self.position(position))
+
+        genre_ids = np.asarray(
+            self._tree.query_ball_point(point, radius), dtype=np.intp
+        )
+
+        return self._nearest_first(point, genre_ids)
+
+    def between(
+        self, genre: Position, other_genre: Position, *, width: float | None = None
+    ) -> list[str]:
+        """Returns the genres between two genres (or positions), in order from one.
+
+        Genres are between if they lie within width of the line between the two,
+        without going past either end. If width is not given, they must lie in the
+        circle that the line is a diameter of.
+        """
+        start = np.asarray(self.position(genre))
+        end = np.asarray(self.position(other_genre))
+
+        midpoint = (start + end) / 2
+        half_length = np.linalg.norm(end - start) / 2
+
+        genre_ids = np.asarray(
+            self._tree.query_ball_point(
+                midpoint, half_length if width is None else half_length + width
+            ),
+            dtype=np.intp,
+        )
+
+        coordinates = self._coordinates[genre_ids]
+        direction = end - start
+        squared_length = direction @ direction
+
+        # How far along the line (from 0 to 1) each genre lies.
+        progress = (
+            (coordinates - start) @ direction / squared_length
+            if squared_length
+            else np.zeros(len(genre_ids))
+        )
+
+        if width is not None:
+            distances = np.linalg.norm(
+                coordinates - (start + np.outer(progress, direction)), axis=1
+            )
+
+            between = (progress >= 0) & (progress <= 1) & (distances <= width)
+
+            genre_ids, progress = genre_ids[between], progress[between]
+
+        return [
+            self.genres[genre_id]
+            for genre_id in genre_ids[np.lexsort((genre_ids, progress))].tolist()
+        ]
+
+    def _nearest_first(self, point: np.ndarray, genre_ids: np.ndarray) -> list[str]:
+        distances = np.linalg.norm(self._coordinates[genre_ids] - point, axis=1)
+
+        return [
+            self.genres[genre_id]
+            for genre_id in genre_ids[np.lexsort((genre_ids, distances))].tolist()
+        ]
+
+
+@cache
+def get_genre_map() -> GenreMap:
+    """Returns the map of every genre with coordinates."""
+    return GenreMap(list(get_genre_ids()), get_genre_coordinates())
@@ -1,31 +1,162 @@
 from collections import defaultdict
-from itertools import permutations
+from collections.abc import Iterable, Iterator, Sequence
+from functools import cache
+from itertools import chain
 import re
 
-from mmmusic.models.artists import Artist, get_artist
+import numpy as np
+from scipy import sparse
+
+from mmmusic.models.artists import Artist, ArtistID, get_artists
 from mmmusic.models.genre_attributes import (
     GenreAttributes,
     get_default_genre_attributes,
-    get_genre_attribute_means,
-    get_genre_attributes,
+    get_genre_coordinates,
+    get_genre_ids,
 )
 from mmmusic.models.tracks import Track
 
 
+class ArtistGenres:
+    """Caches the genres of artists, and their centroids, as interned IDs.
+
+    Each artist is assigned a row, and its genres (those with coordinates) are held
+    as the IDs of get_genre_ids, so that neither they nor their centroid are worked
+    out again for each track. The rows form a sparse artist × genre matrix.
+    """
+
+    def __init__(self):
+        self._rows: dict[ArtistID, int] = {}
+        self._genre_ids: list[frozenset[int]] = []
+        self._centroids: list[GenreAttributes | None] = []
+        self._incidence: sparse.csr_array | None = None
+
+    def add(self, artists: Iterable[Artist]) -> None:
+        genre_ids = get_genre_ids()
+        coordinates = get_genre_coordinates()
+
+        for artist in artists:
+            if artist.id in self._rows:
+                continue
+
+            # NOTE: Genres without coordinates are ignored.
+            artist_genre_ids = frozenset(
+                genre_ids[genre] for genre in artist.genres if genre in genre_ids
+            )
+
+            self._rows[artist.id] = len(self._genre_ids)
+            self._genre_ids.append(artist_genre_ids)
+            self._centroids.append(
+                GenreAttributes(*coordinates[sorted(artist_genre_ids)].mean(axis=0))
+                if artist_genre_ids
+                else None
+            )
+
+            self._incidence = None
+
+    def add_ids(self, artist_ids: Iterable[ArtistID]) -> None:
+        """Adds the artists that are not cached yet, fetching them in batches."""
+        if new_artist_ids := {
+            artist_id: None for artist_id in artist_ids if artist_id not in self._rows
+        }:
+            self.add(get_artists(new_artist_ids))
+
+    def genre_ids(self, artist_id: ArtistID) -> frozenset[int]:
+        return self._genre_ids[self._rows[artist_id]]
+
+    def centroid(self, artist_id: ArtistID) -> GenreAttributes | None:
+        """Returns the mean coordinates of the artist's genres, if it has any."""
+        return self._centroids[self._rows[artist_id]]
+
+    def rows_of(self, artist_ids: Iterable[ArtistID]) -> np.ndarray:
+        return np.fromiter(map(self._rows.__getitem__, artist_ids), dtype=np.intp)
+
+    def incidence(self) -> sparse.csr_array:
+        """Returns the artist × genre matrix, with ones where artists have genres."""
+        if self._incidence is None:
+            genre_ids = np.fromiter(chain.from_iterable(self._genre_ids), dtype=np.intp)
+            artist_rows = np.repeat(
+                np.arange(len(self._genre_ids)),
+                [len(artist_genre_ids) for artist_genre_ids in self._genre_ids],
+            )
+
+            self._incidence = sparse.csr_array(
+                (np.ones(len(genre_ids)), (artist_rows, genre_ids)),
+                shape=(len(self._genre_ids), len(get_genre_ids())),
+            )
+
+        return self._incidence
+
+    def __len__(self) -> int:
+        return len(self._genre_ids)
+
+
+@cache
+def get_artist_genres() -> ArtistGenres:
+    return ArtistGenres()
+
+
 def get_genre_attributes_for_track(track: Track) -> GenreAttributes:
-    genre_attributes = get_genre_attributes()
+    artist_genres = get_artist_genres()
+    artist_genres.add_ids(track.artist_ids)
+
+    if len(track.artist_ids) == 1:
+        centroid = artist_genres.centroid(track.artist_ids[0])
+
+        return centroid if centroid is not None else get_default_genre_attributes()
+
+    track_genre_ids = set().union(
+        *(artist_genres.genre_ids(artist_id) for artist_id in track.artist_ids)
+    )
+
+    if not track_genre_ids:
+        return get_default_genre_attributes()
+
+    return GenreAttributes(
+        *get_genre_coordinates()[sorted(track_genre_ids)].mean(axis=0)
+    )
+
+
+def get_genre_attributes_for_tracks(tracks: Sequence[Track]) -> np.ndarray:
+    """Returns the genre attributes of many tracks, as rows of (top, left).
 
-    track_genres = set()
-    for artist in track.artist_ids:
-        track_genres |= get_artist(artist).genres & genre_attributes.keys()
-        # NOTE: genres missing from genre_attributes are ignored.
+    Tracks' genres are those of any of their artists, so the attributes of every
+    track come from one product of sparse track × artist and artist × genre
+    matrices, rather than from each track in turn.
+    """
+    artist_ids = [artist_id for track in tracks for artist_id in track.artist_ids]
 
-    return (
-        get_genre_attribute_means(track_genres)
-        if track_genres
-        else get_default_genre_attributes()
+    artist_genres = get_artist_genres()
+    artist_genres.add_ids(artist_ids)
+
+    track_artists = sparse.csr_array(
+        (
+            np.ones(len(artist_ids)),
+            (
+                np.repeat(
+                    np.arange(len(tracks)), [len(track.artist_ids) for track in tracks]
+                ),
+                artist_genres.rows_of(artist_ids),
+            ),
+        ),
+        shape=(len(tracks), len(artist_genres)),
     )
 
+    track_genres = track_artists @ artist_genres.incidence()
+
+    # NOTE: Genres that several of a track's artists share are counted once.
+    track_genres.data[:] = 1
+
+    numbers_of_genres = track_genres.sum(axis=1)
+    has_genres = numbers_of_genres > 0
+
+    attributes = np.tile(get_default_genre_attributes(), (len(tracks), 1))
+    attributes[has_genres] = (track_genres @ get_genre_coordinates())[
+        has_genres
+    ] / numbers_of_genres[has_genres, np.newaxis]
+
+    return attributes
+
 
 def get_genre_artists_map(artists: list[Artist]) -> dict[str, set[Artist]]:
     """Returns a dictionary mapping genres to their artists."""
@@ -38,34 +169,264 @@ def get_genre_artists_map(artists: list[Artist]) -> dict[str, set[Artist]]:
     return dict(genre_artists)
 
 
-def genres_matching_pattern(keyword: str, *, artists: list[Artist]) -> set[str]:
-    pattern = re.compile(keyword)
-    return {
-        genre for genre in get_genre_artists_map(artists) if pattern.fullmatch(genre)
-    }
+class GenreIndex:
+    """Indexes a library's genres, to their artists, to their tracks.
+
+    Each pattern is matched against the vocabulary of genres only once. Its matches
+    are cached, and extended as artists (and their genres) are added.
+    """
+
+    def __init__(self, artists: Iterable[Artist] = (), tracks: Iterable[Track] = ()):
+        self._artists: dict[ArtistID, Artist] = {}
+        self._genre_artists: dict[str, set[Artist]] = defaultdict(set)
+        self._artist_tracks: dict[ArtistID, set[Track]] = defaultdict(set)
+        self._tracks: set[Track] = set()
+
+        # Genres, and the IDs of their artists, by pattern.
+        self._matches: dict[str, tuple[set[str], set[ArtistID]]] = {}
+
+        self.add_artists(artists)
+        self.add_tracks(tracks)
+
+    @property
+    def vocabulary(self) -> set[str]:
+        return set(self._genre_artists)
+
+    def add_artists(self, artists: Iterable[Artist]) -> None:
+        new_artists = [artist for artist in artists if artist.id not in self._artists]
+
+        for artist in new_artists:
+            self._artists[artist.id] = artist
+
+            for genre in artist.genres:
+                self._genre_artists[genre].add(artist)
+
+        for pattern, (genres, artist_ids) in self._matches.items():
+            compiled = re.compile(pattern)
+
+            for artist in new_artists:
+                genres.update(filter(compiled.fullmatch, artist.genres))
+
+                if not genres.isdisjoint(artist.genres):
+                    artist_ids.add(artist.id)
+
+    def add_tracks(self, tracks: Iterable[Track]) -> None:
+        new_tracks = [track for track in tracks if track not in self._tracks]
+
+        if not new_tracks:
+            return
+
+        # Fetch the artists that are not indexed yet in batches.
+        self.add_artists(
+            get_artists(
+                {
+                    artist_id: None
+                    for track in new_tracks
+                    for artist_id in track.artist_ids
+                    if artist_id not in self._artists
+                }
+            )
+        )
+
+        for track in new_tracks:
+            for artist_id in track.artist_ids:
+                self._artist_tracks[artist_id].add(track)
+
+        self._tracks.update(new_tracks)
+
+    def genres_matching(self, pattern: str) -> set[str]:
+        return set(self._match(pattern)[0])
+
+    def artists_matching(self, pattern: str) -> set[Artist]:
+        return {self._artists[artist_id] for artist_id in self._match(pattern)[1]}
+
+    def artist_ids_matching(self, pattern: str) -> set[ArtistID]:
+        return set(self._match(pattern)[1])
+
+    def any_artist_matches(self, artist_ids: Iterable[ArtistID], pattern: str) -> bool:
+        """Returns whether any of the (indexed) artists has a genre matching pattern."""
+        return not self._match(pattern)[1].isdisjoint(artist_ids)
+
+    def tracks_matching(self, pattern: str) -> set[Track]:
+        """Returns the (indexed) tracks by any artist with a genre matching pattern."""
+        return set().union(
+            *(self._artist_tracks[artist_id] for artist_id in self._match(pattern)[1])
+        )
+
+    def _match(self, pattern: str) -> tuple[set[str], set[ArtistID]]:
+        if pattern not in self._matches:
+            genres = set(filter(re.compile(pattern).fullmatch, self._genre_artists))
+
+            self._matches[pattern] = (
+                genres,
+                {
+                    artist.id
+                    for genre in genres
+                    for artist in self._genre_artists[genre]
+                },
+            )
+
+        return self._matches[pattern]
+
+
+@cache
+def get_genre_index() -> GenreIndex:
+    """Returns the genre index that is shared by processors (and grows as needed)."""
+    return GenreIndex()
+
+
+def genres_matching_pattern(
+    keyword: str, *, artists: list[Artist] | GenreIndex
+) -> set[str]:
+    index = artists if isinstance(artists, GenreIndex) else GenreIndex(artists)
+
+    return index.genres_matching(keyword)
 
 
 def artists_of_genres_matching_pattern(
     keyword: str,
     *,
-    artists: list[Artist],
+    artists: list[Artist] | GenreIndex,
 ) -> set[Artist]:
-    members: set[Artist] = set()
+    index = artists if isinstance(artists, GenreIndex) else GenreIndex(artists)
+
+    return index.artists_matching(keyword)
+
+
+class GenreCooccurrence:
+    """Counts how often genres share artists, from a sparse artist × genre matrix.
+
+    The counts of all pairs come from one product of the matrix with its transpose,
+    so no pairs are listed per artist. The artists that a pair shares are only
+    found when asked for.
+    """
+
+    def __init__(self, artists: Iterable[Artist]):
+        self._artists = list({artist.id: artist for artist in artists}.values())
+        self.genres = sorted(
+            {genre for artist in self._artists for genre in artist.genres}
+        )
+        self._columns = {genre: i for i, genre in enumerate(self.genres)}
 
-    genre_artists = get_genre_artists_map(artists)
+        artist_genre_columns = [
+            sorted({self._columns[genre] for genre in artist.genres})
+            for artist in self._artists
+        ]
 
-    for genre in genres_matching_pattern(keyword, artists=artists):
-        members.update(genre_artists[genre])
+        # NOTE: Artists' genres are held as columns, so that the artists of a genre
+        # are read from a single slice.
+        self._incidence = sparse.csc_array(
+            (
+                np.ones(sum(map(len, artist_genre_columns)), dtype=np.int32),
+                (
+                    np.repeat(
+                        np.arange(len(self._artists)),
+                        [len(columns) for columns in artist_genre_columns],
+                    ),
+                    np.fromiter(
+                        chain.from_iterable(artist_genre_columns), dtype=np.intp
+                    ),
+                ),
+            ),
+            shape=(len(self._artists), len(self.genres)),
+        )
 
-    return members
+        # Genres × genres, with the numbers of shared artists (and, on the diagonal,
+        # the numbers of artists of each genre).
+        self._counts = (self._incidence.T @ self._incidence).tocsr()
+
+    def overlap(self, genre: str, other_genre: str) -> int:
+        """Returns the number of artists that the genres share."""
+        if genre not in self._columns or other_genre not in self._columns:
+            return 0
+
+        return int(self._counts[self._columns[genre], self._columns[other_genre]])
+
+    def overlaps(self) -> dict[tuple[str, str], int]:
+        """Returns the numbers of shared artists of pairs of genres that share any.
+
+        Each pair is given once, in alphabetical order.
+        """
+        counts = sparse.triu(self._counts, k=1).tocoo()
+
+        return {
+            (self.genres[row], self.genres[column]): int(count)
+            for row, column, count in zip(
+                counts.row.tolist(),
+                counts.col.tolist(),
+                counts.data.tolist(),
+                strict=True,
+            )
+        }
+
+    def top_cooccurring(self, genre: str, k: int = 10) -> list[tuple[str, int]]:
+        """Returns the (up to) k genres that share the most artists with genre."""
+        if genre not in self._columns:
+            return []
+
+        row = self._columns[genre]
+        start, end = self._counts.indptr[row], self._counts.indptr[row + 1]
+
+        columns = self._counts.indices[start:end]
+        counts = self._counts.data[start:end]
+
+        others = columns != row
+        columns, counts = columns[others], counts[others]
+
+        # NOTE: Ties are broken alphabetically, since columns are sorted genres.
+        top = np.lexsort((columns, -counts))[:k]
+
+        return [
+            (self.genres[column], int(count))
+            for column, count in zip(
+                columns[top].tolist(), counts[top].tolist(), strict=True
+            )
+        ]
+
+    def artists_of(self, genre: str) -> set[Artist]:
+        if genre not in self._columns:
+            return set()
+
+        return set(self._artists_in_rows(self._rows_of(genre)))
+
+    def shared_artists(self, genre: str, other_genre: str) -> set[Artist]:
+        """Returns the artists that the genres share."""
+        if genre not in self._columns or other_genre not in self._columns:
+            return set()
+
+        return set(
+            self._artists_in_rows(
+                np.intersect1d(
+                    self._rows_of(genre), self._rows_of(other_genre), assume_unique=True
+                )
+            )
+        )
+
+    def _rows_of(self, genre: str) -> np.ndarray:
+        column = self._columns[genre]
+
+        return self._incidence.indices[
+            self._incidence.indptr[column] : self._incidence.indptr[column + 1]
+        ]
+
+    def _artists_in_rows(self, rows: np.ndarray) -> Iterator[Artist]:
+        return (self._artists[row] for row in rows.tolist())
 
 
 def genre_overlaps(artists: list[Artist]) -> dict[tuple[str, str], set[Artist]]:
-    """Returns a dictionary mapping pairs of genres to their shared artists."""
-    mutuals = defaultdict(set)
+    """Returns a dictionary mapping pairs of genres to their shared artists.
 
-    for artist in artists:
-        for pair in permutations(get_artist(artist).genres, 2):
-            mutuals[pair].add(artist)
+    Each pair is given in both orders. For the counts alone, or the artists of a
+    few pairs, use GenreCooccurrence.
+    """
+    cooccurrence = GenreCooccurrence(artists)
+
+    mutuals = {}
+
+    for genre, other_genre in cooccurrence.overlaps():
+        shared_artists = cooccurrence.shared_artists(genre, other_genre)
+
+        mutuals[genre, other_genre] = shared_artists
+        mutuals[other_genre, genre] = set(shared_artists)
 
-    return dict(mutuals)
+    return mutuals
@@ -1,11 +1,13 @@
+from collections.abc import Iterable
 from datetime import date
 from functools import cache
 
 from pydantic import BaseModel, validator
 
 from mmmusic.external import spotify
+from mmmusic.external.concurrency import map_concurrently
 from mmmusic.log_utils import get_logger
-from mmmusic.models.tracks import Track, get_track
+from mmmusic.models.tracks import Track, get_tracks_from_json
 
 logger = get_logger()
 
@@ -52,16 +54,37 @@ def get_album(album_id: AlbumID | Album) -> Album:
     return Album.parse_obj({**album_json, "artist_ids": artist_ids})
 
 
+def get_albums(album_ids: Iterable[AlbumID | Album]) -> tuple[Album, ...]:
+    album_ids = list(album_ids)
+
+    spotify.get_albums(
+        album_id for album_id in album_ids if not isinstance(album_id, Album)
+    )
+
+    return tuple(get_album(album_id) for album_id in album_ids)
+
+
 @cache
 def get_album_tracks(album: Album | AlbumID) -> tuple[Track, ...]:
     logger.debug("Getting tracks from album %r", album)
 
     album = get_album(album)
 
-    return tuple(get_track(track["id"]) for track in spotify.get_album_tracks(album.id))
+    return get_tracks_from_json(spotify.get_album_tracks(album.id))
 
 
 def get_tracks_from_albums(albums: list[Album | AlbumID]) -> tuple[Track, ...]:
+    albums = get_albums(albums)
+
+    # NOTE: Album objects include up to 50 tracks, so this only makes requests for
+    # longer albums.
+    album_tracks = map_concurrently(
+        spotify.get_album_tracks, [album.id for album in albums]
+    )
+
+    # Hydrate the tracks of every album together so that they share batches.
+    get_tracks_from_json(track for tracks in album_tracks for track in tracks)
+
     return tuple(track for album in albums for track in get_album_tracks(album))
 
 
@@ -1,3 +1,4 @@
+from collections.abc import Iterable
 from functools import cache
 
 from pydantic import BaseModel
@@ -35,6 +36,16 @@ def get_artist(artist_id: ArtistID | Artist) -> Artist:
     return Artist.parse_obj(artist_json)
 
 
+def get_artists(artist_ids: Iterable[ArtistID | Artist]) -> tuple[Artist, ...]:
+    artist_ids = list(artist_ids)
+
+    spotify.get_artists(
+        artist_id for artist_id in artist_ids if not isinstance(artist_id, Artist)
+    )
+
+    return tuple(get_artist(artist_id) for artist_id in artist_ids)
+
+
 @cache
 def get_artist_related_artists(artist: ArtistID | Artist) -> tuple[Artist, ...]:
     if isinstance(artist, Artist):
@@ -42,7 +53,7 @@ def get_artist_related_artists(artist: ArtistID | Artist) -> tuple[Artist, ...]:
 
     related_artists_json = spotify.get_artist_related_artists(artist)
 
-    return tuple(get_artist(artist["id"]) for artist in related_artists_json)
+    return get_artists(artist["id"] for artist in related_artists_json)
 
 
 def search_for_artist(search_text: str) -> Artist:
@@ -1,33 +1,118 @@
 from collections import namedtuple
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator, Mapping
 from functools import cache
 import json
 from pathlib import Path
 
 import numpy as np
 
-_genre_positions_file_path = Path(__file__).parent.parent / "data/genre_positions.json"
+_data_directory_path = Path(__file__).parent.parent / "data"
+
+_genre_positions_file_path = _data_directory_path / "genre_positions.json"
+
+# NOTE: The genre positions are also kept as a table of names (one per line), and an
+# array of their coordinates, which load much faster than the JSON.
+_genre_names_file_path = _data_directory_path / "genre_names.txt"
+_genre_coordinates_file_path = _data_directory_path / "genre_coordinates.npy"
 
 GenreAttributes = namedtuple("GenreAttributes", ["top", "left"])
 
 
-@cache
-def get_genre_attributes() -> dict[str, GenreAttributes]:
+class GenrePositions(Mapping[str, GenreAttributes]):
+    """Maps genres to their attributes, read from an array of their coordinates."""
+
+    def __init__(self, genre_ids: Mapping[str, int], coordinates: np.ndarray):
+        self._genre_ids = genre_ids
+        self._coordinates = coordinates
+
+    def __getitem__(self, genre: str) -> GenreAttributes:
+        return GenreAttributes(*self._coordinates[self._genre_ids[genre]].tolist())
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._genre_ids)
+
+    def __len__(self) -> int:
+        return len(self._genre_ids)
+
+
+def save_genre_positions(genre_positions: Mapping[str, Mapping[str, int]]) -> None:
+    """Saves the genre positions, as JSON and as a table of names and coordinates."""
+    with _genre_positions_file_path.open("w") as f:
+        json.dump(genre_positions, f)
+
+    _genre_names_file_path.write_text("\n".join(genre_positions), encoding="utf-8")
+
+    np.save(
+        _genre_coordinates_file_path,
+        np.array(
+            [(coords["top"], coords["left"]) for coords in genre_positions.values()],
+            dtype=np.int32,
+        ).reshape(-1, 2),
+    )
+
+
+def _load_genre_arrays() -> tuple[list[str], np.ndarray]:
+    # NOTE: Names are split on newlines only (not on every line boundary).
+    genres = _genre_names_file_path.read_text(encoding="utf-8").split("\n")
+
+    # NOTE: The coordinates are mapped into memory, rather than read and copied.
+    coordinates = np.load(_genre_coordinates_file_path, mmap_mode="r")
+
+    if len(genres) != len(coordinates):
+        raise ValueError("The genre names and coordinates do not match")
+
+    return genres, coordinates
+
+
+def _load_genre_json() -> tuple[list[str], np.ndarray]:
     with _genre_positions_file_path.open() as f:
         genre_positions = json.load(f)
 
-    return {
-        genre: GenreAttributes(**coords) for genre, coords in genre_positions.items()
-    }
+    coordinates = np.array(
+        [(coords["top"], coords["left"]) for coords in genre_positions.values()],
+        dtype=np.int32,
+    ).reshape(-1, 2)
+    coordinates.setflags(write=False)
+
+    return list(genre_positions), coordinates
+
+
+@cache
+def _load_genre_positions() -> tuple[list[str], np.ndarray]:
+    if _genre_names_file_path.exists() and _genre_coordinates_file_path.exists():
+        return _load_genre_arrays()
+
+    return _load_genre_json()
+
+
+@cache
+def get_genre_attributes() -> Mapping[str, GenreAttributes]:
+    return GenrePositions(get_genre_ids(), get_genre_coordinates())
+
+
+@cache
+def get_genre_ids() -> dict[str, int]:
+    """Returns the ID of each genre, i.e., its row in get_genre_coordinates."""
+    genres, _ = _load_genre_positions()
+
+    return {genre: genre_id for genre_id, genre in enumerate(genres)}
+
+
+def get_genre_coordinates() -> np.ndarray:
+    """Returns the (top, left) coordinates of every genre, by ID (read-only)."""
+    _, coordinates = _load_genre_positions()
+
+    return coordinates
 
 
 def get_genre_attribute_means(genres: Iterable[str]) -> GenreAttributes:
-    genre_positions = get_genre_attributes()
+    genre_ids = get_genre_ids()
+
     return GenreAttributes(
-        *np.mean([genre_positions[genre] for genre in genres], axis=0)
+        *get_genre_coordinates()[[genre_ids[genre] for genre in genres]].mean(axis=0)
     )
 
 
 @cache
 def get_default_genre_attributes() -> GenreAttributes:
-    return get_genre_attribute_means(get_genre_attributes())
+    return GenreAttributes(*get_genre_coordinates().mean(axis=0))
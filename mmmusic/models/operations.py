@@ -1,9 +1,429 @@
-from functools import update_wrapper
-from typing import Callable, Generic, TypeVar, overload
+from collections.abc import Hashable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from functools import partial, update_wrapper
+import heapq
+import inspect
+from itertools import chain, compress, islice
+from typing import Any, Callable, Generic, TypeVar, overload
+
+import numpy as np
 
 T = TypeVar("T")
 
 ListOperation = Callable[[list[T]], list[T]]
+Predicate = Callable[[T], bool]
+SortKeys = Callable[[list[T]], Sequence[Any]]
+# Columns (of some kind) that hold the attributes of every item in a list, in order.
+Columns = Callable[[list[T]], Any]
+Mask = Callable[[Any], np.ndarray]
+
+# The cost of a filter's predicate, relative to that of comparing an attribute.
+DEFAULT_FILTER_COST = 1.0
+
+# Results of filters and orders, by step and then by input, while they are shared.
+_shared_results: dict[Hashable, dict[Hashable, Any]] | None = None
+
+
+@contextmanager
+def shared_results() -> Iterator[None]:
+    """Shares the results of filters and orders between operations in the context.
+
+    Steps are the same if they have the same name and code, and close over equal
+    values, e.g., "released after 2000" in several playlists' processors, and are
+    computed only once per input. Opaque operations (such as shuffles) are always
+    run.
+    """
+    global _shared_results
+
+    previous = _shared_results
+
+    if previous is None:
+        _shared_results = {}
+
+    try:
+        yield
+    finally:
+        _shared_results = previous
+
+
+def _results_of(key: Hashable) -> dict[Hashable, Any] | None:
+    if _shared_results is None:
+        return None
+
+    return _shared_results.setdefault(key, {})
+
+
+def _identity(func: Callable, _seen: frozenset[int] = frozenset()) -> Hashable:
+    """Identifies what a function computes, by its code and the values it closes over.
+
+    Functions made by the same factory share code, but not identity, so those made
+    with equal arguments are identified alike. Bound methods are identified by their
+    function and the instance they are bound to (by its value, if it defines one, or
+    by itself otherwise). Functions that close over values (or methods bound to
+    instances) that cannot be hashed are identified by themselves.
+    """
+    code = getattr(func, "__code__", None)
+
+    if code is None or id(func) in _seen:
+        return func
+
+    if inspect.ismethod(func):
+        identity = (_identity(func.__func__, _seen), func.__self__)
+
+        try:
+            hash(identity)
+        except TypeError:
+            return func
+
+        return identity
+
+    values = []
+
+    for cell in func.__closure__ or ():
+        try:
+            value = cell.cell_contents
+        except ValueError:  # an empty cell
+            value = None
+
+        if callable(value) and hasattr(value, "__code__"):
+            value = _identity(value, _seen | {id(func)})
+
+        values.append(value)
+
+    identity = (code, tuple(values), func.__defaults__)
+
+    try:
+        hash(identity)
+    except TypeError:
+        return func
+
+    return identity
+
+
+@dataclass(frozen=True)
+class _Operation:
+    """A step that transforms the whole list, so that nothing can be moved past it."""
+
+    operation: ListOperation
+    display_name: str
+
+    def run(self, items: list, **kwargs) -> list:
+        return self.operation(items, **_accepted_kwargs(self.operation, kwargs))
+
+    def describe(self) -> str:
+        return self.display_name
+
+
+@dataclass(frozen=True)
+class _Filter:
+    predicate: Predicate
+    display_name: str
+    cost: float
+    columns: Columns | None = None
+    mask: Mask | None = None
+
+    def shared_predicate(self) -> Predicate:
+        results = self._shared_results()
+
+        if results is None:
+            return self.predicate
+
+        def predicate(item) -> bool:
+            try:
+                return results[item]
+            except KeyError:
+                result = results[item] = self.predicate(item)
+
+                return result
+
+        return predicate
+
+    def shared_mask(self, items: list, columns: Callable[[], Any]) -> np.ndarray:
+        """Returns the mask of the items, sharing results with the predicate's.
+
+        `columns` gives the filter's columns for the items, and is only called if
+        some of the items have no shared result.
+        """
+        results = self._shared_results()
+
+        if results is None:
+            return self.mask(columns())
+
+        try:
+            return np.fromiter(
+                map(results.__getitem__, items), dtype=bool, count=len(items)
+            )
+        except KeyError:
+            mask = self.mask(columns())
+
+            results.update(zip(items, mask.tolist(), strict=True))
+
+            return mask
+
+    def _shared_results(self) -> dict[Hashable, Any] | None:
+        return _results_of(("filter", self.display_name, _identity(self.predicate)))
+
+
+@dataclass(frozen=True)
+class _AnyFilter:
+    """A union of filters, which keeps the items that any of them would keep.
+
+    The cheapest alternatives are tried first.
+    """
+
+    alternatives: tuple["_FusedFilter", ...]
+    display_name: str
+    cost: float = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "alternatives",
+            tuple(sorted(self.alternatives, key=lambda alternative: alternative.cost)),
+        )
+        object.__setattr__(
+            self, "cost", sum(alternative.cost for alternative in self.alternatives)
+        )
+
+    def shared_predicate(self) -> Predicate:
+        matchers = [alternative.matcher() for alternative in self.alternatives]
+
+        def predicate(item) -> bool:
+            return any(matches(item) for matches in matchers)
+
+        return predicate
+
+
+@dataclass(frozen=True)
+class _Order:
+    sort_keys: SortKeys
+    display_name: str
+    reverse: bool
+
+    def keys_of(self, items: list) -> Sequence[Any]:
+        results = _results_of(
+            ("order", self.display_name, _identity(self.sort_keys), self.reverse)
+        )
+
+        if results is None:
+            return self.sort_keys(items)
+
+        fingerprint = tuple(items)
+
+        if fingerprint not in results:
+            results[fingerprint] = tuple(self.sort_keys(items))
+
+        return results[fingerprint]
+
+    def run(self, items: list) -> list:
+        keys = self.keys_of(items)
+
+        return [
+            items[position]
+            for position in sorted(
+                range(len(items)), key=keys.__getitem__, reverse=self.reverse
+            )
+        ]
+
+    def describe(self) -> str:
+        return self.display_name
+
+
+@dataclass(frozen=True)
+class _Take:
+    n: int
+    display_name: str
+
+    def run(self, items: list) -> list:
+        return items[: self.n]
+
+    def describe(self) -> str:
+        return self.display_name
+
+
+@dataclass(frozen=True)
+class _Union:
+    """A union of operations, each of which is run once on the whole list.
+
+    Items are kept in the order of the input. Any that are not in the input (i.e.,
+    that the operations made) follow, in the order that they were made.
+    """
+
+    operations: tuple["CombinableListOperation", ...]
+    display_name: str
+
+    def run(self, items: list, **kwargs) -> list:
+        results = [
+            operation._run_plan(items, **kwargs) for operation in self.operations
+        ]
+
+        selected = set(chain.from_iterable(results))
+        inputs = dict.fromkeys(items)
+
+        return [item for item in inputs if item in selected] + [
+            item
+            for item in dict.fromkeys(chain.from_iterable(results))
+            if item not in inputs
+        ]
+
+    def describe(self) -> str:
+        return self.display_name
+
+
+@dataclass(frozen=True)
+class _FusedFilter:
+    """Consecutive filters, applied in one pass with the cheapest predicates first.
+
+    If followed by a take, the pass stops as soon as enough items have matched.
+    """
+
+    filters: tuple[_Filter | _AnyFilter, ...]
+    limit: int | None = None
+
+    def __post_init__(self):
+        object.__setattr__(
+            self, "filters", tuple(sorted(self.filters, key=lambda f: f.cost))
+        )
+
+    @property
+    def cost(self) -> float:
+        return sum(filter_.cost for filter_ in self.filters)
+
+    def matcher(self) -> Predicate:
+        predicates = [filter_.shared_predicate() for filter_ in self.filters]
+
+        if len(predicates) == 1:
+            return predicates[0]
+
+        def matches(item) -> bool:
+            return all(predicate(item) for predicate in predicates)
+
+        return matches
+
+    @property
+    def masked(self) -> tuple[_Filter, ...]:
+        return tuple(
+            filter_
+            for filter_ in self.filters
+            if isinstance(filter_, _Filter) and filter_.mask is not None
+        )
+
+    def run(self, items: list) -> list:
+        if masked := self.masked:
+            # Filters with masks are applied to every item at once (with the columns
+            # that they use built once), and the rest only to the items they keep.
+            columns = {}
+            keep = np.ones(len(items), dtype=bool)
+
+            def columns_of(filter_: _Filter) -> Any:
+                if filter_.columns not in columns:
+                    columns[filter_.columns] = filter_.columns(items)
+
+                return columns[filter_.columns]
+
+            for filter_ in masked:
+                keep &= filter_.shared_mask(items, partial(columns_of, filter_))
+
+            items = list(compress(items, keep.tolist()))
+
+            unmasked = tuple(
+                filter_ for filter_ in self.filters if filter_ not in masked
+            )
+
+            if not unmasked:
+                return items[: self.limit]
+
+            return replace(self, filters=unmasked).run(items)
+
+        matches = self.matcher()
+
+        return list(islice((item for item in items if matches(item)), self.limit))
+
+    def describe(self) -> str:
+        masked = self.masked
+
+        conditions = [
+            filter_.display_name for filter_ in self.filters if filter_ not in masked
+        ]
+
+        if masked:
+            conditions.insert(
+                0,
+                " and ".join(filter_.display_name for filter_ in masked)
+                + " (vectorized)",
+            )
+
+        conditions = " and ".join(conditions)
+
+        if self.limit is None:
+            return f"where {conditions}"
+
+        return f"first {self.limit} where {conditions}"
+
+
+@dataclass(frozen=True)
+class _TopK:
+    """An order followed by a take, which only needs the first items in order."""
+
+    order: _Order
+    n: int
+
+    def run(self, items: list) -> list:
+        keys = self.order.keys_of(items)
+
+        # NOTE: Both are stable, i.e., equivalent to sorting and then slicing.
+        select = heapq.nlargest if self.order.reverse else heapq.nsmallest
+
+        return [
+            items[position]
+            for position in select(self.n, range(len(items)), key=keys.__getitem__)
+        ]
+
+    def describe(self) -> str:
+        return f"top {self.n} {self.order.display_name}"
+
+
+_Step = _Operation | _Filter | _AnyFilter | _Order | _Take | _Union
+_Stage = _Operation | _FusedFilter | _Order | _Take | _TopK | _Union
+
+
+def _optimize(steps: Sequence[_Step]) -> list[_Stage]:
+    """Plans the steps as stages that give the same result in fewer passes.
+
+    Filters are assumed to be pure, so consecutive filters can be applied in any
+    order. Nothing is moved past an order or any other operation, whose result may
+    depend on the whole list (e.g., scores ranked within the tracks).
+    """
+    stages: list[_Stage] = []
+
+    for step in steps:
+        previous = stages[-1] if stages else None
+
+        if isinstance(step, (_Filter, _AnyFilter)):
+            if isinstance(previous, _FusedFilter) and previous.limit is None:
+                stages[-1] = _FusedFilter((*previous.filters, step))
+            else:
+                stages.append(_FusedFilter((step,)))
+        elif isinstance(step, _Take):
+            if isinstance(previous, _Take):
+                stages[-1] = replace(step, n=min(previous.n, step.n))
+            elif isinstance(previous, _TopK):
+                stages[-1] = replace(previous, n=min(previous.n, step.n))
+            elif isinstance(previous, _Order):
+                stages[-1] = _TopK(previous, step.n)
+            elif isinstance(previous, _FusedFilter):
+                limit = (
+                    step.n if previous.limit is None else min(previous.limit, step.n)
+                )
+
+                stages[-1] = replace(previous, limit=limit)
+            else:
+                stages.append(step)
+        else:
+            stages.append(step)
+
+    return stages
 
 
 class CombinableListOperation(Generic[T]):
@@ -12,6 +432,7 @@ class CombinableListOperation(Generic[T]):
         *,
         operation: ListOperation[T],
         display_name: str | None = None,
+        steps: Sequence[_Step] = (),
     ):
         self._operation = operation
 
@@ -21,31 +442,104 @@ class CombinableListOperation(Generic[T]):
             display_name if display_name is not None else operation.__name__
         )
 
-    def __call__(self, tracks: list[T]) -> list[T]:
-        return self._operation(tracks)
+        # NOTE: Operations that were not declared as filters, orders or takes are
+        # opaque steps in plans.
+        self._steps = tuple(steps) or (_Operation(operation, self.display_name),)
+        self._stages = _optimize(self._steps)
 
-    def __and__(self, other: "CombinableListOperation") -> "CombinableListOperation":
-        def chained_operation(tracks: list[T]) -> list[T]:
-            return other(self(tracks))
+    def __call__(self, tracks: list[T], **kwargs) -> list[T]:
+        # NOTE: Keyword arguments (such as a shuffle's random number generator) are
+        # passed on to the operation itself.
+        return self._operation(tracks, **kwargs)
+
+    def _run_plan(self, tracks: list[T], **kwargs) -> list[T]:
+        for stage in self._stages:
+            # NOTE: Only opaque operations (and unions, which may contain them) are
+            # given keyword arguments.
+            if isinstance(stage, (_Operation, _Union)):
+                tracks = stage.run(tracks, **kwargs)
+            else:
+                tracks = stage.run(tracks)
+
+        return tracks
+
+    def _is_filter(self) -> bool:
+        return all(isinstance(step, (_Filter, _AnyFilter)) for step in self._steps)
 
-        return type(self)(
-            operation=chained_operation,
+    def __and__(self, other: "CombinableListOperation") -> "CombinableListOperation":
+        return _from_steps(
+            self._steps + other._steps,
             display_name=f"{self.display_name} & {other.display_name}",
+            name="chained_operation",
         )
 
     def __or__(self, other: "CombinableListOperation") -> "CombinableListOperation":
-        def union(tracks: list[T]) -> list[T]:
-            return list(set(self(tracks)) | set(other(tracks)))
+        display_name = f"({self.display_name} | {other.display_name})"
+
+        # NOTE: A union of filters is itself a filter, which checks each item against
+        # the other filters only if it fails the cheapest.
+        if self._is_filter() and other._is_filter():
+            step = _AnyFilter(
+                (_FusedFilter(self._steps), _FusedFilter(other._steps)), display_name
+            )
+        else:
+            step = _Union((self, other), display_name)
+
+        return _from_steps([step], display_name=display_name, name="union")
 
-        return type(self)(
-            operation=union,
-            display_name=f"({self.display_name} | {other.display_name})",
+    def explain(self) -> str:
+        """Describes the optimized plan that the operation runs, one stage per line."""
+        return "\n".join(
+            f"{number}. {stage.describe()}"
+            for number, stage in enumerate(self._stages, 1)
         )
 
     def __str__(self) -> str:
         return self.display_name
 
 
+def _accepted_kwargs(func: Callable, kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Returns the keyword arguments that the function accepts.
+
+    Keyword arguments given to a chain (such as a shuffle's random number generator)
+    are passed to every operation in it that accepts them.
+    """
+    if not kwargs:
+        return kwargs
+
+    parameters = inspect.signature(func).parameters
+
+    if any(
+        parameter.kind is inspect.Parameter.VAR_KEYWORD
+        for parameter in parameters.values()
+    ):
+        return kwargs
+
+    return {
+        name: value
+        for name, value in kwargs.items()
+        if name in parameters
+        and parameters[name].kind
+        in (inspect.Parameter.KEYWORD_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    }
+
+
+def _from_steps(
+    steps: Sequence[_Step], *, display_name: str, name: str
+) -> CombinableListOperation:
+
+    def run_plan(items: list, **kwargs) -> list:
+        return combined._run_plan(items, **kwargs)
+
+    run_plan.__name__ = run_plan.__qualname__ = name
+
+    combined = CombinableListOperation(
+        operation=run_plan, display_name=display_name, steps=steps
+    )
+
+    return combined
+
+
 @overload
 def combinable(
     func: ListOperation[T], *, display_name: str | None = None
@@ -75,3 +569,74 @@ def combinable(
         return CombinableListOperation(operation=func, display_name=display_name)
 
     return decorator
+
+
+def combinable_filter(
+    *,
+    display_name: str,
+    cost: float = DEFAULT_FILTER_COST,
+    columns: Columns[T] | None = None,
+    mask: Mask | None = None,
+) -> Callable[[Predicate[T]], CombinableListOperation[T]]:
+    """Makes an operation that keeps the items for which a (pure) predicate is true.
+
+    Consecutive filters are applied in one pass, in order of (relative) cost.
+
+    Filters may also give a mask: a boolean array, computed from `columns` for a
+    whole list, of the items that the predicate would keep. Masks are used instead
+    of the predicate, and combined with those of consecutive filters.
+    """
+    if (columns is None) != (mask is None):
+        raise ValueError("Filters with masks must give the columns that they use")
+
+    def decorator(predicate: Predicate[T]) -> CombinableListOperation[T]:
+        stage = _FusedFilter(
+            (_Filter(predicate, display_name, cost, columns=columns, mask=mask),)
+        )
+
+        def filter_items(items: list[T]) -> list[T]:
+            return stage.run(items)
+
+        update_wrapper(filter_items, predicate)
+
+        return CombinableListOperation(
+            operation=filter_items, display_name=display_name, steps=stage.filters
+        )
+
+    return decorator
+
+
+def combinable_order(
+    *, display_name: str, reverse: bool = False
+) -> Callable[[SortKeys[T]], CombinableListOperation[T]]:
+    """Makes an operation that stably sorts items by the keys that a function gives.
+
+    The function is given every item to be sorted, and returns their keys in order.
+    If followed by a take, only the first items are put in order.
+    """
+
+    def decorator(sort_keys: SortKeys[T]) -> CombinableListOperation[T]:
+        order = _Order(sort_keys, display_name, reverse)
+
+        def order_items(items: list[T]) -> list[T]:
+            return order.run(items)
+
+        update_wrapper(order_items, sort_keys)
+
+        return CombinableListOperation(
+            operation=order_items, display_name=display_name, steps=[order]
+        )
+
+    return decorator
+
+
+def take(n: int, *, display_name: str | None = None) -> CombinableListOperation:
+    """Makes an operation that keeps the first n items."""
+    step = _Take(n, display_name if display_name is not None else f"first {n}")
+
+    def take_items(items: list[T]) -> list[T]:
+        return items[:n]
+
+    return CombinableListOperation(
+        operation=take_items, display_name=step.display_name, steps=[step]
+    )
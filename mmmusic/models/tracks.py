@@ -1,3 +1,4 @@
+from collections.abc import Iterable
 from functools import cache, cached_property
 
 from pydantic import BaseModel, computed_field
@@ -84,6 +85,34 @@ def get_track(track_id: TrackID | Track) -> Track:
     )
 
 
+def get_tracks(track_ids: Iterable[TrackID | Track]) -> tuple[Track, ...]:
+    track_ids = list(track_ids)
+
+    spotify.get_tracks(
+        track_id for track_id in track_ids if not isinstance(track_id, Track)
+    )
+
+    return tuple(get_track(track_id) for track_id in track_ids)
+
+
+def get_tracks_from_json(track_jsons: Iterable[dict]) -> tuple[Track, ...]:
+    """Gets the tracks of track objects that were embedded in other responses.
+
+    Full track objects (e.g. from playlists) are cached, so getting their tracks
+    requires no further requests. Simplified track objects (e.g. from albums) lack
+    popularity, so the full objects of those are fetched in batches.
+    """
+    track_jsons = list(track_jsons)
+
+    spotify.cache_tracks(
+        track_json
+        for track_json in track_jsons
+        if "album" in track_json and "popularity" in track_json
+    )
+
+    return get_tracks(track_json["id"] for track_json in track_jsons)
+
+
 @cache
 def get_track_audio_features(
     track: TrackID | Track | AudioFeatures,
@@ -102,6 +131,20 @@ def get_track_audio_features(
     return AudioFeatures.parse_obj(audio_features_json)
 
 
+def get_tracks_audio_features(
+    tracks: Iterable[TrackID | Track | AudioFeatures],
+) -> tuple[AudioFeatures | None, ...]:
+    tracks = list(tracks)
+
+    spotify.get_tracks_audio_features(
+        track if isinstance(track, str) else track.id
+        for track in tracks
+        if not isinstance(track, AudioFeatures)
+    )
+
+    return tuple(get_track_audio_features(track) for track in tracks)
+
+
 if __name__ == "__main__":
     track_ids = [
         "0vFabeTqtOtj918sjc5vYo",
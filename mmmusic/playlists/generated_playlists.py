@@ -1,4 +1,7 @@
+from collections.abc import Iterable
+
 from mmmusic.log_utils import get_logger
+from mmmusic.models.operations import shared_results
 from mmmusic.models.playlist_configs import PlaylistConfig
 from mmmusic.playlists.management import (
     add_tracks_to_playlist,
@@ -69,3 +72,10 @@ class GeneratedPlaylist:
             new_name=self.name,
             new_description=self.config.description,
         )
+
+
+def build_playlists(playlists: Iterable[GeneratedPlaylist]) -> None:
+    """Builds playlists, computing the filters and orders that they share only once."""
+    with shared_results():
+        for playlist in playlists:
+            playlist.build()
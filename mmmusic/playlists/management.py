@@ -1,6 +1,14 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from mmmusic.external.concurrency import map_concurrently
+from mmmusic.external.response_cache import get_response_cache
+from mmmusic.features import ReferenceDistribution
 from mmmusic.log_utils import get_logger
-from mmmusic.models.tracks import get_track
-from mmmusic.shuffling import smart_shuffle
+from mmmusic.models.tracks import TrackID, get_tracks_from_json
+from mmmusic.models.types import TrackListTransformer
+from mmmusic.shuffling import reshuffle, smart_shuffle
+from mmmusic.similarity_index import SimilarityIndex
 from mmmusic.users import User
 from mmmusic.utils import take_x_at_a_time
 
@@ -8,17 +16,37 @@ logger = get_logger()
 
 MAX_TRACKS = 11_000
 
+# What is kept of reshuffled playlists (see reshuffle_playlist) if the response
+# cache, in whose directory it is otherwise saved, is disabled.
+_reshuffle_states: dict[
+    str, tuple[ReferenceDistribution, SimilarityIndex[TrackID]]
+] = {}
 
-def add_tracks_to_playlist(playlist_id, *, tracks, user: User):
-    tracks = [track if isinstance(track, str) else track.id for track in tracks]
+# The most tracks that can be added, removed or replaced in one request.
+MAX_TRACKS_PER_REQUEST = 100
 
-    if len(tracks) > MAX_TRACKS:
-        logger.warning(
-            f"Playlist has {len(tracks):,} tracks. "
-            f"Only the first {MAX_TRACKS:,} will be included."
-        )
 
-    for to_add in take_x_at_a_time(tracks[:MAX_TRACKS], 100):
+@dataclass
+class PlaylistEdits:
+    """The requests that turn a playlist's tracks into others, in order.
+
+    Tracks are removed first, then the remaining tracks are moved into their new
+    order, and then new tracks are inserted where they belong.
+    """
+
+    removals: list[list[TrackID]] = field(default_factory=list)
+    # (range start, insert before, range length), in the order they are made
+    moves: list[tuple[int, int, int]] = field(default_factory=list)
+    # (position, tracks), in the order they are made
+    additions: list[tuple[int, list[TrackID]]] = field(default_factory=list)
+
+    @property
+    def number_of_requests(self) -> int:
+        return len(self.removals) + len(self.moves) + len(self.additions)
+
+
+def add_tracks_to_playlist(playlist_id, *, tracks, user: User):
+    for to_add in take_x_at_a_time(_track_ids_to_include(tracks), 100):
         user.sp.user_playlist_add_tracks(user.username, playlist_id, to_add)
 
 
@@ -37,20 +65,125 @@ def create_playlist(*, public=False, name, description, user: User) -> str:
 
 
 def get_tracks_from_playlist(playlist_id, *, user: User):
-    tracks = []
-
     logger.debug("Getting tracks from playlist %r", playlist_id)
 
-    items = user.sp.playlist_items(playlist_id)
+    pages = _get_playlist_pages(playlist_id, user=user)
+
+    # NOTE: Items are full track objects, so the tracks need not be fetched again.
+    # Unavailable and local tracks (which have no ID) are skipped.
+    return list(
+        get_tracks_from_json(
+            item["track"]
+            for page in pages
+            for item in page["items"]
+            if item["track"] is not None and item["track"]["id"] is not None
+        )
+    )
+
+
+def get_track_ids_from_playlist(playlist_id, *, user: User) -> list[TrackID | None]:
+    """Returns the IDs of the playlist's tracks, in order.
+
+    Unavailable and local tracks (which have no ID) are kept, as None, so that the
+    IDs are at the tracks' positions in the playlist.
+    """
+    logger.debug("Getting track IDs from playlist %r", playlist_id)
+
+    pages = _get_playlist_pages(playlist_id, user=user, fields="total,items(track(id))")
+
+    return [
+        item["track"]["id"] if item["track"] is not None else None
+        for page in pages
+        for item in page["items"]
+    ]
+
+
+def plan_playlist_edits(
+    current_track_ids: list[TrackID | None],
+    new_track_ids: list[TrackID],
+    *,
+    max_requests: int | None = None,
+) -> PlaylistEdits | None:
+    """Plans the requests that turn a playlist's tracks into new ones.
+
+    Returns None if the playlist cannot be edited track by track (i.e., if either
+    list has duplicates, or the playlist has tracks without IDs), or if more than
+    `max_requests` would be needed.
+    """
+    if None in current_track_ids:
+        return None
+
+    current = set(current_track_ids)
+    new = set(new_track_ids)
+
+    if len(current) < len(current_track_ids) or len(new) < len(new_track_ids):
+        return None
+
+    if max_requests is None:
+        max_requests = len(current_track_ids) + len(new_track_ids)
+
+    edits = PlaylistEdits(
+        removals=list(
+            take_x_at_a_time(
+                [track_id for track_id in current_track_ids if track_id not in new],
+                MAX_TRACKS_PER_REQUEST,
+            )
+        )
+    )
+
+    # Runs of new tracks are inserted at their positions, in order, so that each is
+    # inserted after everything before it is in place.
+    position = 0
 
-    while items:
-        tracks.extend(get_track(item["track"]["id"]) for item in items["items"])
-        items = user.sp.next(items)
+    while position < len(new_track_ids):
+        if new_track_ids[position] in current:
+            position += 1
+            continue
 
-        if items:
-            logger.debug("Getting more tracks from playlist %r", playlist_id)
+        end = position
 
-    return tracks
+        while (
+            end < len(new_track_ids)
+            and end - position < MAX_TRACKS_PER_REQUEST
+            and new_track_ids[end] not in current
+        ):
+            end += 1
+
+        edits.additions.append((position, new_track_ids[position:end]))
+
+        position = end
+
+    if edits.number_of_requests > max_requests:
+        return None
+
+    # The remaining tracks are put in order from the front. Wherever the next one
+    # is out of place, it is moved into place with as many of the tracks that
+    # follow it (there, and in the new order) as possible.
+    remaining = [track_id for track_id in current_track_ids if track_id in new]
+    kept = [track_id for track_id in new_track_ids if track_id in current]
+
+    for position, track_id in enumerate(kept):
+        if remaining[position] == track_id:
+            continue
+
+        start = remaining.index(track_id, position + 1)
+        length = 1
+
+        while (
+            start + length < len(remaining)
+            and remaining[start + length] == kept[position + length]
+        ):
+            length += 1
+
+        edits.moves.append((start, position, length))
+
+        if edits.number_of_requests > max_requests:
+            return None
+
+        remaining[position:position] = remaining[start : start + length]
+        del remaining[start + length : start + 2 * length]
+
+    return edits
 
 
 def remove_tracks_from_playlist(playlist_id, *, tracks, user: User):
@@ -69,13 +202,42 @@ def replace_playlist(
     user: User,
     new_name: str | None = None,
     new_description: str | None = None,
-):
-    if not new_description:
-        new_description = None
+) -> int:
+    """Replaces the playlist's tracks, with as few write requests as possible.
+
+    If only a few tracks were added, removed or moved, only those changes are made.
+    Otherwise, the tracks are replaced outright. Returns the number of write
+    requests saved, compared with clearing the playlist and adding every track.
+    """
+    current_track_ids = get_track_ids_from_playlist(playlist_id, user=user)
+    new_track_ids = _track_ids_to_include(new_tracks)
 
-    clear_playlist(playlist_id, user=user)
+    replacement_requests = max(1, _number_of_batches(new_track_ids))
+
+    edits = plan_playlist_edits(
+        current_track_ids, new_track_ids, max_requests=replacement_requests - 1
+    )
 
-    add_tracks_to_playlist(playlist_id, tracks=new_tracks, user=user)
+    if edits is None:
+        # NOTE: Tracks without IDs (e.g., local tracks) are removed as well.
+        _replace_playlist_tracks(playlist_id, track_ids=new_track_ids, user=user)
+        requests = replacement_requests
+    else:
+        _edit_playlist(playlist_id, edits=edits, user=user)
+        requests = edits.number_of_requests
+
+    requests_saved = (
+        _number_of_batches([track_id for track_id in current_track_ids if track_id])
+        + _number_of_batches(new_track_ids)
+        - requests
+    )
+
+    logger.info(
+        "Replaced the tracks of playlist %r with %d write request(s) (%d saved)",
+        playlist_id,
+        requests,
+        requests_saved,
+    )
 
     # NOTE: The Spotify API does not accept null or empty descriptions.
     if not new_description:
@@ -89,10 +251,161 @@ def replace_playlist(
             description=new_description,
         )
 
+    return requests_saved
+
+
+def reshuffle_playlist(playlist_id, *, new_tracks, user: User):
+    """Replaces a shuffled playlist's tracks without shuffling it again.
+
+    Tracks that are still in the playlist keep their order, and new tracks are
+    inserted where they fit best.
+
+    Tracks are scored within the tracks that the playlist had when it was first
+    reshuffled, and their scores are indexed. Both are saved in the response cache's
+    directory (or kept by this process, if the cache is disabled), so that only new
+    tracks are scored when the playlist is reshuffled again.
+    """
+    previous_tracks = get_tracks_from_playlist(playlist_id, user=user)
+
+    state = _load_reshuffle_state(playlist_id)
+
+    if state is None and (tracks := previous_tracks or new_tracks):
+        state = ReferenceDistribution.from_tracks(tracks), SimilarityIndex()
 
-def shuffle_playlist(playlist_id, *, user: User):
+    reference, index = state or (None, None)
+
+    previous_ids = {track.id for track in previous_tracks}
+    new_ids = {track.id for track in new_tracks}
+
+    reshuffled = reshuffle(
+        previous_tracks,
+        added=[track for track in new_tracks if track.id not in previous_ids],
+        removed=[track for track in previous_tracks if track.id not in new_ids],
+        reference=reference,
+        index=index,
+    )
+
+    replace_playlist(playlist_id, new_tracks=reshuffled, user=user)
+
+    if state is not None:
+        _save_reshuffle_state(playlist_id, *state)
+
+
+def shuffle_playlist(
+    playlist_id, *, user: User, shuffle: TrackListTransformer = smart_shuffle
+):
     tracks = get_tracks_from_playlist(playlist_id, user=user)
 
-    shuffled = smart_shuffle(tracks)
+    shuffled = shuffle(tracks)
 
     replace_playlist(playlist_id, new_tracks=shuffled, user=user)
+
+
+def _edit_playlist(playlist_id, *, edits: PlaylistEdits, user: User):
+    for to_remove in edits.removals:
+        user.sp.user_playlist_remove_all_occurrences_of_tracks(
+            user.username, playlist_id, to_remove
+        )
+
+    for range_start, insert_before, range_length in edits.moves:
+        user.sp.user_playlist_reorder_tracks(
+            user.username,
+            playlist_id,
+            range_start=range_start,
+            insert_before=insert_before,
+            range_length=range_length,
+        )
+
+    for position, to_add in edits.additions:
+        user.sp.user_playlist_add_tracks(
+            user.username, playlist_id, to_add, position=position
+        )
+
+
+def _load_reshuffle_state(
+    playlist_id,
+) -> tuple[ReferenceDistribution, SimilarityIndex[TrackID]] | None:
+    if (paths := _reshuffle_state_paths(playlist_id)) is None:
+        return _reshuffle_states.get(playlist_id)
+
+    reference_path, index_path = paths
+
+    if not (reference_path.exists() and index_path.exists()):
+        return None
+
+    return ReferenceDistribution.load(reference_path), SimilarityIndex.load(index_path)
+
+
+def _save_reshuffle_state(
+    playlist_id, reference: ReferenceDistribution, index: SimilarityIndex[TrackID]
+) -> None:
+    if (paths := _reshuffle_state_paths(playlist_id)) is None:
+        _reshuffle_states[playlist_id] = reference, index
+
+        return
+
+    reference_path, index_path = paths
+
+    reference_path.parent.mkdir(parents=True, exist_ok=True)
+
+    reference.save(reference_path)
+    index.save(index_path)
+
+
+def _reshuffle_state_paths(playlist_id) -> tuple[Path, Path] | None:
+    """Returns where a reshuffled playlist's reference and index are saved, if any."""
+    if (cache := get_response_cache()) is None:
+        return None
+
+    directory = cache.directory / "reshuffled_playlists"
+
+    return (
+        directory / f"{playlist_id}.reference.npy",
+        directory / f"{playlist_id}.index.npz",
+    )
+
+
+def _get_playlist_pages(playlist_id, *, user: User, fields: str | None = None):
+    page_size = 100
+
+    first_page = user.sp.playlist_items(playlist_id, fields=fields, limit=page_size)
+
+    if first_page["total"] > page_size:
+        logger.debug("Getting more tracks from playlist %r", playlist_id)
+
+    return [
+        first_page,
+        *map_concurrently(
+            lambda offset: user.sp.playlist_items(
+                playlist_id, fields=fields, limit=page_size, offset=offset
+            ),
+            range(page_size, first_page["total"], page_size),
+        ),
+    ]
+
+
+def _number_of_batches(items: list) -> int:
+    return -(-len(items) // MAX_TRACKS_PER_REQUEST)
+
+
+def _replace_playlist_tracks(playlist_id, *, track_ids: list[TrackID], user: User):
+    # NOTE: The first batch replaces every track at once, so the playlist is never
+    # left empty (or partly cleared) while it is rebuilt.
+    batches = list(take_x_at_a_time(track_ids, MAX_TRACKS_PER_REQUEST)) or [[]]
+
+    user.sp.user_playlist_replace_tracks(user.username, playlist_id, batches[0])
+
+    for to_add in batches[1:]:
+        user.sp.user_playlist_add_tracks(user.username, playlist_id, to_add)
+
+
+def _track_ids_to_include(tracks) -> list[TrackID]:
+    track_ids = [track if isinstance(track, str) else track.id for track in tracks]
+
+    if len(track_ids) > MAX_TRACKS:
+        logger.warning(
+            f"Playlist has {len(track_ids):,} tracks. "
+            f"Only the first {MAX_TRACKS:,} will be included."
+        )
+
+    return track_ids[:MAX_TRACKS]
@@ -1,13 +1,39 @@
+import math
 import random
 
-from mmmusic.features import get_scores_for_tracks, similarity
-from mmmusic.genres import artists_of_genres_matching_pattern
+import numpy as np
+
+from mmmusic.features import (
+    ReferenceDistribution,
+    get_scores_for_tracks,
+    similarities,
+)
+from mmmusic.genre_map import get_genre_map
+from mmmusic.genres import (
+    GenreIndex,
+    get_genre_attributes_for_track,
+    get_genre_index,
+)
 from mmmusic.models.albums import get_album
 from mmmusic.models.artists import Artist, ArtistID, get_artist
-from mmmusic.models.operations import combinable
-from mmmusic.models.tracks import Track, get_track
+from mmmusic.models.operations import (
+    combinable,
+    combinable_filter,
+    combinable_order,
+    take,
+)
+from mmmusic.models.tracks import AUDIO_FEATURE_FIELDS, Track, get_track
 from mmmusic.models.types import TrackListTransformer
 from mmmusic.music_theory import get_spotify_friendly_key, get_spotify_friendly_mode
+from mmmusic.similarity_index import SimilarityIndex
+from mmmusic.track_store import TRACK_STORE_FIELDS, TrackColumns, get_track_columns
+
+# Relative costs of filters' predicates, so that the cheapest are checked first.
+_TRACK_ATTRIBUTE_COST = 1.0
+_AUDIO_FEATURE_COST = 2.0
+_ARTIST_COST = 5.0
+_ALBUM_COST = 5.0
+_GENRE_PATTERN_COST = 20.0
 
 
 def exclude_artists(*artists: Artist | ArtistID) -> TrackListTransformer:
@@ -24,13 +50,11 @@ def exclude_artists(*artists: Artist | ArtistID) -> TrackListTransformer:
         else ", ".join([*artist_names[:-1], f"or {artist_names[-1]}"])
     )
 
-    @combinable(display_name=display_name)
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return [
-            track for track in tracks if not set(track.artist_ids) & artists_to_exclude
-        ]
+    @combinable_filter(display_name=display_name, cost=_TRACK_ATTRIBUTE_COST)
+    def is_not_by_artists(track: Track) -> bool:
+        return not set(track.artist_ids) & artists_to_exclude
 
-    return filter_tracks
+    return is_not_by_artists
 
 
 def filter_by_artist_attribute(
@@ -64,32 +88,63 @@ def filter_by_artist_attribute(
 
     attr_in_range = attr_in_range_inclusive if inclusive else attr_in_range_exclusive
 
-    @combinable(display_name=display_name)
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return [
-            track
-            for track in tracks
-            if all(
-                attr_in_range(get_artist(artist_id)) for artist_id in track.artist_ids
-            )
-        ]  # XXX: any or all?
+    @combinable_filter(display_name=display_name, cost=_ARTIST_COST)
+    def artists_in_range(track: Track) -> bool:
+        return all(
+            attr_in_range(get_artist(artist_id)) for artist_id in track.artist_ids
+        )  # XXX: any or all?
 
-    return filter_tracks
+    return artists_in_range
 
 
 def filter_by_genre_pattern(pattern: str) -> TrackListTransformer:
-    @combinable(display_name=f"genre matches {pattern!r}")
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return [
-            track
-            for track in tracks
-            if artists_of_genres_matching_pattern(
-                pattern,
-                artists=[get_artist(artist_id) for artist_id in track.artist_ids],
-            )
-        ]
+    def genre_mask(indexed_tracks: tuple[GenreIndex, list[Track]]) -> np.ndarray:
+        index, tracks = indexed_tracks
+
+        matching_tracks = index.tracks_matching(pattern)
+
+        return np.fromiter(
+            (track in matching_tracks for track in tracks),
+            dtype=bool,
+            count=len(tracks),
+        )
+
+    @combinable_filter(
+        display_name=f"genre matches {pattern!r}",
+        cost=_GENRE_PATTERN_COST,
+        columns=_index_genres,
+        mask=genre_mask,
+    )
+    def genre_matches(track: Track) -> bool:
+        index = get_genre_index()
+        index.add_tracks([track])
 
-    return filter_tracks
+        return index.any_artist_matches(track.artist_ids, pattern)
+
+    return genre_matches
+
+
+def filter_by_genre_proximity(genre: str, radius: float) -> TrackListTransformer:
+    """Keeps tracks whose genre coordinates lie within radius of a genre's.
+
+    The tracks near the genre are found with the track store's k-d tree, rather
+    than by measuring the distance of every track.
+    """
+    position = get_genre_map().position(genre)
+
+    def genre_proximity_mask(columns: TrackColumns) -> np.ndarray:
+        return columns.genres_within(position, radius)
+
+    @combinable_filter(
+        display_name=f"genre within {radius} of {genre!r}",
+        cost=_TRACK_ATTRIBUTE_COST,
+        columns=get_track_columns,
+        mask=genre_proximity_mask,
+    )
+    def is_near_genre(track: Track) -> bool:
+        return math.dist(get_genre_attributes_for_track(track), position) <= radius
+
+    return is_near_genre
 
 
 def filter_by_number_of_tracks(
@@ -97,9 +152,14 @@ def filter_by_number_of_tracks(
     *,
     randomly_sampled: bool = False,
 ) -> TrackListTransformer:
-    @combinable(display_name=f"no. tracks = {n}")
+    display_name = f"no. tracks = {n}"
+
+    if not randomly_sampled:
+        return take(n, display_name=display_name)
+
+    @combinable(display_name=display_name)
     def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return random.sample(tracks, n) if randomly_sampled else tracks[:n]
+        return random.sample(tracks, n)
 
     return filter_tracks
 
@@ -122,27 +182,39 @@ def filter_by_release_year(
         display_name = f"released after {start_year}"
         end_year = float("inf")
 
-    @combinable(display_name=display_name)
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return [
-            track
-            for track in tracks
-            if start_year <= get_album(track.album_id).release_date.year < end_year
-        ]
+    def release_year_mask(columns: TrackColumns) -> np.ndarray:
+        release_years = columns["release_year"]
 
-    return filter_tracks
+        return (start_year <= release_years) & (release_years < end_year)
+
+    @combinable_filter(
+        display_name=display_name,
+        cost=_ALBUM_COST,
+        columns=get_track_columns,
+        mask=release_year_mask,
+    )
+    def released_in_range(track: Track) -> bool:
+        return start_year <= get_album(track.album_id).release_date.year < end_year
+
+    return released_in_range
 
 
 def filter_by_similarity_to_track(
-    track: Track | str, *, number_of_tracks: int
+    track: Track | str,
+    *,
+    number_of_tracks: int,
+    reference: ReferenceDistribution | None = None,
 ) -> TrackListTransformer:
     seed = get_track(track)
 
-    return combinable(
-        order_by_similarity_to_track(seed)
-        & filter_by_number_of_tracks(number_of_tracks),
-        display_name=f"{number_of_tracks} tracks most similar to '{seed.name}'",
-    )
+    @combinable(display_name=f"{number_of_tracks} tracks most similar to '{seed.name}'")
+    def filter_tracks(tracks: list[Track]) -> list[Track]:
+        scores = get_scores_for_tracks([*tracks, seed], reference=reference)
+
+        # Only the most similar tracks are needed, so the tracks are not fully sorted.
+        return SimilarityIndex(scores).top_k([seed], number_of_tracks, tracks)
+
+    return filter_tracks
 
 
 def filter_by_track_attribute(
@@ -176,11 +248,20 @@ def filter_by_track_attribute(
 
     attr_in_range = attr_in_range_inclusive if inclusive else attr_in_range_exclusive
 
-    @combinable(display_name=display_name)
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return [track for track in tracks if attr_in_range(track)]
+    if attr not in TRACK_STORE_FIELDS or attr not in Track.model_fields:
+        return combinable_filter(display_name=display_name, cost=_TRACK_ATTRIBUTE_COST)(
+            attr_in_range
+        )
 
-    return filter_tracks
+    def attr_mask(columns: TrackColumns) -> np.ndarray:
+        return _in_range(columns[attr], lower_bound, upper_bound, inclusive=inclusive)
+
+    return combinable_filter(
+        display_name=display_name,
+        cost=_TRACK_ATTRIBUTE_COST,
+        columns=get_track_columns,
+        mask=attr_mask,
+    )(attr_in_range)
 
 
 def filter_by_audio_feature(
@@ -214,56 +295,114 @@ def filter_by_audio_feature(
 
     attr_in_range = attr_in_range_inclusive if inclusive else attr_in_range_exclusive
 
-    @combinable(display_name=display_name)
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return [track for track in tracks if attr_in_range(track)]
+    if feature not in AUDIO_FEATURE_FIELDS:
+        return combinable_filter(display_name=display_name, cost=_AUDIO_FEATURE_COST)(
+            attr_in_range
+        )
 
-    return filter_tracks
+    def feature_mask(columns: TrackColumns) -> np.ndarray:
+        return columns.has_audio_features & _in_range(
+            columns[feature], lower_bound, upper_bound, inclusive=inclusive
+        )
+
+    return combinable_filter(
+        display_name=display_name,
+        cost=_AUDIO_FEATURE_COST,
+        columns=get_track_columns,
+        mask=feature_mask,
+    )(attr_in_range)
 
 
 def filter_by_key(key: str) -> TrackListTransformer:
     spotify_friendly_key = get_spotify_friendly_key(key)
 
-    @combinable(display_name=f"key is {key}")
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return [track for track in tracks if track["key"] == spotify_friendly_key]
+    def key_mask(columns: TrackColumns) -> np.ndarray:
+        return columns.has_audio_features & (columns["key"] == spotify_friendly_key)
 
-    return filter_tracks
+    @combinable_filter(
+        display_name=f"key is {key}",
+        cost=_AUDIO_FEATURE_COST,
+        columns=get_track_columns,
+        mask=key_mask,
+    )
+    def is_in_key(track: Track) -> bool:
+        return track["key"] == spotify_friendly_key
+
+    return is_in_key
 
 
 def filter_by_mode(mode: str) -> TrackListTransformer:
     spotify_friendly_mode = get_spotify_friendly_mode(mode)
 
-    @combinable(display_name=f"mode is {mode}")
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        return [track for track in tracks if track["mode"] == spotify_friendly_mode]
+    def mode_mask(columns: TrackColumns) -> np.ndarray:
+        return columns.has_audio_features & (columns["mode"] == spotify_friendly_mode)
 
-    return filter_tracks
+    @combinable_filter(
+        display_name=f"mode is {mode}",
+        cost=_AUDIO_FEATURE_COST,
+        columns=get_track_columns,
+        mask=mode_mask,
+    )
+    def is_in_mode(track: Track) -> bool:
+        return track["mode"] == spotify_friendly_mode
 
+    return is_in_mode
 
-@combinable(display_name="ordered by popularity")
-def order_by_popularity(tracks: list[Track]) -> list[Track]:
-    return sorted(
-        tracks,
-        key=lambda track: track.popularity,
-        reverse=True,
-    )
 
+@combinable_order(display_name="ordered by popularity", reverse=True)
+def order_by_popularity(tracks: list[Track]) -> list[int]:
+    return [track.popularity for track in tracks]
 
-def order_by_similarity_to_track(track: Track | str) -> TrackListTransformer:
+
+def order_by_similarity_to_track(
+    track: Track | str, *, reference: ReferenceDistribution | None = None
+) -> TrackListTransformer:
+    """Orders tracks by similarity to a track.
+
+    Similarity is measured by the tracks' scores, which are ranked within
+    `reference` if given (and reused between calls), or within the tracks otherwise.
+    """
     seed = get_track(track)
 
-    @combinable(display_name=f"ordered by similarity to '{seed.name}'")
-    def filter_tracks(tracks: list[Track]) -> list[Track]:
-        scores = get_scores_for_tracks([*tracks, seed])
+    @combinable_order(
+        display_name=f"ordered by similarity to '{seed.name}'", reverse=True
+    )
+    def similarities_to_seed(tracks: list[Track]) -> list[float]:
+        scores = get_scores_for_tracks([*tracks, seed], reference=reference)
 
-        similarities: dict[Track, float] = {
-            track: similarity(scores[track], scores[seed]) for track in tracks
-        }
+        # NOTE: Tracks whose similarity is undefined are ordered last.
+        return np.nan_to_num(
+            similarities(scores[seed], [scores[track] for track in tracks]),
+            nan=-np.inf,
+        ).tolist()
 
-        return sorted(tracks, key=similarities.get, reverse=True)
+    return similarities_to_seed
 
-    return filter_tracks
+
+def _index_genres(tracks: list[Track]) -> tuple[GenreIndex, list[Track]]:
+    index = get_genre_index()
+    index.add_tracks(tracks)
+
+    return index, tracks
+
+
+def _in_range(
+    values: np.ndarray,
+    lower_bound: int | float,
+    upper_bound: int | float,
+    *,
+    inclusive: bool,
+) -> np.ndarray:
+    # NOTE: Bounds are compared at the precision of the values, which may have been
+    # stored at less than that of the bounds.
+    if np.issubdtype(values.dtype, np.floating):
+        lower_bound = values.dtype.type(lower_bound)
+        upper_bound = values.dtype.type(upper_bound)
+
+    if inclusive:
+        return (lower_bound <= values) & (values <= upper_bound)
+
+    return (lower_bound < values) & (values < upper_bound)
 
 
 def _construct_display_name_for_bounded_feature(
@@ -1,97 +1,255 @@
-from collections import Counter
-from typing import Optional
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable, Iterator
+import math
+import time
+from typing import Any, Generic, Optional, TypeVar
 
 import numpy as np
-
-from mmmusic.features import get_scores_for_tracks, similarity
+from scipy.spatial import KDTree
+
+from mmmusic.features import (
+    ReferenceDistribution,
+    get_scores_for_tracks,
+    normalize_rows,
+)
+from mmmusic.log_utils import get_logger
+from mmmusic.models.artists import ArtistID
 from mmmusic.models.operations import combinable
-from mmmusic.models.tracks import Track, get_track
-from mmmusic.models.types import Item, ItemPicker, Items, SeedPicker
+from mmmusic.models.tracks import Track, TrackID, get_track
+from mmmusic.models.types import (
+    Item,
+    ItemPicker,
+    Items,
+    SeedPicker,
+    TrackListTransformer,
+)
+from mmmusic.similarity_index import SimilarityIndex
+
+logger = get_logger()
+
+S = TypeVar("S")
+
+DEFAULT_SMOOTHING_TIME_BUDGET = 1.0  # seconds
+
+# Neighbors of each track that are considered when building and smoothing paths.
+_NEIGHBORS_CONSIDERED = 8
+_MAX_NEIGHBORS_SEARCHED = 256
+# The most trees of tracks by other artists (than some track's) that are kept.
+_MAX_OTHER_ARTISTS_TREES = 4
+# Neighbors found may be up to (1 + this) times as far as the true nearest neighbors.
+_NEIGHBOR_APPROXIMATION = 1.0
+
+# Random number generators (or seeds for them) that shuffles may be given.
+RandomState = np.random.Generator | int | None
 
 _shuffle = np.random.default_rng().shuffle
 
 
+def _get_shuffle(rng: RandomState) -> Callable[[list], None]:
+    """Returns the shuffle of the given generator (or seed), or the module's."""
+    return _shuffle if rng is None else np.random.default_rng(rng).shuffle
+
+
 def quick_pick(  # TODO: separate
     items: Items,
     add_to_left: ItemPicker,
     seed_picker: Optional[SeedPicker] = None,
     left_neighbor: Optional[Item] = None,
+    *,
+    rng: RandomState = None,
 ) -> Items:
-    items = list(items)
+    """Orders items by splitting them in two with add_to_left, then splitting each half.
 
-    if len(items) < 2:
-        return items
-    _shuffle(items)
+    Halves are split depth-first from an explicit stack, by partitioning a single
+    list of the items in place. The right half of each split is ordered to follow on
+    from the last item of the (already ordered) left half. Splitting is fastest when
+    the items are small integers (such as positions in another sequence).
 
-    if seed_picker is None:
-        left_seed, right_seed = items[:2]
-    else:
-        left_seed, right_seed = seed_picker(items, left_neighbor=left_neighbor)
-    left = [left_seed]
-    right = [right_seed]
+    Each half is shuffled by `rng` before it is split, so a seeded generator (or a
+    seed) makes the order reproducible.
+    """
+    shuffle = _get_shuffle(rng)
+
+    order = list(items)
+
+    # Segments of order that are yet to be split, and whether they have a left
+    # neighbor. (Every segment other than the first follows the one before it.)
+    stack = [(0, len(order), left_neighbor is not None)]
 
-    items.remove(left_seed)
-    items.remove(right_seed)
+    while stack:
+        start, stop, has_left_neighbor = stack.pop()
 
-    for item in items:
-        if add_to_left(left, right, item, items):
-            left.append(item)
+        if stop - start < 2:
+            continue
+
+        segment = order[start:stop]
+        shuffle(segment)
+
+        if not has_left_neighbor:
+            segment_left_neighbor = None
+        elif start == 0:
+            segment_left_neighbor = left_neighbor
         else:
-            right.append(item)
-    # If left_neighbor would not belong to left, then swap left and right.
-    if left_neighbor is not None and not add_to_left(left, right, left_neighbor, items):
-        left, right = right, left
-    new_left = quick_pick(left, add_to_left, seed_picker=seed_picker)
-    new_right = quick_pick(
-        right, add_to_left, seed_picker=seed_picker, left_neighbor=new_left[-1]
-    )
+            segment_left_neighbor = order[start - 1]
+
+        if seed_picker is None:
+            left_seed, right_seed = segment[:2]
+        else:
+            left_seed, right_seed = seed_picker(
+                segment, left_neighbor=segment_left_neighbor
+            )
+        left = [left_seed]
+        right = [right_seed]
+
+        segment.remove(left_seed)
+        segment.remove(right_seed)
+
+        for item in segment:
+            if add_to_left(left, right, item, segment):
+                left.append(item)
+            else:
+                right.append(item)
+        # If left_neighbor would not belong to left, then swap left and right.
+        if segment_left_neighbor is not None and not add_to_left(
+            left, right, segment_left_neighbor, segment
+        ):
+            left, right = right, left
+
+        middle = start + len(left)
+
+        order[start:middle] = left
+        order[middle:stop] = right
+
+        # NOTE: The right half is pushed first, so that the left half is ordered
+        # before the right half needs its last item.
+        stack.append((middle, stop, True))
+        stack.append((start, middle, False))
+
+    return order
+
+
+class _RunningSummary(Generic[S]):
+    """Keeps a summary of a list up to date as items are appended to it.
+
+    Only the items appended since the last call are folded into the summary. It is
+    recomputed from scratch whenever a different (or a shrunken) list is given.
+    """
+
+    def __init__(self, initial: Callable[[], S], fold: Callable[[S, Item], S]):
+        self._initial = initial
+        self._fold = fold
+
+        self._items: Items | None = None
+        self._count = 0
+        self._summary = initial()
 
-    return new_left + new_right
+    def __call__(self, items: Items) -> S:
+        count = len(items)
+
+        if items is self._items and count == self._count:
+            return self._summary
+
+        if items is not self._items or count < self._count:
+            self._items = items
+            self._count = 0
+            self._summary = self._initial()
+
+        for item in items[self._count :]:
+            self._summary = self._fold(self._summary, item)
+
+        self._count = count
+
+        return self._summary
+
+
+def _score_matrix(tracks: list[Track]) -> np.ndarray:
+    """Returns the scores of the tracks as rows, in the order of the tracks."""
+    scores = get_scores_for_tracks(tracks)
+
+    return np.array([scores[track] for track in tracks], dtype=float).reshape(
+        len(tracks), -1 if tracks else 0
+    )
 
 
 def _story_picker(tracks: list[Track]) -> ItemPicker:
-    values = get_scores_for_tracks(tracks)
+    """Picks sides for positions in tracks so as to maximize polarity."""
+    # NOTE: Plain lists of floats, since math.sumprod is much faster than NumPy for
+    # vectors this short.
+    values = _score_matrix(tracks).tolist()
+    squared_norms = [math.sumprod(value, value) for value in values]
+
+    dimensions = len(values[0]) if values else 0
+
+    def start_sum() -> tuple[list[float], float]:
+        return [0.0] * dimensions, 0.0
+
+    def add_to_sum(
+        sum_: tuple[list[float], float], position: int
+    ) -> tuple[list[float], float]:
+        total, squared_norm = sum_
+        value = values[position]
+
+        return (
+            [x + y for x, y in zip(total, value, strict=True)],
+            squared_norm + 2 * math.sumprod(total, value) + squared_norms[position],
+        )
+
+    left_sum = _RunningSummary(start_sum, add_to_sum)
+    right_sum = _RunningSummary(start_sum, add_to_sum)
 
     def picker(
-        left: list[Track], right: list[Track], to_add: Track, items: list[Track]
+        left: list[int], right: list[int], to_add: int, items: list[int]
     ) -> bool:
         # maximize polarity
-        left_values = [values[x] for x in left]
-        right_values = [values[x] for x in right]
-
-        left = np.average(left_values, axis=0)
-        left_with_new = np.average(np.vstack((left_values, values[to_add])), axis=0)
-        right = np.average(right_values, axis=0)
-        right_with_new = np.average(np.vstack((right_values, values[to_add])), axis=0)
+        # NOTE: Cosine similarity is scale-invariant, so the sums of the sides can
+        # stand in for their averages, and the similarities that adding the new
+        # value to either side would give follow from a few dot products.
+        left_total, left_left = left_sum(left)
+        right_total, right_right = right_sum(right)
+        new = values[to_add]
+        new_new = squared_norms[to_add]
+
+        left_right = math.sumprod(left_total, right_total)
+        left_new = math.sumprod(left_total, new)
+        right_new = math.sumprod(right_total, new)
+
+        similarity_if_added_to_left = (left_right + right_new) / math.sqrt(
+            (left_left + 2 * left_new + new_new) * right_right
+        )
+        similarity_if_added_to_right = (left_right + left_new) / math.sqrt(
+            left_left * (right_right + 2 * right_new + new_new)
+        )
 
-        return similarity(left_with_new, right) < similarity(left, right_with_new)
+        return similarity_if_added_to_left < similarity_if_added_to_right
 
     return picker
 
 
-def _artists_of_tracks(tracks: list[Track]) -> dict[Track, int]:
-    """Identifies artists of tracks and counts each artist's appearances."""
-    artists: Counter[Track] = Counter()
-    for track in tracks:
-        artists.update(track.artist_ids)
-    return artists
-
-
 def _radio_picker(tracks: list[Track]) -> ItemPicker:
+    """Picks sides for positions in tracks so as to spread out each artist's tracks."""
     story_picker = _story_picker(tracks)
 
+    artist_ids = [set(track.artist_ids) for track in tracks]
+
+    def count_artists(artists: Counter[ArtistID], position: int) -> Counter[ArtistID]:
+        for artist in artist_ids[position]:
+            artists[artist] += 1
+        return artists
+
+    left_artists = _RunningSummary(Counter, count_artists)
+    right_artists = _RunningSummary(Counter, count_artists)
+
     def picker(
-        left: list[Track], right: list[Track], to_add: Track, items: list[Track]
+        left: list[int], right: list[int], to_add: int, items: list[int]
     ) -> bool:
+        artists_in_left = left_artists(left)
+        artists_in_right = right_artists(right)
+
         num_mutual_artists_in_left = sum(
-            counts
-            for artist, counts in _artists_of_tracks(left).items()
-            if artist in to_add.artist_ids
+            map(artists_in_left.__getitem__, artist_ids[to_add])
         )
         num_mutual_artists_in_right = sum(
-            counts
-            for artist, counts in _artists_of_tracks(right).items()
-            if artist in to_add.artist_ids
+            map(artists_in_right.__getitem__, artist_ids[to_add])
         )
 
         # If one side has fewer of to_add's artists, add to that side.
@@ -105,23 +263,24 @@ def _radio_picker(tracks: list[Track]) -> ItemPicker:
 
 
 def _smart_seed_picker(tracks: list[Track]) -> SeedPicker:
-    values = get_scores_for_tracks(tracks)
+    """Picks seeds from positions in tracks.
+
+    Scores are normalized once, up front, so that the similarities of every
+    candidate to the left neighbor (or left seed) are a single matrix-vector product.
+    """
+    unit_values = normalize_rows(_score_matrix(tracks))
+
+    def picker(items: list[int], left_neighbor: int | None) -> tuple[int, int]:
+        candidates = unit_values[items]
 
-    def picker(
-        items: list[Track], left_neighbor: Optional[Track]
-    ) -> tuple[Track, Track]:
         if left_neighbor is None:
             left_seed = items[0]
         else:
             # Pick item most similar to left neighbor
-            neighbor_value = values[left_neighbor]
-            left_seed = max(
-                items, key=lambda item: similarity(neighbor_value, values[item])
-            )
+            left_seed = items[np.argmax(candidates @ unit_values[left_neighbor])]
 
         # Pick item least similar to left seed
-        left_value = values[left_seed]
-        right_seed = min(items, key=lambda item: similarity(left_value, values[item]))
+        right_seed = items[np.argmin(candidates @ unit_values[left_seed])]
 
         return left_seed, right_seed
 
@@ -129,15 +288,593 @@ def _smart_seed_picker(tracks: list[Track]) -> SeedPicker:
 
 
 @combinable(display_name="smart shuffled")
-def smart_shuffle(tracks: list[Track], *, picker_factory=None) -> list[Track]:
+def smart_shuffle(
+    tracks: list[Track], *, picker_factory=None, rng: RandomState = None
+) -> list[Track]:
     tracks = list(tracks)
 
     picker_factory = _radio_picker if picker_factory is None else picker_factory
 
+    # NOTE: Pickers are given positions in tracks, rather than the tracks themselves.
     picker = picker_factory(tracks)
     seed_picker = _smart_seed_picker(tracks)
 
-    return quick_pick(tracks, picker, seed_picker=seed_picker)
+    positions = quick_pick(range(len(tracks)), picker, seed_picker=seed_picker, rng=rng)
+
+    return [tracks[position] for position in positions]
+
+
+def _insertion_fit(
+    index: SimilarityIndex[TrackID],
+    track: Track,
+    before: Track | None,
+    after: Track | None,
+) -> tuple[bool, float]:
+    """Rates a gap for a track, preferring gaps between other artists' tracks."""
+    neighbors = [neighbor for neighbor in (before, after) if neighbor is not None]
+
+    by_other_artists = not any(
+        set(track.artist_ids) & set(neighbor.artist_ids) for neighbor in neighbors
+    )
+
+    # NOTE: How much more similar the track is to its new neighbors than they were
+    # to each other.
+    fit = float(
+        index.similarities([track.id], [neighbor.id for neighbor in neighbors]).sum()
+    )
+
+    if before is not None and after is not None:
+        fit -= float(index.similarities([before.id], [after.id])[0])
+
+    return by_other_artists, fit
+
+
+def reshuffle(
+    previous_order: list[Track],
+    *,
+    added: Iterable[Track] = (),
+    removed: Iterable[Track] = (),
+    reference: ReferenceDistribution | None = None,
+    index: SimilarityIndex[TrackID] | None = None,
+    rng: RandomState = None,
+) -> list[Track]:
+    """Updates a shuffled order, rather than shuffling every track again.
+
+    Removed tracks are dropped, and each added track is inserted into the gap that
+    fits it best: (as in radio mode) between tracks by other artists where possible,
+    and (as in story mode) where it is most similar to the tracks on either side,
+    relative to how similar those were to each other. Only the gaps next to the
+    tracks most similar to each added track are considered.
+
+    `index` may hold the vectors (scores) of the previous order's tracks, e.g. from
+    an earlier reshuffle, within `reference`. It is updated in place: removed tracks
+    are dropped, and only tracks it does not hold are scored and added. Similar
+    tracks are then found among a few clusters of the index (see
+    `SimilarityIndex.nearest`), so that, besides walking the order, the work grows
+    with the number of changes rather than with the length of the order. Without
+    an index, every track is scored and indexed.
+    """
+    removed_ids = {track.id for track in removed}
+
+    # NOTE: Repeated tracks are kept only where they first appear.
+    order = list(
+        {
+            track.id: track for track in previous_order if track.id not in removed_ids
+        }.values()
+    )
+
+    placed = {track.id: track for track in order}
+    added = list(
+        {track.id: track for track in added if track.id not in placed}.values()
+    )
+
+    if index is None:
+        index = SimilarityIndex()
+    else:
+        index.remove([track_id for track_id in index if track_id not in placed])
+
+    if not added:
+        return order
+
+    if not order:
+        return smart_shuffle(added, rng=rng)
+
+    if unindexed := [track for track in (*order, *added) if track.id not in index]:
+        scores = get_scores_for_tracks(unindexed, reference=reference)
+
+        index.add(
+            dict(
+                zip(
+                    (track.id for track in unindexed),
+                    np.nan_to_num(np.array([scores[track] for track in unindexed])),
+                    strict=True,
+                )
+            )
+        )
+
+    # The order, as a doubly linked list (by track ID), so that insertions take
+    # constant time.
+    preceding: dict[TrackID, Track | None] = dict(
+        zip(placed, [None, *order[:-1]], strict=True)
+    )
+    following: dict[TrackID, Track | None] = dict(
+        zip(placed, [*order[1:], None], strict=True)
+    )
+    first = order[0]
+
+    for track in added:
+        # NOTE: The most similar tracks may include added tracks that are yet to be
+        # placed, so enough are found to leave the nearest placed tracks.
+        nearest_placed = [
+            placed[other_id]
+            for other_id in index.nearest(track.id, _NEIGHBORS_CONSIDERED + len(added))
+            if other_id in placed
+        ][:_NEIGHBORS_CONSIDERED]
+
+        gaps = dict.fromkeys(
+            gap
+            for other in nearest_placed
+            for gap in ((preceding[other.id], other), (other, following[other.id]))
+        )
+
+        before, after = max(gaps, key=lambda gap: _insertion_fit(index, track, *gap))
+
+        preceding[track.id] = before
+        following[track.id] = after
+        placed[track.id] = track
+
+        if before is None:
+            first = track
+        else:
+            following[before.id] = track
+
+        if after is not None:
+            preceding[after.id] = track
+
+    reshuffled = [first]
+
+    while (next_track := following[reshuffled[-1].id]) is not None:
+        reshuffled.append(next_track)
+
+    return reshuffled
+
+
+def _unit_score_matrix(tracks: list[Track]) -> np.ndarray:
+    # NOTE: Scores are missing (NaN) for every track or for none, so zeroing them
+    # leaves the distances between tracks unchanged.
+    return normalize_rows(np.nan_to_num(_score_matrix(tracks)))
+
+
+def transition_smoothness(tracks: list[Track]) -> float:
+    """Returns the mean similarity of each pair of consecutive tracks (from -1 to 1)."""
+    if len(tracks) < 2:
+        return float("nan")
+
+    unit_values = _unit_score_matrix(tracks)
+
+    return float(np.einsum("ij,ij->i", unit_values[:-1], unit_values[1:]).mean())
+
+
+def same_artist_adjacency(tracks: list[Track]) -> float:
+    """Returns the fraction of pairs of consecutive tracks that share an artist."""
+    if len(tracks) < 2:
+        return float("nan")
+
+    return sum(
+        not set(track.artist_ids).isdisjoint(next_track.artist_ids)
+        for track, next_track in zip(tracks, tracks[1:], strict=False)
+    ) / (len(tracks) - 1)
+
+
+def _nearest_neighbors(unit_values: np.ndarray) -> list[list[int]]:
+    """Returns (approximately) the nearest neighbors of each position, nearest first.
+
+    Each position's neighbors may include the position itself.
+    """
+    _, neighbors = KDTree(unit_values).query(
+        unit_values,
+        k=min(_NEIGHBORS_CONSIDERED + 1, len(unit_values)),
+        eps=_NEIGHBOR_APPROXIMATION,
+    )
+
+    return neighbors.reshape(len(unit_values), -1).tolist()
+
+
+def _greedy_path(
+    unit_values: np.ndarray,
+    artist_ids: list[set[ArtistID]],
+    neighbors: list[list[int]],
+    *,
+    start: int,
+) -> list[int]:
+    """Chains positions, always moving to the nearest unvisited position.
+
+    Positions by any of the current position's artists are skipped, unless every
+    unvisited position is by one of them. If there are none by other artists among
+    the nearest `_MAX_NEIGHBORS_SEARCHED`, the nearest by other artists is found
+    with a tree of only their positions.
+    """
+    unvisited = np.ones(len(unit_values), dtype=bool)
+    unvisited[start] = False
+
+    positions_by_artist = _positions_by_artist(artist_ids)
+
+    # Trees of the positions by other artists than the current position's, built
+    # (for the artists of dense clusters) when needed, and rebuilt whenever most of
+    # their positions have been visited.
+    other_artists_trees: dict[
+        frozenset[ArtistID], tuple[KDTree | None, np.ndarray]
+    ] = {}
+
+    def find_nearest_by_other_artists(current: int) -> int | None:
+        key = frozenset(artist_ids[current])
+
+        other_tree, other_positions = other_artists_trees.get(key, (None, None))
+
+        if other_positions is None or (
+            len(other_positions)
+            and 2 * np.count_nonzero(unvisited[other_positions]) < len(other_positions)
+        ):
+            candidates = unvisited.copy()
+
+            for artist_id in key:
+                candidates[positions_by_artist[artist_id]] = False
+
+            other_positions = np.flatnonzero(candidates)
+            other_tree = (
+                KDTree(unit_values[other_positions]) if len(other_positions) else None
+            )
+
+            _remember(other_artists_trees, key, (other_tree, other_positions))
+
+        if other_tree is None:
+            return None
+
+        k = min(_NEIGHBORS_CONSIDERED, len(other_positions))
+
+        while True:
+            _, found = other_tree.query(
+                unit_values[current], k=k, eps=_NEIGHBOR_APPROXIMATION
+            )
+
+            for position in other_positions[np.atleast_1d(found)].tolist():
+                if unvisited[position]:
+                    return position
+
+            if k == len(other_positions):
+                return None
+
+            k = min(2 * k, len(other_positions))
+
+    # NOTE: Built only once a position's nearest neighbors have all been visited,
+    # then rebuilt whenever most of its positions have been visited.
+    tree: KDTree | None = None
+    tree_positions = np.arange(0)
+
+    def find_nearest(
+        current: int, candidates: Iterable[int]
+    ) -> tuple[int | None, int | None]:
+        """Finds the nearest unvisited candidates, and the nearest by other artists."""
+        nearest = None
+
+        for position in candidates:
+            if not unvisited[position]:
+                continue
+
+            if not artist_ids[position] & artist_ids[current]:
+                return (position if nearest is None else nearest), position
+
+            if nearest is None:
+                nearest = position
+
+        return nearest, None
+
+    path = [start]
+
+    for number_unvisited in range(len(unit_values) - 1, 0, -1):
+        current = path[-1]
+
+        nearest, nearest_by_other_artists = find_nearest(current, neighbors[current])
+
+        if nearest_by_other_artists is None:
+            if tree is None or 2 * number_unvisited < len(tree_positions):
+                tree_positions = np.flatnonzero(unvisited)
+                tree = KDTree(unit_values[tree_positions])
+
+            k = min(2 * _NEIGHBORS_CONSIDERED, len(tree_positions))
+
+            while True:
+                _, found = tree.query(
+                    unit_values[current], k=k, eps=_NEIGHBOR_APPROXIMATION
+                )
+                nearest_in_tree, nearest_by_other_artists = find_nearest(
+                    current, tree_positions[np.atleast_1d(found)].tolist()
+                )
+
+                if nearest is None:
+                    nearest = nearest_in_tree
+
+                if (
+                    nearest_by_other_artists is not None
+                    or (nearest is not None and k >= _MAX_NEIGHBORS_SEARCHED)
+                    or k == len(tree_positions)
+                ):
+                    break
+
+                k = min(2 * k, len(tree_positions))
+
+            if nearest_by_other_artists is None:
+                nearest_by_other_artists = find_nearest_by_other_artists(current)
+
+        next_position = (
+            nearest if nearest_by_other_artists is None else nearest_by_other_artists
+        )
+
+        unvisited[next_position] = False
+        path.append(next_position)
+
+    return path
+
+
+def _positions_by_artist(
+    artist_ids: list[set[ArtistID]],
+) -> dict[ArtistID, list[int]]:
+    positions_by_artist = defaultdict(list)
+
+    for position, position_artist_ids in enumerate(artist_ids):
+        for artist_id in position_artist_ids:
+            positions_by_artist[artist_id].append(position)
+
+    return positions_by_artist
+
+
+def _remember(trees: dict[S, Any], key: S, tree: Any) -> None:
+    # NOTE: Only the most recently built trees are kept, since each may hold most of
+    # the tracks.
+    trees.pop(key, None)
+
+    if len(trees) >= _MAX_OTHER_ARTISTS_TREES:
+        del trees[next(iter(trees))]
+
+    trees[key] = tree
+
+
+def _separate_artists(
+    path: list[int],
+    unit_values: np.ndarray,
+    artist_ids: list[set[ArtistID]],
+    neighbors: list[list[int]],
+) -> list[int]:
+    """Moves positions that follow one by the same artist to where they fit best.
+
+    Greedy paths use up the other artists first, so they end in runs of the most
+    common artists. Each position in a run is moved between two positions by other
+    artists (at most one to each gap), where it adds the least distance, unless
+    there is no such gap left.
+    """
+    kept: list[int] = []
+    moved: list[tuple[int, int]] = []  # (position, gap where it was)
+
+    for position in path:
+        if kept and artist_ids[position] & artist_ids[kept[-1]]:
+            moved.append((position, len(kept)))
+        else:
+            kept.append(position)
+
+    if not moved:
+        return path
+
+    index_of = {position: index for index, position in enumerate(kept)}
+    kept_positions = np.array(kept)
+    positions_by_artist = _positions_by_artist(artist_ids)
+
+    # NOTE: Gap g is before kept[g] (and after kept[g - 1]).
+    used = np.zeros(len(kept) + 1, dtype=bool)
+    inserted: dict[int, list[int]] = defaultdict(list)
+
+    # Trees of the kept positions by artists other than those of moved positions.
+    other_artists_trees: dict[
+        frozenset[ArtistID], tuple[KDTree | None, np.ndarray]
+    ] = {}
+
+    def distance(x: int, y: int) -> float:
+        return 1.0 - float(unit_values[x] @ unit_values[y])
+
+    def added_distance(position: int, gap: int) -> float | None:
+        """Returns the distance that the position adds in the gap, if it may go there."""
+        if used[gap]:
+            return None
+
+        ends = [kept[index] for index in (gap - 1, gap) if 0 <= index < len(kept)]
+
+        if any(artist_ids[end] & artist_ids[position] for end in ends):
+            return None
+
+        added = sum(distance(end, position) for end in ends)
+
+        if len(ends) == 2:
+            added -= distance(*ends)
+
+        return added
+
+    def best_gap(position: int, gaps: Iterable[int]) -> int | None:
+        costs = {
+            gap: cost
+            for gap in set(gaps)
+            if (cost := added_distance(position, gap)) is not None
+        }
+
+        return min(costs, key=costs.__getitem__) if costs else None
+
+    def gaps_around(positions: Iterable[int]) -> Iterator[int]:
+        for position in positions:
+            if position in index_of:
+                yield index_of[position]
+                yield index_of[position] + 1
+
+    def find_gap(position: int) -> int | None:
+        if (gap := best_gap(position, gaps_around(neighbors[position]))) is not None:
+            return gap
+
+        key = frozenset(artist_ids[position])
+
+        if key in other_artists_trees:
+            tree, others = other_artists_trees[key]
+        else:
+            is_by_others = np.ones(len(unit_values), dtype=bool)
+
+            for artist_id in key:
+                is_by_others[positions_by_artist[artist_id]] = False
+
+            others = kept_positions[is_by_others[kept_positions]]
+            tree = KDTree(unit_values[others]) if len(others) else None
+
+            _remember(other_artists_trees, key, (tree, others))
+
+        if tree is None:
+            return None
+
+        k = min(_NEIGHBORS_CONSIDERED, len(others))
+
+        while True:
+            _, found = tree.query(
+                unit_values[position], k=k, eps=_NEIGHBOR_APPROXIMATION
+            )
+
+            gap = best_gap(position, gaps_around(others[np.atleast_1d(found)].tolist()))
+
+            if gap is not None or k == len(others):
+                return gap
+
+            k = min(2 * k, len(others))
+
+    for position, previous_gap in moved:
+        gap = find_gap(position)
+
+        if gap is None:
+            gap = previous_gap
+        else:
+            used[gap] = True
+
+        inserted[gap].append(position)
+
+    separated = []
+
+    for gap, kept_position in enumerate(kept):
+        separated.extend(inserted[gap])
+        separated.append(kept_position)
+
+    separated.extend(inserted[len(kept)])
+
+    return separated
+
+
+def _two_opt(
+    path: list[int],
+    unit_values: np.ndarray,
+    artist_ids: list[set[ArtistID]],
+    neighbors: list[list[int]],
+    *,
+    deadline: float,
+) -> list[int]:
+    """Shortens a path by reversing sections of it, until the deadline passes.
+
+    Only the sections that would join a position to one of its nearest neighbors
+    are tried, and no reversal may make two tracks by one artist adjacent.
+    """
+    n = len(path)
+
+    path = np.array(path)
+    index_of = np.empty(n, dtype=np.intp)
+    index_of[path] = np.arange(n)
+
+    def distance(x: int, y: int) -> float:
+        return 1.0 - float(unit_values[x] @ unit_values[y])
+
+    improved = True
+
+    while improved and time.perf_counter() < deadline:
+        improved = False
+
+        for i in range(n - 2):
+            if i % 256 == 0 and time.perf_counter() >= deadline:
+                break
+
+            a, b = path[i], path[i + 1]
+
+            for c in neighbors[a]:
+                j = index_of[c]
+
+                if j <= i + 1 or artist_ids[a] & artist_ids[c]:
+                    continue
+
+                # Reversing path[i + 1 : j + 1] replaces the edges a-b and c-d with
+                # a-c and b-d.
+                change = distance(a, c) - distance(a, b)
+
+                if j + 1 < n:
+                    d = path[j + 1]
+
+                    if artist_ids[b] & artist_ids[d]:
+                        continue
+
+                    change += distance(b, d) - distance(c, d)
+
+                if change < -1e-9:
+                    path[i + 1 : j + 1] = path[i + 1 : j + 1][::-1]
+                    index_of[path[i + 1 : j + 1]] = np.arange(i + 1, j + 1)
+                    improved = True
+                    break
+
+    return path.tolist()
+
+
+def smooth_shuffle(
+    *, time_budget: float = DEFAULT_SMOOTHING_TIME_BUDGET
+) -> TrackListTransformer:
+    """Orders tracks as a path through feature space, from a random first track.
+
+    The path is built by repeatedly moving to the most similar remaining track (but
+    not, where possible, one by the same artist). Tracks left in runs by one artist
+    at its end are moved between tracks by other artists, and then the path is
+    smoothed by 2-opt for up to `time_budget` seconds.
+    """
+
+    @combinable(display_name="smoothly shuffled")
+    def shuffle_tracks(tracks: list[Track], *, rng: RandomState = None) -> list[Track]:
+        tracks = list(tracks)
+
+        shuffle = _get_shuffle(rng)
+
+        if len(tracks) < 3:
+            shuffle(tracks)
+            return tracks
+
+        deadline = time.perf_counter() + time_budget
+
+        unit_values = _unit_score_matrix(tracks)
+        artist_ids = [set(track.artist_ids) for track in tracks]
+
+        positions = list(range(len(tracks)))
+        shuffle(positions)
+
+        neighbors = _nearest_neighbors(unit_values)
+
+        path = _greedy_path(unit_values, artist_ids, neighbors, start=positions[0])
+        path = _separate_artists(path, unit_values, artist_ids, neighbors)
+        path = _two_opt(path, unit_values, artist_ids, neighbors, deadline=deadline)
+
+        shuffled = [tracks[position] for position in path]
+
+        logger.info(
+            "Smoothly shuffled %d tracks (transition smoothness %.3f)",
+            len(shuffled),
+            transition_smoothness(shuffled),
+        )
+
+        return shuffled
+
+    return shuffle_tracks
 
 
 if __name__ == "__main__":
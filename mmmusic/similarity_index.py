@@ -0,0 +1,303 @@
+from collections.abc import Hashable, Iterable, Iterator, Mapping, Sequence
+from itertools import chain
+from pathlib import Path
+from typing import Generic, TypeVar
+
+import numpy as np
+
+from mmmusic.features import normalize_rows
+from mmmusic.models.types import Metrics
+
+T = TypeVar("T", bound=Hashable)
+
+_INITIAL_CAPACITY = 64
+
+# The number of items per cluster that clustering aims for.
+_CLUSTER_SIZE = 64
+# The clusters (nearest first) whose items are compared by approximate queries.
+_CLUSTERS_SEARCHED = 4
+_CLUSTERING_ITERATIONS = 3
+# The most rows compared with the centroids at once, when clustering.
+_CLUSTERING_BLOCK_SIZE = 4096
+
+
+class SimilarityIndex(Generic[T]):
+    """Finds the items whose vectors are most similar (by cosine) to those of seeds.
+
+    Vectors are normalized once, when added, so that the similarities of every item
+    to a seed are a single matrix-vector product. Adding items appends to the
+    existing (over-allocated) matrix, so the index never needs to be rebuilt.
+
+    For approximate queries (see `nearest`), items are also grouped into clusters of
+    similar items, so that only a few clusters need to be compared.
+    """
+
+    def __init__(self, vectors: Mapping[T, Metrics] | None = None):
+        self._items: list[T] = []
+        self._rows: dict[T, int] = {}
+        self._unit_vectors: np.ndarray | None = None
+
+        # The unit mean of each cluster, and the items in each (as ordered sets).
+        self._centroids: np.ndarray | None = None
+        self._clusters: list[dict[T, None]] = []
+        self._cluster_of: dict[T, int] = {}
+        # The items added (or replaced) since the items were last clustered.
+        self._unclustered: dict[T, None] = {}
+
+        if vectors:
+            self.add(vectors)
+
+    def add(self, vectors: Mapping[T, Metrics]) -> None:
+        """Adds items, replacing the vectors of any that are already indexed."""
+        new_vectors = {}
+        replaced_vectors = {}
+
+        for item, vector in vectors.items():
+            (replaced_vectors if item in self._rows else new_vectors)[item] = vector
+
+        if replaced_vectors:
+            self._unit_vectors[self._rows_of(replaced_vectors)] = normalize_rows(
+                list(replaced_vectors.values())
+            )
+
+            for item in replaced_vectors:
+                self._uncluster(item)
+
+            self._unclustered.update(dict.fromkeys(replaced_vectors))
+
+        if not new_vectors:
+            return
+
+        matrix = normalize_rows(list(new_vectors.values()))
+
+        self._reserve(len(self._items) + len(matrix), matrix.shape[1])
+
+        self._unit_vectors[len(self._items) : len(self._items) + len(matrix)] = matrix
+
+        self._rows.update(
+            (item, row) for row, item in enumerate(new_vectors, len(self._items))
+        )
+        self._items.extend(new_vectors)
+        self._unclustered.update(dict.fromkeys(new_vectors))
+
+    def remove(self, items: Iterable[T]) -> None:
+        """Removes items, moving the last item into each removed item's row."""
+        for item in items:
+            row = self._rows.pop(item, None)
+
+            if row is None:
+                continue
+
+            self._uncluster(item)
+            self._unclustered.pop(item, None)
+
+            last_item = self._items.pop()
+
+            if last_item != item:
+                self._items[row] = last_item
+                self._rows[last_item] = row
+                self._unit_vectors[row] = self._unit_vectors[len(self._items)]
+
+    def similarities(
+        self, seeds: Iterable[T], candidates: Sequence[T] | None = None
+    ) -> np.ndarray:
+        """Returns the mean similarity of each candidate to the seeds.
+
+        Candidates default to every indexed item, in the order they were added.
+        """
+        query = self._unit_vectors[self._rows_of(seeds)].mean(axis=0)
+
+        if candidates is None:
+            return self._unit_vectors[: len(self._items)] @ query
+
+        return self._unit_vectors[self._rows_of(candidates)] @ query
+
+    def top_k(
+        self, seeds: Iterable[T], k: int, candidates: Sequence[T] | None = None
+    ) -> list[T]:
+        """Returns the k candidates that are most similar to the seeds, in order.
+
+        Ties are broken by the order of the candidates, as a stable sort would.
+        """
+        similarities = self.similarities(seeds, candidates)
+
+        if candidates is None:
+            candidates = self._items
+
+        top = _top_k_positions(similarities, k)
+
+        return [candidates[position] for position in top]
+
+    def nearest(self, item: T, k: int) -> list[T]:
+        """Returns (approximately) the k items most similar to an item, in order.
+
+        Only the items in the clusters nearest to the item, and those added since
+        the items were last clustered, are compared with it. Items are clustered
+        when first queried, and again whenever those added since outnumber those
+        clustered, so that clustering takes constant time per item (amortized).
+        """
+        if len(self._items) <= _CLUSTER_SIZE * _CLUSTERS_SEARCHED:
+            return self.top_k([item], k)
+
+        if self._centroids is None or len(self._unclustered) > len(self._cluster_of):
+            self.cluster()
+
+        nearest_clusters = _top_k_positions(
+            self._centroids @ self._unit_vectors[self._rows[item]], _CLUSTERS_SEARCHED
+        )
+
+        return self.top_k(
+            [item],
+            k,
+            list(
+                chain(
+                    *(self._clusters[cluster] for cluster in nearest_clusters.tolist()),
+                    self._unclustered,
+                )
+            ),
+        )
+
+    def cluster(self) -> None:
+        """Groups the items into clusters of similar items (by spherical k-means)."""
+        if not self._items:
+            return
+
+        unit_vectors = self._unit_vectors[: len(self._items)]
+
+        number_of_clusters = max(1, round(len(self._items) / _CLUSTER_SIZE))
+
+        # NOTE: Evenly spaced items are the initial centroids, so that clustering is
+        # deterministic.
+        centroids = unit_vectors[
+            np.linspace(0, len(self._items) - 1, number_of_clusters, dtype=np.intp)
+        ]
+
+        for _ in range(_CLUSTERING_ITERATIONS):
+            assignments = _nearest_centroids(unit_vectors, centroids)
+
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, unit_vectors)
+
+            centroids = normalize_rows(sums)
+
+        self._set_clusters(centroids, _nearest_centroids(unit_vectors, centroids))
+
+    def save(self, path: str | Path) -> None:
+        """Saves the items (which must be strings), their vectors and clusters."""
+        dimensions = 0 if self._unit_vectors is None else self._unit_vectors.shape[1]
+
+        np.savez(
+            path,
+            items=np.array(self._items, dtype=str),
+            unit_vectors=(
+                np.zeros((0, dimensions), dtype=np.float32)
+                if self._unit_vectors is None
+                else self._unit_vectors[: len(self._items)]
+            ),
+            centroids=(
+                np.zeros((0, dimensions), dtype=np.float32)
+                if self._centroids is None
+                else self._centroids
+            ),
+            clusters=np.array(
+                [self._cluster_of.get(item, -1) for item in self._items],
+                dtype=np.intp,
+            ),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "SimilarityIndex[str]":
+        """Loads an index that was saved with `save`."""
+        index: SimilarityIndex[str] = cls()
+
+        with np.load(path) as saved:
+            items = saved["items"].tolist()
+
+            if not items:
+                return index
+
+            index._items = items
+            index._rows = {item: row for row, item in enumerate(items)}
+            index._unit_vectors = saved["unit_vectors"]
+            index._unclustered = dict.fromkeys(items)
+
+            if len(saved["centroids"]):
+                index._set_clusters(saved["centroids"], saved["clusters"])
+
+        return index
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._rows
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _set_clusters(self, centroids: np.ndarray, assignments: np.ndarray) -> None:
+        """Sets the clusters, leaving items assigned to none (-1) unclustered."""
+        self._centroids = centroids
+        self._clusters = [{} for _ in range(len(centroids))]
+        self._cluster_of = {}
+        self._unclustered = {}
+
+        for item, cluster in zip(self._items, assignments.tolist(), strict=True):
+            if cluster < 0:
+                self._unclustered[item] = None
+            else:
+                self._clusters[cluster][item] = None
+                self._cluster_of[item] = cluster
+
+    def _uncluster(self, item: T) -> None:
+        if (cluster := self._cluster_of.pop(item, None)) is not None:
+            del self._clusters[cluster][item]
+
+    def _rows_of(self, items: Iterable[T]) -> np.ndarray:
+        return np.fromiter((self._rows[item] for item in items), dtype=np.intp)
+
+    def _reserve(self, size: int, dimensions: int) -> None:
+        if self._unit_vectors is None:
+            self._unit_vectors = np.zeros(
+                (max(size, _INITIAL_CAPACITY), dimensions), dtype=np.float32
+            )
+        elif size > len(self._unit_vectors):
+            grown = np.zeros(
+                (max(size, 2 * len(self._unit_vectors)), dimensions), dtype=np.float32
+            )
+            grown[: len(self._items)] = self._unit_vectors[: len(self._items)]
+
+            self._unit_vectors = grown
+
+
+def _nearest_centroids(unit_vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Returns the position of the most similar centroid to each vector."""
+    return np.concatenate(
+        [
+            (unit_vectors[start : start + _CLUSTERING_BLOCK_SIZE] @ centroids.T).argmax(
+                axis=1
+            )
+            for start in range(0, len(unit_vectors), _CLUSTERING_BLOCK_SIZE)
+        ]
+    )
+
+
+def _top_k_positions(values: np.ndarray, k: int) -> np.ndarray:
+    """Returns the positions of the k largest values, sorted stably by value."""
+    n = len(values)
+    k = max(0, min(k, n))
+
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < n:
+        kth_largest = np.partition(values, n - k)[n - k]
+
+        above = np.flatnonzero(values > kth_largest)
+        tied = np.flatnonzero(values == kth_largest)[: k - len(above)]
+
+        positions = np.concatenate((above, tied))
+    else:
+        positions = np.arange(n)
+
+    return positions[np.lexsort((positions, -values[positions]))]
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, Callable
 
-from mmmusic.models.tracks import Track
+from mmmusic.models.tracks import Track, get_tracks_audio_features
 from mmmusic.playlists.management import get_tracks_from_playlist
 from mmmusic.users import User
 
@@ -15,9 +15,11 @@ def _exclude_featureless_tracks(track_source: TrackSource) -> TrackSource:
     # them (for now).
 
     def track_source_without_featureless_tracks(user: User) -> list[Track]:
-        return [
-            track for track in track_source(user) if track.audio_features is not None
-        ]
+        tracks = track_source(user)
+
+        get_tracks_audio_features(tracks)  # fetches the audio features in batches
+
+        return [track for track in tracks if track.audio_features is not None]
 
     return track_source_without_featureless_tracks
 
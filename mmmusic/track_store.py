@@ -0,0 +1,288 @@
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from functools import cache
+from operator import attrgetter
+
+import numpy as np
+from scipy.spatial import KDTree
+
+from mmmusic.genres import get_genre_attributes_for_tracks
+from mmmusic.models.albums import get_albums
+from mmmusic.models.tracks import (
+    AUDIO_FEATURE_FIELDS,
+    Track,
+    TrackID,
+    get_tracks_audio_features,
+)
+
+# NOTE: The narrowest types that fit the values that Spotify returns.
+FIELD_DTYPES: dict[str, type[np.generic]] = {
+    "acousticness": np.float32,
+    "danceability": np.float32,
+    "duration_ms": np.int32,
+    "energy": np.float32,
+    "instrumentalness": np.float32,
+    "key": np.int8,
+    "liveness": np.float32,
+    "loudness": np.float32,
+    "mode": np.int8,
+    "speechiness": np.float32,
+    "tempo": np.float32,
+    "time_signature": np.int8,
+    "valence": np.float32,
+    "popularity": np.int8,
+    "release_year": np.int16,
+    "genre_top": np.float32,
+    "genre_left": np.float32,
+}
+
+TRACK_STORE_FIELDS = tuple(FIELD_DTYPES)
+
+_COLUMN_DTYPES = {**FIELD_DTYPES, "has_audio_features": np.bool_}
+
+# Audio features of tracks without any are stored as NaN, or as this if integral.
+MISSING_INTEGER = -1
+
+# Gives the values of some columns for some tracks, in order.
+_ColumnLoader = Callable[[Sequence[Track]], Mapping[str, Sequence]]
+
+
+class TrackStore:
+    """Holds the attributes of a library of tracks in columns.
+
+    Each track is assigned a row, and each field (every audio feature, plus
+    popularity, release year and genre coordinates) is stored as a contiguous,
+    read-only array, so that attributes of many tracks can be compared at once.
+
+    Columns are filled when they are first read, by the lookup that they need (e.g.
+    albums, for release years), so that reading some fields does not fetch others.
+    """
+
+    def __init__(self, tracks: Iterable[Track] = ()):
+        self._tracks: list[Track] = []
+        self._rows: dict[TrackID, int] = {}
+
+        self._columns = {
+            field: _read_only(np.empty(0, dtype=dtype))
+            for field, dtype in _COLUMN_DTYPES.items()
+        }
+
+        # A k-d tree over the genre coordinates, built when first queried.
+        self._genre_tree: KDTree | None = None
+
+        self.add(tracks)
+
+    def add(self, tracks: Iterable[Track]) -> None:
+        """Adds the tracks that are not already in the store.
+
+        Nothing is fetched until the tracks' columns are read.
+        """
+        new_tracks = list(
+            {track.id: track for track in tracks if track.id not in self._rows}.values()
+        )
+
+        if not new_tracks:
+            return
+
+        self._genre_tree = None
+
+        first_new_row = len(self._tracks)
+
+        self._tracks.extend(new_tracks)
+        self._rows.update(
+            (track.id, row) for row, track in enumerate(new_tracks, first_new_row)
+        )
+
+    @property
+    def tracks(self) -> Sequence[Track]:
+        return tuple(self._tracks)
+
+    @property
+    def has_audio_features(self) -> np.ndarray:
+        return self.column("has_audio_features")
+
+    def column(self, field: str) -> np.ndarray:
+        try:
+            column = self._columns[field]
+        except KeyError:
+            raise KeyError(f"Track stores have no field {field!r}") from None
+
+        if len(column) < len(self._tracks):
+            self._fill(_FIELD_LOADERS[field], first_row=len(column))
+
+            column = self._columns[field]
+
+        return column
+
+    def matrix(
+        self, fields: Iterable[str], rows: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Returns the given fields (as float32 columns) of the given rows."""
+        columns = [self.column(field) for field in fields]
+
+        if rows is not None:
+            columns = [column[rows] for column in columns]
+
+        return np.column_stack(columns).astype(np.float32, copy=False)
+
+    def genre_rows_within(
+        self, position: tuple[float, float], radius: float
+    ) -> np.ndarray:
+        """Returns the rows whose genre coordinates lie within radius of position."""
+        if self._genre_tree is None:
+            self._genre_tree = KDTree(self.matrix(("genre_top", "genre_left")))
+
+        return np.asarray(
+            self._genre_tree.query_ball_point(position, radius), dtype=np.intp
+        )
+
+    def row_of(self, track: Track | TrackID) -> int:
+        return self._rows[track if isinstance(track, str) else track.id]
+
+    def rows_of(self, tracks: Iterable[Track | TrackID]) -> np.ndarray:
+        tracks = list(tracks)
+
+        try:
+            # NOTE: Tracks are usually all Track objects, whose IDs can be got (and
+            # looked up) without a Python call for each.
+            track_ids = list(map(_get_id, tracks))
+        except AttributeError:
+            track_ids = [
+                track if isinstance(track, str) else track.id for track in tracks
+            ]
+
+        return np.fromiter(
+            map(self._rows.__getitem__, track_ids), dtype=np.intp, count=len(tracks)
+        )
+
+    def tracks_at(self, rows: Iterable[int]) -> list[Track]:
+        return [self._tracks[row] for row in rows]
+
+    def __contains__(self, track: Track | TrackID) -> bool:
+        return (track if isinstance(track, str) else track.id) in self._rows
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.column(field)
+
+    def __iter__(self) -> Iterator[Track]:
+        return iter(self._tracks)
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def _fill(self, loader: _ColumnLoader, *, first_row: int) -> None:
+        """Fills the columns that the loader gives, from first_row to the end."""
+        for field, values in loader(self._tracks[first_row:]).items():
+            self._columns[field] = _read_only(
+                np.concatenate(
+                    (
+                        self._columns[field],
+                        np.array(values, dtype=_COLUMN_DTYPES[field]),
+                    )
+                )
+            )
+
+
+class TrackColumns:
+    """The columns of a track store, restricted to the rows of some tracks in order."""
+
+    def __init__(self, store: TrackStore, rows: np.ndarray):
+        self._store = store
+        self._rows = rows
+        self._columns: dict[str, np.ndarray] = {}
+
+    @property
+    def has_audio_features(self) -> np.ndarray:
+        return self["has_audio_features"]
+
+    def genres_within(self, position: tuple[float, float], radius: float) -> np.ndarray:
+        """Returns a mask of the tracks whose genre coordinates lie near position."""
+        within = np.zeros(len(self._store), dtype=bool)
+        within[self._store.genre_rows_within(position, radius)] = True
+
+        return within[self._rows]
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        if field not in self._columns:
+            self._columns[field] = self._store.column(field)[self._rows]
+
+        return self._columns[field]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+@cache
+def get_track_store() -> TrackStore:
+    """Returns the track store that is shared by processors (and grows as needed)."""
+    return TrackStore()
+
+
+def get_track_columns(tracks: Sequence[Track]) -> TrackColumns:
+    """Returns the columns of the tracks, adding any to the shared store first."""
+    store = get_track_store()
+
+    try:
+        rows = store.rows_of(tracks)
+    except KeyError:
+        store.add(tracks)
+        rows = store.rows_of(tracks)
+
+    return TrackColumns(store, rows)
+
+
+def _load_audio_features(tracks: Sequence[Track]) -> dict[str, list]:
+    audio_features = get_tracks_audio_features(tracks)
+
+    columns: dict[str, list] = {
+        field: [
+            (MISSING_INTEGER if _is_integral(field) else np.nan)
+            if features is None
+            else features[field]
+            for features in audio_features
+        ]
+        for field in AUDIO_FEATURE_FIELDS
+    }
+    columns["has_audio_features"] = [
+        features is not None for features in audio_features
+    ]
+
+    return columns
+
+
+def _load_popularity(tracks: Sequence[Track]) -> dict[str, list]:
+    return {"popularity": [track.popularity for track in tracks]}
+
+
+def _load_release_years(tracks: Sequence[Track]) -> dict[str, list]:
+    albums = get_albums(track.album_id for track in tracks)
+
+    return {"release_year": [album.release_date.year for album in albums]}
+
+
+def _load_genre_attributes(tracks: Sequence[Track]) -> dict[str, np.ndarray]:
+    genre_attributes = get_genre_attributes_for_tracks(tracks)
+
+    return {"genre_top": genre_attributes[:, 0], "genre_left": genre_attributes[:, 1]}
+
+
+# The lookup that fills each column (along with any other columns that it gives).
+_FIELD_LOADERS: dict[str, _ColumnLoader] = {
+    **dict.fromkeys(
+        (*AUDIO_FEATURE_FIELDS, "has_audio_features"), _load_audio_features
+    ),
+    "popularity": _load_popularity,
+    "release_year": _load_release_years,
+    "genre_top": _load_genre_attributes,
+    "genre_left": _load_genre_attributes,
+}
+
+_get_id = attrgetter("id")
+
+
+def _is_integral(field: str) -> bool:
+    return np.issubdtype(FIELD_DTYPES[field], np.integer)
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
@@ -1,14 +1,15 @@
 import os
 from pathlib import Path
 
-import spotipy
 from spotipy.cache_handler import CacheFileHandler
 from spotipy.oauth2 import SpotifyAuthBase, SpotifyPKCE
 
-from mmmusic.external.spotify import create_requests_session_for_spotify
+from mmmusic.external import spotify
+from mmmusic.external.concurrency import map_concurrently
+from mmmusic.external.spotify import create_thread_safe_client
 from mmmusic.log_utils import get_logger
-from mmmusic.models.albums import get_album, get_tracks_from_albums
-from mmmusic.models.artists import get_artist
+from mmmusic.models.albums import get_albums, get_tracks_from_albums
+from mmmusic.models.artists import get_artist, get_artists
 
 logger = get_logger()
 
@@ -30,12 +31,7 @@ class User:
         self._artists = None
         self._tracks = None
 
-        auth_manager = self._prepare_auth_manager()
-
-        self.sp = spotipy.Spotify(
-            auth_manager=auth_manager,
-            requests_session=create_requests_session_for_spotify(),
-        )
+        self.sp = create_thread_safe_client(self._prepare_auth_manager())
 
     def _prepare_auth_manager(self) -> SpotifyAuthBase:
         logger.debug("Preparing auth manager for user %r", self.username)
@@ -72,15 +68,28 @@ class User:
 
     def get_saved_albums(self):
         if self._albums is None:
-            albums = []
+            page_size = 50
 
-            albums_on_page = self.sp.current_user_saved_albums(limit=50, offset=0)
+            first_page = self.sp.current_user_saved_albums(limit=page_size, offset=0)
 
-            while albums_on_page:
-                albums.extend(
-                    get_album(item["album"]["id"]) for item in albums_on_page["items"]
-                )
-                albums_on_page = self.sp.next(albums_on_page)
+            # The remaining pages are requested concurrently, rather than following
+            # each page's link to the next.
+            pages = [
+                first_page,
+                *map_concurrently(
+                    lambda offset: self.sp.current_user_saved_albums(
+                        limit=page_size, offset=offset
+                    ),
+                    range(page_size, first_page["total"], page_size),
+                ),
+            ]
+
+            album_jsons = [item["album"] for page in pages for item in page["items"]]
+
+            # Saved albums are full album objects, so they need not be fetched again.
+            spotify.cache_albums(album_jsons)
+
+            albums = get_albums(album_json["id"] for album_json in album_jsons)
 
             self._albums = tuple(sorted(albums))
 
@@ -88,10 +97,13 @@ class User:
 
     def get_artists_of_saved_albums(self):
         if self._artists is None:
-            artists = set()
-
-            for album in self.get_saved_albums():
-                artists.update(get_artist(artist_id) for artist_id in album.artist_ids)
+            artists = get_artists(
+                {
+                    artist_id: None
+                    for album in self.get_saved_albums()
+                    for artist_id in album.artist_ids
+                }
+            )
 
             self._artists = tuple(sorted(artists))
 
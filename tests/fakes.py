@@ -0,0 +1,92 @@
+"""Fake tracks, and fakes of the lookups that fill the track store's columns."""
+
+from collections.abc import Callable
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+
+from mmmusic.models.albums import Album
+from mmmusic.models.genre_attributes import GenreAttributes
+from mmmusic.models.tracks import AudioFeatures, Track
+
+
+def fake_track(i: int) -> Track:
+    return Track(
+        name=f"fake_name_{i}",
+        id=f"fake_track_id_{i}",
+        album_id=f"fake_album_id_{i}",
+        artist_ids=(f"fake_artist_id_{i}",),
+        popularity=10 * i,
+    )
+
+
+def fake_audio_features(track: Track) -> AudioFeatures | None:
+    """Returns features that grow with the track's number (and none for track 0)."""
+    i = int(track.id.rpartition("_")[2])
+
+    if i == 0:
+        return None
+
+    return AudioFeatures(
+        id=track.id,
+        acousticness=i / 10,
+        danceability=i / 10,
+        duration_ms=1000 * i,
+        energy=i / 10,
+        instrumentalness=i / 10,
+        key=i % 12,
+        liveness=i / 10,
+        loudness=-i,
+        mode=i % 2,
+        speechiness=i / 10,
+        tempo=100 + i,
+        time_signature=4,
+        valence=i / 10,
+    )
+
+
+def fake_album(album_id: str) -> Album:
+    """Returns an album released in 1990 plus the album's number."""
+    return Album(
+        name=album_id,
+        id=album_id,
+        album_type="album",
+        release_date=date(1990 + int(album_id.rpartition("_")[2]), 1, 1),
+        artist_ids=(),
+    )
+
+
+def patch_track_store_lookups(
+    genre_attributes: Callable[[Track], GenreAttributes] = lambda track: (
+        GenreAttributes(top=1.0, left=2.0)
+    ),
+) -> Callable:
+    """Patches the lookups of the track store with the fakes above, as a decorator.
+
+    Tracks' genre attributes are given by `genre_attributes`.
+    """
+    patches = [
+        patch(
+            "mmmusic.track_store.get_genre_attributes_for_tracks",
+            lambda tracks: np.array(
+                [genre_attributes(track) for track in tracks], dtype=float
+            ).reshape(-1, 2),
+        ),
+        patch(
+            "mmmusic.track_store.get_albums",
+            lambda album_ids: tuple(map(fake_album, album_ids)),
+        ),
+        patch(
+            "mmmusic.track_store.get_tracks_audio_features",
+            lambda tracks: tuple(map(fake_audio_features, tracks)),
+        ),
+    ]
+
+    def decorator(target):
+        for patcher in patches:
+            target = patcher(target)
+
+        return target
+
+    return decorator
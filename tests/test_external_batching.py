@@ -0,0 +1,104 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+from mmmusic.external.batching import BatchLoader
+
+
+class TestBatchLoader(unittest.TestCase):
+    def test_load_many_fetches_in_batches(self):
+        fetch_many = Mock(side_effect=lambda keys: [key.upper() for key in keys])
+
+        loader = BatchLoader(fetch_many, batch_size=2)
+
+        self.assertEqual(loader.load_many(["a", "b", "c"]), ["A", "B", "C"])
+
+        self.assertEqual(
+            [call.args[0] for call in fetch_many.call_args_list], [["a", "b"], ["c"]]
+        )
+
+    def test_load_resolves_primed_keys_together(self):
+        fetch_many = Mock(side_effect=lambda keys: [key.upper() for key in keys])
+
+        loader = BatchLoader(fetch_many, batch_size=10)
+
+        loader.prime(["a", "b"])
+
+        self.assertEqual(loader.load("c"), "C")
+        self.assertEqual(loader.load("a"), "A")
+        self.assertEqual(loader.load("b"), "B")
+
+        fetch_many.assert_called_once_with(["a", "b", "c"])
+
+    def test_put_skips_fetch(self):
+        fetch_many = Mock()
+
+        loader = BatchLoader(fetch_many, batch_size=10)
+
+        loader.put("a", "A")
+
+        self.assertEqual(loader.load_many(["a", "a"]), ["A", "A"])
+
+        fetch_many.assert_not_called()
+
+    def test_loads_again_after_clear(self):
+        fetch_many = Mock(side_effect=lambda keys: [key.upper() for key in keys])
+
+        persistent_cache = Mock()
+        persistent_cache.get_many.side_effect = lambda keys: {
+            key: "cached " + key for key in keys if key == "a"
+        }
+
+        loader = BatchLoader(
+            fetch_many, batch_size=10, persistent_cache=persistent_cache
+        )
+
+        self.assertEqual(loader.load_many(["a", "b"]), ["cached a", "B"])
+
+        loader.clear()
+
+        self.assertEqual(loader.load("a"), "cached a")
+        self.assertEqual(loader.load("b"), "B")
+
+        self.assertEqual(
+            [call.args[0] for call in persistent_cache.get_many.call_args_list],
+            [["a", "b"], ["a"], ["b"]],
+        )
+        self.assertEqual(
+            [call.args[0] for call in fetch_many.call_args_list], [["b"]] * 2
+        )
+
+    def test_mismatched_batch_raises(self):
+        loader = BatchLoader(lambda keys: [], batch_size=10)
+
+        with self.assertRaises(RuntimeError):
+            loader.load("a")
+
+    def test_concurrent_loads_fetch_each_key_once(self):
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def fetch_many(keys):
+            fetching.set()
+            release.wait(timeout=5)
+            return [key.upper() for key in keys]
+
+        fetch_many = Mock(side_effect=fetch_many)
+
+        loader = BatchLoader(fetch_many, batch_size=10)
+
+        results = []
+
+        first = threading.Thread(target=lambda: results.append(loader.load("a")))
+        first.start()
+        fetching.wait(timeout=5)
+
+        second = threading.Thread(target=lambda: results.append(loader.load("a")))
+        second.start()
+
+        release.set()
+        first.join(timeout=5)
+        second.join(timeout=5)
+
+        self.assertEqual(results, ["A", "A"])
+        fetch_many.assert_called_once_with(["a"])
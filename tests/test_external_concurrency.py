@@ -0,0 +1,41 @@
+import threading
+import unittest
+
+from mmmusic.external.concurrency import (
+    get_concurrency,
+    map_concurrently,
+    set_concurrency,
+)
+
+
+class TestMapConcurrently(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(set_concurrency, get_concurrency())
+
+        set_concurrency(4)
+
+    def test_preserves_order(self):
+        self.assertEqual(
+            map_concurrently(lambda x: x * x, range(20)), [x * x for x in range(20)]
+        )
+
+    def test_uses_multiple_threads(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait_for_other_thread(_):
+            barrier.wait()  # fails unless both calls run at the same time
+            return threading.current_thread().name
+
+        names = map_concurrently(wait_for_other_thread, range(2))
+
+        self.assertEqual(len(set(names)), 2)
+
+    def test_nested_calls_do_not_deadlock(self):
+        def inner(x):
+            return sum(map_concurrently(lambda y: x * y, range(3)))
+
+        self.assertEqual(map_concurrently(inner, range(4)), [0, 3, 6, 9])
+
+    def test_rejects_non_positive_concurrency(self):
+        with self.assertRaises(ValueError):
+            set_concurrency(0)
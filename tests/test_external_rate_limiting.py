@@ -0,0 +1,119 @@
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+import io
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+import requests.adapters
+
+from mmmusic.external.rate_limiting import (
+    RateLimitedAdapter,
+    RateLimiter,
+    parse_retry_after,
+)
+
+
+def _response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO()
+    return response
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_throttling_pauses_and_slows_down(self):
+        rate_limiter = RateLimiter(rate=100, max_rate=100, burst=1)
+
+        rate_limiter.acquire()
+        rate_limiter.record_throttled(0.05)
+
+        self.assertEqual(rate_limiter.rate, 50)
+
+        start = time.monotonic()
+        rate_limiter.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+        self.assertEqual(rate_limiter.stats.requests, 2)
+        self.assertEqual(rate_limiter.stats.throttled_responses, 1)
+        self.assertAlmostEqual(rate_limiter.stats.paused_seconds, 0.05, places=2)
+        self.assertGreaterEqual(rate_limiter.stats.waiting_seconds, 0.05)
+
+    def test_rate_does_not_drop_below_minimum(self):
+        rate_limiter = RateLimiter(rate=1, min_rate=0.5)
+
+        for _ in range(3):
+            rate_limiter.record_throttled(0)
+
+        self.assertEqual(rate_limiter.rate, 0.5)
+
+    def test_concurrent_throttling_slows_down_once(self):
+        rate_limiter = RateLimiter(rate=10)
+
+        workers = [
+            threading.Thread(target=rate_limiter.record_throttled, args=(1,))
+            for _ in range(8)
+        ]
+
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join(timeout=5)
+
+        self.assertAlmostEqual(rate_limiter.rate, 5, places=2)
+        self.assertEqual(rate_limiter.stats.throttled_responses, 8)
+        self.assertAlmostEqual(rate_limiter.stats.paused_seconds, 1, places=1)
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+
+    def test_http_date(self):
+        retry_at = datetime.now(UTC) + timedelta(seconds=30)
+
+        self.assertAlmostEqual(
+            parse_retry_after(format_datetime(retry_at, usegmt=True)), 30, delta=2
+        )
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+class TestRateLimitedAdapter(unittest.TestCase):
+    @patch.object(requests.adapters.HTTPAdapter, "send", autospec=True)
+    def test_retries_throttled_requests(self, mock_send):
+        mock_send.side_effect = [
+            _response(429, {"Retry-After": "0"}),
+            _response(429),
+            _response(200),
+        ]
+
+        rate_limiter = RateLimiter(default_retry_after=0)
+
+        adapter = RateLimitedAdapter(rate_limiter=rate_limiter)
+
+        response = adapter.send(requests.Request("GET", "https://x.y").prepare())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_send.call_count, 3)
+        self.assertEqual(rate_limiter.stats.throttled_responses, 2)
+
+    @patch.object(requests.adapters.HTTPAdapter, "send", autospec=True)
+    def test_gives_up_after_max_attempts(self, mock_send):
+        mock_send.side_effect = lambda *args, **kwargs: _response(429)
+
+        adapter = RateLimitedAdapter(
+            rate_limiter=RateLimiter(default_retry_after=0), max_throttled_attempts=2
+        )
+
+        response = adapter.send(requests.Request("GET", "https://x.y").prepare())
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(mock_send.call_count, 2)
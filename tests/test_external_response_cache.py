@@ -0,0 +1,110 @@
+from pathlib import Path
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from mmmusic.external.batching import BatchLoader
+from mmmusic.external.response_cache import (
+    OfflineCacheMissError,
+    ResourceCache,
+    ResponseCache,
+    configure_response_cache,
+    set_offline,
+)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def test_round_trip(self):
+        cache = ResponseCache(self.directory)
+        self.addCleanup(cache.close)
+
+        cache.set_many("album", {"a": {"name": "A"}, "b": None})
+
+        self.assertEqual(
+            cache.get_many("album", ["a", "b", "c"]), {"a": {"name": "A"}, "b": None}
+        )
+        self.assertEqual(cache.get_many("artist", ["a"]), {})
+
+    def test_persists_across_instances(self):
+        cache = ResponseCache(self.directory)
+        cache.set_many("album", {"a": {"name": "A"}})
+        cache.close()
+
+        cache = ResponseCache(self.directory)
+        self.addCleanup(cache.close)
+
+        self.assertEqual(cache.get_many("album", ["a"]), {"a": {"name": "A"}})
+        self.assertGreater(cache.size_bytes, 0)
+
+    def test_expired_entries_are_only_served_when_stale_allowed(self):
+        cache = ResponseCache(self.directory, time_to_live={"artist": -1})
+        self.addCleanup(cache.close)
+
+        cache.set_many("artist", {"a": {"popularity": 1}})
+
+        self.assertEqual(cache.get_many("artist", ["a"]), {})
+        self.assertEqual(
+            cache.get_many("artist", ["a"], allow_stale=True), {"a": {"popularity": 1}}
+        )
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(self.directory)
+        self.addCleanup(cache.close)
+
+        cache.set_many("track", {"a": "x" * 100})
+        entry_size = cache.size_bytes
+
+        cache.max_size_bytes = int(2.5 * entry_size)
+
+        cache.set_many("track", {"b": "y" * 100})
+        cache.get_many("track", ["a"])  # "b" is now the least recently used
+        cache.set_many("track", {"c": "z" * 100})
+
+        self.assertEqual(set(cache.get_many("track", ["a", "b", "c"])), {"a", "c"})
+        self.assertLessEqual(cache.size_bytes, cache.max_size_bytes)
+
+
+class TestResourceCache(unittest.TestCase):
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+
+        configure_response_cache(directory)
+        self.addCleanup(configure_response_cache, None)
+        self.addCleanup(set_offline, False)
+
+    def test_batch_loader_only_fetches_missing_keys(self):
+        ResourceCache("track").set_many({"a": "A"})
+
+        fetch_many = Mock(side_effect=lambda keys: [key.upper() for key in keys])
+
+        loader = BatchLoader(
+            fetch_many, batch_size=10, persistent_cache=ResourceCache("track")
+        )
+
+        self.assertEqual(loader.load_many(["a", "b"]), ["A", "B"])
+
+        fetch_many.assert_called_once_with(["b"])
+
+        # A new loader (as in a new process) is served entirely from the cache.
+        fetch_many.reset_mock()
+
+        loader = BatchLoader(
+            fetch_many, batch_size=10, persistent_cache=ResourceCache("track")
+        )
+
+        self.assertEqual(loader.load_many(["a", "b"]), ["A", "B"])
+
+        fetch_many.assert_not_called()
+
+    def test_offline_cache_miss_raises(self):
+        ResourceCache("track").set_many({"a": "A"})
+
+        set_offline(True)
+
+        self.assertEqual(ResourceCache("track").get_many(["a"]), {"a": "A"})
+
+        with self.assertRaises(OfflineCacheMissError):
+            ResourceCache("track").get_many(["a", "b"])
@@ -1,21 +1,74 @@
 import unittest
 from unittest.mock import patch
 
-from mmmusic.external.spotify import get_artist, get_track
+from mmmusic.external.response_cache import configure_response_cache
+from mmmusic.external.spotify import (
+    get_album_tracks,
+    get_artist,
+    get_track,
+    get_tracks,
+)
 
 
 @patch("mmmusic.external.spotify.get_client_credentials_managed_client", autospec=True)
 class TestSpotify(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        configure_response_cache(None)
+
     def test_get_artist(self, mock_get_client_credentials_managed_client):
+        mock_client = mock_get_client_credentials_managed_client.return_value
+        mock_client.artists.return_value = {"artists": [{"id": "fake_artist_id"}]}
+
         get_artist("fake_artist_id")
 
-        mock_get_client_credentials_managed_client.return_value.artist.assert_called_once_with(
-            "fake_artist_id"
-        )
+        mock_client.artists.assert_called_once_with(["fake_artist_id"])
 
     def test_get_track(self, mock_get_client_credentials_managed_client):
+        mock_client = mock_get_client_credentials_managed_client.return_value
+        mock_client.tracks.return_value = {"tracks": [{"id": "fake_track_id"}]}
+
         get_track("fake_track_id")
 
-        mock_get_client_credentials_managed_client.return_value.track.assert_called_once_with(
-            "fake_track_id"
+        mock_client.tracks.assert_called_once_with(["fake_track_id"])
+
+    def test_get_tracks_uses_batches(self, mock_get_client_credentials_managed_client):
+        mock_client = mock_get_client_credentials_managed_client.return_value
+        mock_client.tracks.side_effect = lambda track_ids: {
+            "tracks": [{"id": track_id} for track_id in track_ids]
+        }
+
+        track_ids = [f"fake_batched_track_id_{i}" for i in range(120)]
+
+        tracks = get_tracks(track_ids)
+
+        self.assertEqual([track["id"] for track in tracks], track_ids)
+        # NOTE: Batches are fetched concurrently, so they may be requested in any order.
+        self.assertCountEqual(
+            [len(call.args[0]) for call in mock_client.tracks.call_args_list],
+            [50, 50, 20],
         )
+
+        # Previously loaded tracks are not fetched again.
+        get_track(track_ids[0])
+
+        self.assertEqual(mock_client.tracks.call_count, 3)
+
+    def test_get_album_tracks_uses_tracks_embedded_in_album(
+        self, mock_get_client_credentials_managed_client
+    ):
+        mock_client = mock_get_client_credentials_managed_client.return_value
+        mock_client.albums.return_value = {
+            "albums": [
+                {
+                    "id": "fake_album_id_with_tracks",
+                    "tracks": {"items": [{"id": "fake_track_id"}], "next": None},
+                }
+            ]
+        }
+        mock_client.next.return_value = None
+
+        tracks = get_album_tracks("fake_album_id_with_tracks")
+
+        self.assertEqual(tracks, [{"id": "fake_track_id"}])
+        mock_client.album_tracks.assert_not_called()
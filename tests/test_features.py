@@ -0,0 +1,203 @@
+from pathlib import Path
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from scipy.stats import percentileofscore
+
+from mmmusic.features import (
+    ReferenceDistribution,
+    get_percentile_ranks,
+    get_percentile_scores_for_attributes_of_items,
+    get_scores_for_tracks,
+    paired_similarities,
+    similarities,
+    similarity,
+    similarity_matrix,
+)
+from mmmusic.models.tracks import Track
+
+
+def _percentile_ranks_with_scipy(values: np.ndarray) -> np.ndarray:
+    ranks = values.astype(float)
+
+    for j, col in enumerate(values.T):
+        ranks[:, j] = [percentileofscore(col, x, kind="mean") for x in col]
+
+    return ranks
+
+
+def _fake_track(i: int) -> Track:
+    return Track(
+        name=f"fake_name_{i}",
+        id=f"fake_track_id_{i}",
+        album_id="fake_album_id",
+        artist_ids=("fake_artist_id",),
+        popularity=i,
+    )
+
+
+def _fake_metrics(track: Track) -> list[float]:
+    return [track.popularity, track.popularity % 3]
+
+
+class TestPercentileRanks(unittest.TestCase):
+    def test_matches_percentileofscore(self):
+        rng = np.random.default_rng(0)
+
+        values = np.column_stack(
+            [
+                rng.random(500),
+                rng.integers(0, 12, 500),  # many ties
+                rng.normal(size=500).round(1),
+                np.full(500, 3.0),  # all tied
+            ]
+        )
+
+        np.testing.assert_array_equal(
+            get_percentile_ranks(values), _percentile_ranks_with_scipy(values)
+        )
+
+    def test_columns_with_missing_values_have_no_ranks(self):
+        ranks = get_percentile_ranks(np.array([[1.0, 1.0], [np.nan, 2.0]]))
+
+        self.assertTrue(np.isnan(ranks[:, 0]).all())
+        np.testing.assert_array_equal(ranks[:, 1], [25.0, 75.0])
+
+    def test_scores_for_items(self):
+        scores = get_percentile_scores_for_attributes_of_items(
+            ["a", "b", "c"], item_attributes_func=lambda item: [ord(item), 0]
+        )
+
+        self.assertEqual(scores.keys(), {"a", "b", "c"})
+        np.testing.assert_array_almost_equal(scores["a"], [100 / 6, 50])
+        np.testing.assert_array_almost_equal(scores["c"], [500 / 6, 50])
+
+
+@patch("mmmusic.features.get_metrics_for_track", autospec=True)
+class TestReferenceDistribution(unittest.TestCase):
+    def test_scores_match_population_scores(self, mock_get_metrics_for_track):
+        mock_get_metrics_for_track.side_effect = _fake_metrics
+
+        library = [_fake_track(i) for i in range(10)]
+
+        reference = ReferenceDistribution.from_tracks(library)
+
+        expected = get_scores_for_tracks(library)
+        scores = get_scores_for_tracks(library[3:6], reference=reference)
+
+        for track, score in scores.items():
+            np.testing.assert_array_equal(score, expected[track])
+
+    def test_population_is_scored_once(self, mock_get_metrics_for_track):
+        mock_get_metrics_for_track.side_effect = _fake_metrics
+
+        tracks = [_fake_track(i) for i in range(10)]
+
+        reference = ReferenceDistribution.from_tracks(tracks)
+
+        self.assertEqual(mock_get_metrics_for_track.call_count, 10)
+
+        reference.get_scores_for_tracks(tracks)
+
+        self.assertEqual(mock_get_metrics_for_track.call_count, 10)
+
+    def test_scores_are_reused(self, mock_get_metrics_for_track):
+        mock_get_metrics_for_track.side_effect = _fake_metrics
+
+        reference = ReferenceDistribution.from_tracks(
+            [_fake_track(i) for i in range(10)]
+        )
+
+        mock_get_metrics_for_track.reset_mock()
+
+        outsider = _fake_track(100)
+
+        first = reference.get_scores_for_tracks([outsider])
+        second = reference.get_scores_for_tracks([outsider, outsider])
+
+        mock_get_metrics_for_track.assert_called_once_with(outsider)
+
+        np.testing.assert_array_equal(first[outsider], [100.0, 55.0])
+        self.assertIs(first[outsider], second[outsider])
+
+    def test_save_and_load(self, mock_get_metrics_for_track):
+        mock_get_metrics_for_track.side_effect = _fake_metrics
+
+        reference = ReferenceDistribution.from_tracks(
+            [_fake_track(i) for i in range(10)]
+        )
+
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+        reference.save(directory / "reference.npy")
+
+        loaded = ReferenceDistribution.load(directory / "reference.npy")
+
+        track = _fake_track(4)
+
+        np.testing.assert_array_equal(
+            loaded.get_scores_for_tracks([track])[track],
+            reference.get_scores_for_tracks([track])[track],
+        )
+
+
+class TestSimilarities(unittest.TestCase):
+    def setUp(self):
+        self.vectors = np.random.default_rng(0).random((50, 12)) * 100
+
+    def test_similarities_match_similarity(self):
+        u = self.vectors[0]
+
+        np.testing.assert_allclose(
+            similarities(u, self.vectors),
+            [similarity(u, v) for v in self.vectors],
+            rtol=1e-5,
+        )
+
+    def test_paired_similarities_match_similarity(self):
+        us, vs = self.vectors[:25], self.vectors[25:]
+
+        np.testing.assert_allclose(
+            paired_similarities(us, vs),
+            [similarity(u, v) for u, v in zip(us, vs, strict=True)],
+            rtol=1e-5,
+        )
+
+    def test_similarity_matrix_matches_similarity(self):
+        matrix = similarity_matrix(self.vectors, block_size=7)
+
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_allclose(
+            matrix,
+            [[similarity(u, v) for v in self.vectors] for u in self.vectors],
+            rtol=1e-5,
+        )
+
+    def test_similarity_matrix_of_two_sets_of_vectors(self):
+        matrix = similarity_matrix(self.vectors[:10], self.vectors[10:], block_size=3)
+
+        self.assertEqual(matrix.shape, (10, 40))
+        np.testing.assert_allclose(
+            matrix[4], similarities(self.vectors[4], self.vectors[10:]), rtol=1e-5
+        )
+
+    def test_similarity_matrix_on_disk(self):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+        matrix = similarity_matrix(
+            self.vectors, block_size=16, path=directory / "similarities.npy"
+        )
+
+        np.testing.assert_array_equal(
+            np.load(directory / "similarities.npy", mmap_mode="r"),
+            similarity_matrix(self.vectors),
+        )
+        self.assertIsInstance(matrix, np.memmap)
+        del matrix
+
+    def test_zero_vectors_are_dissimilar_to_everything(self):
+        np.testing.assert_array_equal(
+            similarities(np.zeros(12), self.vectors[:3]), np.zeros(3)
+        )
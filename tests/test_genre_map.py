@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from mmmusic.genre_map import GenreMap
+from mmmusic.models.genre_attributes import GenreAttributes
+
+
+class TestGenreMap(unittest.TestCase):
+    def setUp(self):
+        self.genre_map = GenreMap(
+            ["a", "b", "c", "d", "e"],
+            np.array(
+                [
+                    [0.0, 0.0],
+                    [10.0, 0.0],
+                    [4.0, 1.0],
+                    [6.0, -4.0],
+                    [0.0, 20.0],
+                ]
+            ),
+        )
+
+    def test_position(self):
+        self.assertEqual(self.genre_map.position("c"), GenreAttributes(4.0, 1.0))
+        self.assertEqual(self.genre_map.position((1, 2)), GenreAttributes(1, 2))
+
+    def test_nearest(self):
+        self.assertEqual(self.genre_map.nearest("a"), [("a", 0.0)])
+        self.assertEqual(
+            [genre for genre, _ in self.genre_map.nearest((5.0, 0.0), k=3)],
+            ["c", "d", "b"],
+        )
+        self.assertEqual(len(self.genre_map.nearest("a", k=10)), 5)
+
+    def test_within(self):
+        self.assertEqual(self.genre_map.within("a", 7.5), ["a", "c", "d"])
+        self.assertEqual(self.genre_map.within((0.0, 10.0), 1.0), [])
+
+    def test_between(self):
+        self.assertEqual(self.genre_map.between("a", "b"), ["a", "c", "d", "b"])
+        self.assertEqual(self.genre_map.between("b", "a"), ["b", "d", "c", "a"])
+        self.assertEqual(self.genre_map.between("a", "b", width=2.0), ["a", "c", "b"])
+        self.assertEqual(self.genre_map.between("a", "a"), ["a"])
@@ -0,0 +1,246 @@
+import re
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from mmmusic.genres import (
+    GenreCooccurrence,
+    GenreIndex,
+    artists_of_genres_matching_pattern,
+    genre_overlaps,
+    genres_matching_pattern,
+    get_artist_genres,
+    get_genre_attributes_for_track,
+    get_genre_attributes_for_tracks,
+)
+from mmmusic.models.artists import Artist
+from mmmusic.models.genre_attributes import (
+    get_default_genre_attributes,
+    get_genre_attributes,
+)
+from mmmusic.models.tracks import Track
+
+
+def _fake_artist(i: int, *genres: str) -> Artist:
+    return Artist(name=f"Artist {i}", id=f"artist_{i}", genres=genres, popularity=50)
+
+
+def _fake_track(i: int, *artists: Artist) -> Track:
+    return Track(
+        name=f"Track {i}",
+        id=f"track_{i}",
+        album_id="album",
+        artist_ids=tuple(artist.id for artist in artists),
+        popularity=50,
+    )
+
+
+class TestGenreIndex(unittest.TestCase):
+    def setUp(self):
+        self.artists = [
+            _fake_artist(0, "jazz", "jazz fusion"),
+            _fake_artist(1, "indie rock"),
+            _fake_artist(2, "acid jazz", "rock"),
+            _fake_artist(3),
+        ]
+
+        self.tracks = [
+            _fake_track(0, self.artists[0]),
+            _fake_track(1, self.artists[1], self.artists[2]),
+            _fake_track(2, self.artists[3]),
+            _fake_track(3, self.artists[1]),
+        ]
+
+    def test_matches(self):
+        index = GenreIndex(self.artists)
+
+        self.assertEqual(
+            index.vocabulary, {"jazz", "jazz fusion", "indie rock", "acid jazz", "rock"}
+        )
+        self.assertEqual(index.genres_matching(".*jazz"), {"jazz", "acid jazz"})
+        self.assertEqual(
+            index.artists_matching(".*jazz"), {self.artists[0], self.artists[2]}
+        )
+        self.assertTrue(index.any_artist_matches(["artist_1", "artist_2"], "rock"))
+        self.assertFalse(index.any_artist_matches(["artist_1", "artist_3"], "rock"))
+
+    def test_matches_vocabulary_once_per_pattern(self):
+        index = GenreIndex(self.artists)
+
+        with patch.object(re, "compile", wraps=re.compile) as mock_compile:
+            for _ in range(3):
+                index.genres_matching(".*rock")
+                index.artist_ids_matching(".*rock")
+
+        mock_compile.assert_called_once_with(".*rock")
+
+    def test_extends_cached_matches(self):
+        index = GenreIndex(self.artists[:2])
+
+        self.assertEqual(index.artist_ids_matching(".*jazz"), {"artist_0"})
+
+        index.add_artists(self.artists)
+
+        self.assertEqual(index.genres_matching(".*jazz"), {"jazz", "acid jazz"})
+        self.assertEqual(index.artist_ids_matching(".*jazz"), {"artist_0", "artist_2"})
+
+    @patch("mmmusic.genres.get_artists")
+    def test_tracks(self, mock_get_artists):
+        artists_by_id = {artist.id: artist for artist in self.artists}
+
+        mock_get_artists.side_effect = lambda artist_ids: tuple(
+            artists_by_id[artist_id] for artist_id in artist_ids
+        )
+
+        index = GenreIndex(tracks=self.tracks[:2])
+        index.add_tracks(self.tracks)
+
+        self.assertEqual(
+            index.tracks_matching(".*rock"), {self.tracks[1], self.tracks[3]}
+        )
+        self.assertEqual(index.tracks_matching("jazz"), {self.tracks[0]})
+
+        # Artists are fetched in batches, and only once.
+        self.assertEqual(
+            [list(call.args[0]) for call in mock_get_artists.call_args_list],
+            [["artist_0", "artist_1", "artist_2"], ["artist_3"]],
+        )
+
+    def test_functions_accept_index(self):
+        index = GenreIndex(self.artists)
+
+        for artists in (self.artists, index):
+            with self.subTest(artists=type(artists).__name__):
+                self.assertEqual(
+                    genres_matching_pattern("rock", artists=artists), {"rock"}
+                )
+                self.assertEqual(
+                    artists_of_genres_matching_pattern(".* rock", artists=artists),
+                    {self.artists[1]},
+                )
+
+
+@patch("mmmusic.genres.get_artists")
+class TestGenreAttributes(unittest.TestCase):
+    def setUp(self):
+        get_artist_genres.cache_clear()
+
+        self.artists = {
+            artist.id: artist
+            for artist in [
+                _fake_artist(0, "jazz", "rock"),
+                _fake_artist(1, "rock", "funk", "not a genre"),
+                _fake_artist(2, "not a genre"),
+                _fake_artist(3),
+            ]
+        }
+
+        artists = list(self.artists.values())
+
+        self.tracks = [
+            _fake_track(0, artists[0]),
+            _fake_track(1, artists[0], artists[1]),
+            _fake_track(2, artists[2]),
+            _fake_track(3, artists[3], artists[2]),
+            _fake_track(4, artists[2], artists[1]),
+        ]
+
+    def tearDown(self):
+        get_artist_genres.cache_clear()
+
+    def _get_artists(self, artist_ids):
+        return tuple(self.artists[artist_id] for artist_id in artist_ids)
+
+    def test_means_of_tracks_genres(self, mock_get_artists):
+        mock_get_artists.side_effect = self._get_artists
+
+        positions = get_genre_attributes()
+
+        expected = [
+            np.mean([positions["jazz"], positions["rock"]], axis=0),
+            np.mean([positions["jazz"], positions["rock"], positions["funk"]], axis=0),
+            get_default_genre_attributes(),
+            get_default_genre_attributes(),
+            np.mean([positions["rock"], positions["funk"]], axis=0),
+        ]
+
+        np.testing.assert_allclose(
+            get_genre_attributes_for_tracks(self.tracks), expected
+        )
+
+        for track, attributes in zip(self.tracks, expected, strict=True):
+            np.testing.assert_allclose(
+                get_genre_attributes_for_track(track), attributes
+            )
+
+    def test_fetches_each_artist_once(self, mock_get_artists):
+        mock_get_artists.side_effect = self._get_artists
+
+        get_genre_attributes_for_track(self.tracks[0])
+        get_genre_attributes_for_tracks(self.tracks)
+        get_genre_attributes_for_tracks(self.tracks)
+
+        self.assertEqual(
+            [list(call.args[0]) for call in mock_get_artists.call_args_list],
+            [["artist_0"], ["artist_1", "artist_2", "artist_3"]],
+        )
+
+
+class TestGenreCooccurrence(unittest.TestCase):
+    def setUp(self):
+        self.artists = [
+            _fake_artist(0, "jazz", "funk", "soul"),
+            _fake_artist(1, "funk", "soul"),
+            _fake_artist(2, "jazz", "funk"),
+            _fake_artist(3, "rock"),
+            _fake_artist(4),
+        ]
+
+    def test_counts(self):
+        cooccurrence = GenreCooccurrence(self.artists)
+
+        self.assertEqual(cooccurrence.overlap("funk", "soul"), 2)
+        self.assertEqual(cooccurrence.overlap("soul", "funk"), 2)
+        self.assertEqual(cooccurrence.overlap("jazz", "rock"), 0)
+        self.assertEqual(cooccurrence.overlap("jazz", "polka"), 0)
+        self.assertEqual(
+            cooccurrence.overlaps(),
+            {("funk", "jazz"): 2, ("funk", "soul"): 2, ("jazz", "soul"): 1},
+        )
+
+    def test_top_cooccurring(self):
+        cooccurrence = GenreCooccurrence(self.artists)
+
+        self.assertEqual(
+            cooccurrence.top_cooccurring("funk"), [("jazz", 2), ("soul", 2)]
+        )
+        self.assertEqual(cooccurrence.top_cooccurring("soul", k=1), [("funk", 2)])
+        self.assertEqual(cooccurrence.top_cooccurring("rock"), [])
+        self.assertEqual(cooccurrence.top_cooccurring("polka"), [])
+
+    def test_shared_artists(self):
+        cooccurrence = GenreCooccurrence(self.artists)
+
+        self.assertEqual(
+            cooccurrence.shared_artists("funk", "jazz"),
+            {self.artists[0], self.artists[2]},
+        )
+        self.assertEqual(cooccurrence.artists_of("rock"), {self.artists[3]})
+
+    def test_genre_overlaps(self):
+        overlaps = genre_overlaps(self.artists)
+
+        self.assertEqual(
+            set(overlaps),
+            {
+                ("funk", "jazz"),
+                ("jazz", "funk"),
+                ("funk", "soul"),
+                ("soul", "funk"),
+                ("jazz", "soul"),
+                ("soul", "jazz"),
+            },
+        )
+        self.assertEqual(overlaps["soul", "jazz"], {self.artists[0]})
+        self.assertEqual(overlaps["soul", "funk"], {self.artists[0], self.artists[1]})
@@ -0,0 +1,67 @@
+from pathlib import Path
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from mmmusic.models import genre_attributes
+from mmmusic.models.genre_attributes import (
+    GenreAttributes,
+    GenrePositions,
+    save_genre_positions,
+)
+
+
+class TestGenrePositions(unittest.TestCase):
+    def test_arrays_match_json(self):
+        json_genres, json_coordinates = genre_attributes._load_genre_json()
+        genres, coordinates = genre_attributes._load_genre_arrays()
+
+        self.assertEqual(genres, json_genres)
+        np.testing.assert_array_equal(coordinates, json_coordinates)
+
+    def test_saves_and_loads_arrays(self):
+        genre_positions = {
+            "jazz": {"top": 10, "left": 20},
+            "rock": {"top": 30, "left": 40},
+            "música mexicana": {"top": 50, "left": 60},
+        }
+
+        with tempfile.TemporaryDirectory() as directory:
+            directory = Path(directory)
+
+            with (
+                patch.object(
+                    genre_attributes,
+                    "_genre_positions_file_path",
+                    directory / "genre_positions.json",
+                ),
+                patch.object(
+                    genre_attributes,
+                    "_genre_names_file_path",
+                    directory / "genre_names.txt",
+                ),
+                patch.object(
+                    genre_attributes,
+                    "_genre_coordinates_file_path",
+                    directory / "genre_coordinates.npy",
+                ),
+            ):
+                save_genre_positions(genre_positions)
+
+                genres, coordinates = genre_attributes._load_genre_arrays()
+
+                self.assertEqual(genres, list(genre_positions))
+                self.assertEqual(coordinates.dtype, np.int32)
+                self.assertFalse(coordinates.flags.writeable)
+
+                positions = GenrePositions(
+                    {genre: i for i, genre in enumerate(genres)}, coordinates
+                )
+
+                self.assertEqual(positions["rock"], GenreAttributes(top=30, left=40))
+                self.assertEqual(list(positions), list(genre_positions))
+
+                # NOTE: The memory map must be closed before its file is removed.
+                del coordinates, positions
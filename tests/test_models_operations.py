@@ -1,6 +1,14 @@
 import unittest
 
-from mmmusic.models.operations import combinable
+import numpy as np
+
+from mmmusic.models.operations import (
+    combinable,
+    combinable_filter,
+    combinable_order,
+    shared_results,
+    take,
+)
 
 
 class TestCombinableOperation(unittest.TestCase):
@@ -80,3 +88,256 @@ class TestCombinableOperation(unittest.TestCase):
 
         # Also check wrap job.
         self.assertEqual(happy.__doc__, "Returns the tracks that are happy.")
+
+    def test_passes_keyword_arguments_through_chains(self):
+        @combinable
+        def rotate(numbers, *, by=0):
+            return numbers[by:] + numbers[:by]
+
+        @combinable
+        def reverse(numbers):
+            return numbers[::-1]
+
+        numbers = [1, 2, 3, 4]
+
+        self.assertEqual((take(3) & rotate)(numbers, by=1), [2, 3, 1])
+        self.assertEqual((reverse & rotate)(numbers, by=1), [3, 2, 1, 4])
+        self.assertEqual((rotate | reverse)(numbers, by=1), [1, 2, 3, 4])
+        self.assertEqual(((rotate & take(2)) | reverse)(numbers, by=2), [1, 2, 3, 4])
+
+        with self.assertRaises(TypeError):
+            reverse(numbers, by=1)
+
+
+class TestPlanning(unittest.TestCase):
+    def setUp(self):
+        self.checked = []
+
+        def checking(name, predicate):
+            def check(number):
+                self.checked.append((name, number))
+
+                return predicate(number)
+
+            return check
+
+        self.is_odd = combinable_filter(display_name="odd", cost=1)(
+            checking("odd", lambda number: number % 2 == 1)
+        )
+        self.is_small = combinable_filter(display_name="small", cost=0.5)(
+            checking("small", lambda number: number < 50)
+        )
+
+    def test_fuses_filters_cheapest_first(self):
+        combined = self.is_odd & self.is_small
+
+        self.assertEqual(str(combined), "odd & small")
+        self.assertEqual(combined.explain(), "1. where small and odd")
+
+        self.assertEqual(combined([3, 60, 4, 61, 7]), [3, 7])
+
+        # Each number is checked in the same pass, and only while it matches.
+        self.assertEqual(
+            self.checked,
+            [
+                ("small", 3),
+                ("odd", 3),
+                ("small", 60),
+                ("small", 4),
+                ("odd", 4),
+                ("small", 61),
+                ("small", 7),
+                ("odd", 7),
+            ],
+        )
+
+    def test_turns_order_and_take_into_top_k(self):
+        @combinable_order(display_name="by last digit", reverse=True)
+        def by_last_digit(numbers):
+            return [number % 10 for number in numbers]
+
+        top_three = self.is_odd & by_last_digit & take(5) & take(3)
+
+        self.assertEqual(top_three.explain(), "1. where odd\n2. top 3 by last digit")
+
+        numbers = [19, 29, 5, 17, 3, 9, 100, 7]
+
+        self.assertEqual(top_three(numbers), [19, 29, 9])
+        self.assertEqual(
+            (by_last_digit & take(3))(numbers),
+            by_last_digit(numbers)[:3],
+        )
+
+    def test_stops_filtering_once_enough_items_match(self):
+        first_two_odds = self.is_odd & take(2)
+
+        self.assertEqual(first_two_odds.explain(), "1. first 2 where odd")
+
+        self.assertEqual(first_two_odds([1, 2, 3, 4, 5]), [1, 3])
+        self.assertEqual(len(self.checked), 3)
+
+    def test_does_not_move_filters_past_other_operations(self):
+        @combinable
+        def halved(numbers):
+            return [number // 2 for number in numbers]
+
+        combined = self.is_odd & halved & self.is_small & take(1)
+
+        self.assertEqual(
+            combined.explain(), "1. where odd\n2. halved\n3. first 1 where small"
+        )
+        self.assertEqual(combined([199, 98, 3, 21]), [1])
+
+    def test_union_of_filters_keeps_input_order(self):
+        odd_or_small = self.is_odd | self.is_small
+
+        self.assertEqual(odd_or_small.explain(), "1. where (odd | small)")
+
+        self.assertEqual(odd_or_small([60, 3, 4, 61, 70]), [3, 4, 61])
+
+        # Numbers that are small (the cheaper check) are not checked for being odd.
+        self.assertEqual(
+            self.checked,
+            [
+                ("small", 60),
+                ("odd", 60),
+                ("small", 3),
+                ("small", 4),
+                ("small", 61),
+                ("odd", 61),
+                ("small", 70),
+                ("odd", 70),
+            ],
+        )
+
+    def test_union_runs_each_operation_once(self):
+        calls = []
+
+        @combinable
+        def reversed_evens(numbers):
+            calls.append("evens")
+
+            return [number for number in reversed(numbers) if number % 2 == 0]
+
+        @combinable
+        def doubled(numbers):
+            calls.append("doubled")
+
+            return [2 * number for number in numbers]
+
+        union = reversed_evens | doubled | self.is_odd
+
+        self.assertEqual(union([1, 2, 3, 4]), [1, 2, 3, 4, 6, 8])
+        self.assertEqual(calls, ["evens", "doubled"])
+
+    def test_shares_results_within_context(self):
+        @combinable_order(display_name="by value")
+        def by_value(numbers):
+            self.checked.append(("by value", len(numbers)))
+
+            return numbers
+
+        def make_config():
+            return (self.is_odd | self.is_small) & by_value
+
+        numbers = [5, 3, 60, 1]
+
+        with shared_results():
+            self.assertEqual(make_config()(numbers), [1, 3, 5])
+            checked = list(self.checked)
+
+            self.assertEqual(make_config()(numbers), [1, 3, 5])
+            self.assertEqual((self.is_small & take(2))(numbers), [5, 3])
+
+        self.assertEqual(self.checked, checked)
+
+        # Results are not shared outside of the context.
+        make_config()(numbers)
+
+        self.assertEqual(self.checked, checked * 2)
+
+    def test_shares_results_of_masks(self):
+        def columns_of(numbers):
+            self.checked.append(("columns", len(numbers)))
+
+            return np.array(numbers)
+
+        def is_even(number):
+            self.checked.append(("even", number))
+
+            return number % 2 == 0
+
+        def make_filter():
+            return combinable_filter(
+                display_name="even",
+                columns=columns_of,
+                mask=lambda numbers: numbers % 2 == 0,
+            )(is_even)
+
+        numbers = [5, 2, 60, 1]
+
+        with shared_results():
+            self.assertEqual(make_filter()(numbers), [2, 60])
+            self.assertEqual(make_filter()(numbers), [2, 60])
+            self.assertEqual((make_filter() | self.is_odd)(numbers), numbers)
+            self.assertEqual(make_filter()(numbers[:2]), [2])
+
+        self.assertEqual(
+            [check for check in self.checked if check[0] in {"columns", "even"}],
+            [("columns", 4)],
+        )
+
+    def test_does_not_share_results_of_different_closures(self):
+        def greater_than(minimum):
+            @combinable_filter(display_name="large")
+            def is_large(number):
+                return number > minimum
+
+            return is_large
+
+        def offset_from(offset):
+            @combinable_order(display_name="by distance")
+            def by_distance(numbers):
+                return [abs(number - offset) for number in numbers]
+
+            return by_distance
+
+        numbers = [5, 10, 1]
+
+        with shared_results():
+            self.assertEqual(greater_than(1)(numbers), [5, 10])
+            self.assertEqual(greater_than(7)(numbers), [10])
+            self.assertEqual(greater_than(1)(numbers), [5, 10])
+
+            self.assertEqual(offset_from(0)(numbers), [1, 5, 10])
+            self.assertEqual(offset_from(10)(numbers), [10, 5, 1])
+
+    def test_does_not_share_results_of_methods_of_different_instances(self):
+        class AtLeast:
+            def __init__(self, minimum):
+                self.minimum = minimum
+
+            def is_enough(self, number):
+                return number >= self.minimum
+
+        numbers = [5, 10, 1]
+
+        with shared_results():
+            for minimum, expected in ((5, [5, 10]), (10, [10]), (5, [5, 10])):
+                is_enough = combinable_filter(display_name="enough")(
+                    AtLeast(minimum).is_enough
+                )
+
+                self.assertEqual(is_enough(numbers), expected)
+
+    def test_does_not_share_results_of_unhashable_closures(self):
+        def one_of(values):
+            @combinable_filter(display_name="in values")
+            def is_in_values(number):
+                return number in values
+
+            return is_in_values
+
+        with shared_results():
+            self.assertEqual(one_of([1, 2])([1, 2, 3]), [1, 2])
+            self.assertEqual(one_of([3])([1, 2, 3]), [3])
@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import patch
 
-from mmmusic.models.tracks import Track, get_track
+from mmmusic.models.tracks import Track, get_track, get_tracks, get_tracks_from_json
 
 
 class TestArtist(unittest.TestCase):
@@ -47,3 +47,61 @@ class TestArtist(unittest.TestCase):
         mock_spotify.get_track.assert_not_called()
 
         self.assertIs(track, fake_track)
+
+    @patch("mmmusic.models.tracks.spotify", autospec=True)
+    def test_get_tracks(self, mock_spotify):
+        fake_track = Track(
+            name="fake_name",
+            id="fake_track_id_for_get_tracks",
+            album_id="fake_album_id",
+            artist_ids=("fake_artist_id",),
+            popularity=50,
+        )
+
+        mock_spotify.get_track.return_value = {
+            "name": "other_fake_name",
+            "id": "other_fake_track_id",
+            "album": {"id": "fake_album_id"},
+            "artists": [{"id": "fake_artist_id"}],
+            "popularity": 10,
+        }
+
+        tracks = get_tracks([fake_track, "other_fake_track_id"])
+
+        mock_spotify.get_tracks.assert_called_once()
+        self.assertEqual(
+            list(mock_spotify.get_tracks.call_args.args[0]), ["other_fake_track_id"]
+        )
+
+        self.assertIs(tracks[0], fake_track)
+        self.assertEqual(tracks[1].id, "other_fake_track_id")
+
+    @patch("mmmusic.models.tracks.spotify", autospec=True)
+    def test_get_tracks_from_json_caches_full_track_objects(self, mock_spotify):
+        full_track_json = {
+            "name": "fake_name",
+            "id": "fake_full_track_id",
+            "album": {"id": "fake_album_id"},
+            "artists": [{"id": "fake_artist_id"}],
+            "popularity": 50,
+        }
+        simplified_track_json = {
+            "name": "fake_name",
+            "id": "fake_simplified_track_id",
+            "artists": [{"id": "fake_artist_id"}],
+        }
+
+        mock_spotify.get_track.side_effect = lambda track_id: {
+            **full_track_json,
+            "id": track_id,
+        }
+
+        tracks = get_tracks_from_json([full_track_json, simplified_track_json])
+
+        self.assertEqual(
+            list(mock_spotify.cache_tracks.call_args.args[0]), [full_track_json]
+        )
+        self.assertEqual(
+            [track.id for track in tracks],
+            ["fake_full_track_id", "fake_simplified_track_id"],
+        )
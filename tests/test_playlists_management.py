@@ -0,0 +1,233 @@
+from pathlib import Path
+import random
+import tempfile
+from types import SimpleNamespace
+import unittest
+from unittest.mock import patch
+
+from mmmusic.models.tracks import Track
+from mmmusic.playlists.management import (
+    plan_playlist_edits,
+    replace_playlist,
+    reshuffle_playlist,
+)
+
+
+class FakeSpotify:
+    """Holds one playlist, and applies (and counts) the write requests made to it."""
+
+    def __init__(self, track_ids):
+        self.track_ids = list(track_ids)
+        self.write_requests = 0
+
+    def playlist_items(self, playlist_id, fields=None, limit=50, offset=0):
+        return {
+            "total": len(self.track_ids),
+            "items": [
+                {"track": {"id": track_id}}
+                for track_id in self.track_ids[offset : offset + limit]
+            ],
+        }
+
+    def user_playlist_add_tracks(self, user, playlist_id, tracks, position=None):
+        self._check_batch(tracks)
+
+        if position is None:
+            position = len(self.track_ids)
+
+        self.track_ids[position:position] = tracks
+
+    def user_playlist_remove_all_occurrences_of_tracks(self, user, playlist_id, tracks):
+        self._check_batch(tracks)
+
+        self.track_ids = [
+            track_id for track_id in self.track_ids if track_id not in tracks
+        ]
+
+    def user_playlist_reorder_tracks(
+        self, user, playlist_id, range_start, insert_before, range_length=1
+    ):
+        self.write_requests += 1
+
+        moved = self.track_ids[range_start : range_start + range_length]
+        before = [
+            track_id
+            for position, track_id in enumerate(self.track_ids[:insert_before])
+            if not range_start <= position < range_start + range_length
+        ]
+        after = [
+            track_id
+            for position, track_id in enumerate(
+                self.track_ids[insert_before:], insert_before
+            )
+            if not range_start <= position < range_start + range_length
+        ]
+
+        self.track_ids = before + moved + after
+
+    def user_playlist_replace_tracks(self, user, playlist_id, tracks):
+        self._check_batch(tracks)
+
+        self.track_ids = list(tracks)
+
+    def _check_batch(self, tracks):
+        if len(tracks) > 100:
+            raise ValueError("Too many tracks")
+
+        self.write_requests += 1
+
+
+def _fake_user(track_ids) -> SimpleNamespace:
+    return SimpleNamespace(sp=FakeSpotify(track_ids), username="fake_user")
+
+
+class TestReplacePlaylist(unittest.TestCase):
+    def setUp(self):
+        self.track_ids = [f"track_{i}" for i in range(1_000)]
+
+    def test_edits_playlist_that_barely_changed(self):
+        user = _fake_user(self.track_ids)
+
+        new_track_ids = self.track_ids.copy()
+        new_track_ids.remove("track_10")
+        new_track_ids.insert(500, "new_track_0")
+        new_track_ids.insert(0, new_track_ids.pop(900))
+
+        requests_saved = replace_playlist(
+            "playlist", new_tracks=new_track_ids, user=user
+        )
+
+        self.assertEqual(user.sp.track_ids, new_track_ids)
+        self.assertEqual(user.sp.write_requests, 3)
+        self.assertEqual(requests_saved, 10 + 10 - 3)
+
+    def test_replaces_playlist_that_changed_a_lot(self):
+        user = _fake_user(self.track_ids)
+
+        new_track_ids = random.Random(0).sample(self.track_ids, 250)
+
+        requests_saved = replace_playlist(
+            "playlist", new_tracks=new_track_ids, user=user
+        )
+
+        self.assertEqual(user.sp.track_ids, new_track_ids)
+        self.assertEqual(user.sp.write_requests, 3)
+        self.assertEqual(requests_saved, 10 + 3 - 3)
+
+    def test_makes_no_requests_if_unchanged(self):
+        user = _fake_user(self.track_ids)
+
+        replace_playlist("playlist", new_tracks=self.track_ids, user=user)
+
+        self.assertEqual(user.sp.write_requests, 0)
+
+    def test_replaces_playlist_with_local_tracks(self):
+        user = _fake_user([None, *self.track_ids[:5]])
+
+        replace_playlist("playlist", new_tracks=self.track_ids[:5], user=user)
+
+        self.assertEqual(user.sp.track_ids, self.track_ids[:5])
+        self.assertEqual(user.sp.write_requests, 1)
+
+    def test_edits_reach_new_tracks(self):
+        rng = random.Random(0)
+
+        for _ in range(50):
+            current = rng.sample(self.track_ids, rng.randrange(0, 300))
+            new = rng.sample(current, rng.randrange(0, len(current) + 1))
+
+            for i in range(rng.randrange(0, 150)):
+                new.insert(rng.randrange(0, len(new) + 1), f"new_track_{i}")
+
+            edits = plan_playlist_edits(current, new)
+
+            spotify = FakeSpotify(current)
+
+            for to_remove in edits.removals:
+                spotify.user_playlist_remove_all_occurrences_of_tracks(
+                    "fake_user", "playlist", to_remove
+                )
+
+            for range_start, insert_before, range_length in edits.moves:
+                spotify.user_playlist_reorder_tracks(
+                    "fake_user", "playlist", range_start, insert_before, range_length
+                )
+
+            for position, to_add in edits.additions:
+                spotify.user_playlist_add_tracks(
+                    "fake_user", "playlist", to_add, position=position
+                )
+
+            self.assertEqual(spotify.track_ids, new)
+
+    def test_does_not_plan_edits_with_duplicates(self):
+        self.assertIsNone(plan_playlist_edits(["a", "b", "a"], ["a", "b"]))
+        self.assertIsNone(plan_playlist_edits(["a", "b"], ["a", "b", "b"]))
+
+
+def _fake_track(i: int) -> Track:
+    return Track(
+        name=f"fake_name_{i}",
+        id=f"fake_track_id_{i}",
+        album_id="fake_album_id",
+        artist_ids=(f"fake_artist_id_{i % 7}",),
+        popularity=i,
+    )
+
+
+@patch.dict("mmmusic.playlists.management._reshuffle_states", clear=True)
+@patch("mmmusic.playlists.management.replace_playlist", autospec=True)
+@patch("mmmusic.playlists.management.get_tracks_from_playlist", autospec=True)
+@patch("mmmusic.features.get_metrics_for_track", autospec=True)
+class TestReshufflePlaylist(unittest.TestCase):
+    def _assert_scores_only_new_tracks_when_reshuffled_again(
+        self, mock_get_metrics_for_track, mock_get_tracks, mock_replace_playlist
+    ):
+        mock_get_metrics_for_track.side_effect = lambda track: [
+            track.popularity,
+            track.popularity % 5,
+        ]
+
+        tracks = [_fake_track(i) for i in range(50)]
+
+        mock_get_tracks.return_value = tracks[:40]
+        reshuffle_playlist("playlist", new_tracks=tracks[:45], user=None)
+
+        self.assertEqual(mock_get_metrics_for_track.call_count, 45)
+
+        mock_get_metrics_for_track.reset_mock()
+
+        mock_get_tracks.return_value = [
+            track
+            for track in mock_replace_playlist.call_args.kwargs["new_tracks"]
+            if track != tracks[0]
+        ]
+        reshuffle_playlist("playlist", new_tracks=tracks[1:], user=None)
+
+        self.assertCountEqual(
+            [call.args[0] for call in mock_get_metrics_for_track.call_args_list],
+            tracks[45:],
+        )
+        self.assertCountEqual(
+            mock_replace_playlist.call_args.kwargs["new_tracks"], tracks[1:]
+        )
+
+    @patch("mmmusic.playlists.management.get_response_cache", lambda: None)
+    def test_scores_only_new_tracks_when_reshuffled_again(self, *mocks):
+        self._assert_scores_only_new_tracks_when_reshuffled_again(*mocks)
+
+    def test_saves_what_is_kept_of_reshuffled_playlists(self, *mocks):
+        with tempfile.TemporaryDirectory() as directory:
+            with patch(
+                "mmmusic.playlists.management.get_response_cache",
+                lambda: SimpleNamespace(directory=Path(directory)),
+            ):
+                self._assert_scores_only_new_tracks_when_reshuffled_again(*mocks)
+
+            self.assertEqual(
+                sorted(
+                    path.name
+                    for path in Path(directory, "reshuffled_playlists").iterdir()
+                ),
+                ["playlist.index.npz", "playlist.reference.npy"],
+            )
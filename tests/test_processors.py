@@ -0,0 +1,188 @@
+import unittest
+from unittest.mock import patch
+
+from fakes import (
+    fake_album,
+    fake_audio_features,
+    fake_track,
+    patch_track_store_lookups,
+)
+import numpy as np
+
+from mmmusic.genre_map import GenreMap
+from mmmusic.genres import get_genre_index
+from mmmusic.models.artists import Artist
+from mmmusic.models.genre_attributes import GenreAttributes
+from mmmusic.models.operations import combinable_filter
+from mmmusic.models.tracks import Track
+from mmmusic.processors import (
+    filter_by_audio_feature,
+    filter_by_genre_pattern,
+    filter_by_genre_proximity,
+    filter_by_key,
+    filter_by_mode,
+    filter_by_release_year,
+    filter_by_track_attribute,
+)
+from mmmusic.track_store import get_track_store
+
+
+@patch_track_store_lookups()
+@patch("mmmusic.processors.get_album", fake_album)
+@patch("mmmusic.models.tracks.get_track_audio_features", fake_audio_features)
+class TestVectorizedFilters(unittest.TestCase):
+    def setUp(self):
+        get_track_store.cache_clear()
+
+        self.tracks = [fake_track(i) for i in range(12)]
+
+    def tearDown(self):
+        get_track_store.cache_clear()
+
+    def test_masks_match_predicates(self):
+        # NOTE: Tracks without audio features are left out by masks of audio
+        # features, rather than raising errors.
+        audio_feature_filters = [
+            filter_by_audio_feature("energy", lower_bound=0.7),
+            filter_by_audio_feature("tempo", upper_bound=108, inclusive=False),
+            filter_by_key("F"),
+            filter_by_mode("major"),
+        ]
+        other_filters = [
+            filter_by_release_year(1995),
+            filter_by_release_year(end_year=1996),
+            filter_by_track_attribute("popularity", upper_bound=90),
+        ]
+
+        for filters, tracks in (
+            (audio_feature_filters, self.tracks[1:]),
+            (other_filters, self.tracks),
+        ):
+            for filter_ in filters:
+                with self.subTest(filter_=str(filter_)):
+                    predicate = filter_._steps[0].predicate
+
+                    self.assertIn("(vectorized)", filter_.explain())
+                    self.assertEqual(
+                        filter_(self.tracks),
+                        [track for track in tracks if predicate(track)],
+                    )
+
+    def test_combines_masks(self):
+        combined = (
+            filter_by_audio_feature("energy", lower_bound=0.5)
+            & filter_by_mode("major")
+            & filter_by_release_year(1995)
+            & filter_by_track_attribute("popularity", upper_bound=90)
+        )
+
+        self.assertEqual(
+            combined.explain(),
+            "1. where popularity <= 90 and energy >= 0.5 and mode is major and "
+            "released after 1995 (vectorized)",
+        )
+        self.assertEqual(combined(self.tracks), [self.tracks[i] for i in (5, 7, 9)])
+
+    def test_applies_other_filters_to_the_rest(self):
+        checked = []
+
+        @combinable_filter(display_name="not track 7")
+        def is_not_track_7(track: Track) -> bool:
+            checked.append(track)
+
+            return track != self.tracks[7]
+
+        combined = is_not_track_7 & filter_by_mode("major")
+
+        self.assertEqual(
+            combined.explain(), "1. where mode is major (vectorized) and not track 7"
+        )
+        self.assertEqual(
+            combined(self.tracks), [self.tracks[i] for i in (1, 3, 5, 9, 11)]
+        )
+        self.assertEqual(checked, [self.tracks[i] for i in (1, 3, 5, 7, 9, 11)])
+
+
+def _fake_genre_attributes(track: Track) -> GenreAttributes:
+    i = int(track.id.rpartition("_")[2])
+
+    return GenreAttributes(top=float(i), left=float(i % 3))
+
+
+@patch_track_store_lookups(genre_attributes=_fake_genre_attributes)
+@patch("mmmusic.models.tracks.get_track_audio_features", fake_audio_features)
+@patch("mmmusic.processors.get_genre_attributes_for_track", _fake_genre_attributes)
+@patch(
+    "mmmusic.processors.get_genre_map",
+    lambda: GenreMap(["jazz", "rock"], np.array([[4.0, 1.0], [20.0, 20.0]])),
+)
+class TestGenreProximityFilter(unittest.TestCase):
+    def setUp(self):
+        get_track_store.cache_clear()
+
+        self.tracks = [fake_track(i) for i in range(12)]
+
+    def tearDown(self):
+        get_track_store.cache_clear()
+
+    def test_mask_matches_predicate(self):
+        near_jazz = filter_by_genre_proximity("jazz", 2.5)
+
+        predicate = near_jazz._steps[0].predicate
+
+        self.assertEqual(
+            near_jazz.explain(), "1. where genre within 2.5 of 'jazz' (vectorized)"
+        )
+        self.assertEqual(
+            near_jazz(self.tracks), [self.tracks[i] for i in (2, 3, 4, 5, 6)]
+        )
+        self.assertEqual(
+            near_jazz(self.tracks), [track for track in self.tracks if predicate(track)]
+        )
+
+    def test_index_grows_with_store(self):
+        near_jazz = filter_by_genre_proximity("jazz", 2.5)
+
+        self.assertEqual(near_jazz(self.tracks[:5]), self.tracks[2:5])
+        self.assertEqual(near_jazz(self.tracks[::-1]), self.tracks[6:1:-1])
+
+
+@patch("mmmusic.genres.get_artists")
+class TestGenreFilter(unittest.TestCase):
+    def setUp(self):
+        get_genre_index.cache_clear()
+
+        self.artists = {
+            f"fake_artist_id_{i}": Artist(
+                name=f"fake_artist_{i}",
+                id=f"fake_artist_id_{i}",
+                genres=genres,
+                popularity=50,
+            )
+            for i, genres in enumerate([("jazz",), ("acid jazz", "funk"), ()])
+        }
+
+        self.tracks = [fake_track(i % 3) for i in range(6)]
+
+    def tearDown(self):
+        get_genre_index.cache_clear()
+
+    def _get_artists(self, artist_ids):
+        return tuple(self.artists[artist_id] for artist_id in artist_ids)
+
+    def test_filters_by_genre(self, mock_get_artists):
+        mock_get_artists.side_effect = self._get_artists
+
+        jazz = filter_by_genre_pattern(".*jazz")
+
+        self.assertEqual(jazz.explain(), "1. where genre matches '.*jazz' (vectorized)")
+        self.assertEqual(jazz(self.tracks), [self.tracks[i] for i in (0, 1, 3, 4)])
+
+    def test_union_of_genres(self, mock_get_artists):
+        mock_get_artists.side_effect = self._get_artists
+
+        jazz_or_funk = filter_by_genre_pattern("jazz") | filter_by_genre_pattern("funk")
+
+        self.assertEqual(
+            jazz_or_funk(self.tracks), [self.tracks[i] for i in (0, 1, 3, 4)]
+        )
@@ -0,0 +1,403 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from mmmusic import shuffling
+from mmmusic.features import similarity
+from mmmusic.models.operations import take
+from mmmusic.models.tracks import Track
+from mmmusic.shuffling import (
+    _radio_picker,
+    _story_picker,
+    quick_pick,
+    reshuffle,
+    same_artist_adjacency,
+    smart_shuffle,
+    smooth_shuffle,
+    transition_smoothness,
+)
+from mmmusic.similarity_index import SimilarityIndex
+
+
+def _fake_track(i: int, *, artist: int) -> Track:
+    return Track(
+        name=f"Track {i}",
+        id=f"track_{i}",
+        album_id="album",
+        artist_ids=(f"artist_{artist}",),
+        popularity=50,
+    )
+
+
+def _recursive_quick_pick(items, add_to_left, seed_picker=None, left_neighbor=None):
+    """The original, recursive quick_pick."""
+    items = list(items)
+
+    if len(items) < 2:
+        return items
+    shuffling._shuffle(items)
+
+    if seed_picker is None:
+        left_seed, right_seed = items[:2]
+    else:
+        left_seed, right_seed = seed_picker(items, left_neighbor=left_neighbor)
+    left = [left_seed]
+    right = [right_seed]
+
+    items.remove(left_seed)
+    items.remove(right_seed)
+
+    for item in items:
+        if add_to_left(left, right, item, items):
+            left.append(item)
+        else:
+            right.append(item)
+    if left_neighbor is not None and not add_to_left(left, right, left_neighbor, items):
+        left, right = right, left
+    new_left = _recursive_quick_pick(left, add_to_left, seed_picker=seed_picker)
+    new_right = _recursive_quick_pick(
+        right, add_to_left, seed_picker=seed_picker, left_neighbor=new_left[-1]
+    )
+
+    return new_left + new_right
+
+
+def _naive_story_pick(values, left, right, to_add) -> bool:
+    left_values = [values[x] for x in left]
+    right_values = [values[x] for x in right]
+
+    return similarity(
+        np.average([*left_values, values[to_add]], axis=0),
+        np.average(right_values, axis=0),
+    ) < similarity(
+        np.average(left_values, axis=0),
+        np.average([*right_values, values[to_add]], axis=0),
+    )
+
+
+@patch("mmmusic.shuffling.get_scores_for_tracks")
+class TestPickers(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+
+        self.tracks = [_fake_track(i, artist=i % 7) for i in range(300)]
+        self.values = {track: rng.random(12) * 100 for track in self.tracks}
+
+        # NOTE: Pickers are given positions in the tracks.
+        self.positions = list(range(len(self.tracks)))
+        self.position_values = dict(enumerate(self.values.values()))
+
+    def _split(self, picker) -> tuple[list[int], list[int]]:
+        left, right = [0], [1]
+
+        for position in self.positions[2:]:
+            (left if picker(left, right, position, []) else right).append(position)
+
+        return left, right
+
+    def test_story_picker_matches_averages(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.values
+
+        picker = _story_picker(self.tracks)
+
+        left, right = [0], [1]
+
+        for position in self.positions[2:]:
+            expected = _naive_story_pick(self.position_values, left, right, position)
+
+            self.assertEqual(picker(left, right, position, []), expected)
+
+            (left if expected else right).append(position)
+
+    def test_story_picker_handles_new_lists(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.values
+
+        picker = _story_picker(self.tracks)
+
+        self._split(picker)
+
+        left, right = self.positions[10:20], self.positions[20:25]
+
+        self.assertEqual(
+            picker(left, right, 30, []),
+            _naive_story_pick(self.position_values, left, right, 30),
+        )
+
+    def test_radio_picker_separates_artists(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.values
+
+        left, right = self._split(_radio_picker(self.tracks))
+
+        for artist in {artist for track in self.tracks for artist in track.artist_ids}:
+            in_left = sum(artist in self.tracks[i].artist_ids for i in left)
+            in_right = sum(artist in self.tracks[i].artist_ids for i in right)
+
+            self.assertLessEqual(abs(in_left - in_right), 1)
+
+    def test_smart_seed_picker_matches_similarity(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.values
+
+        picker = shuffling._smart_seed_picker(self.tracks)
+
+        items = self.positions[::3]
+
+        def similarity_to(position):
+            return lambda item: similarity(
+                self.position_values[position], self.position_values[item]
+            )
+
+        left_seed = max(items, key=similarity_to(1))
+
+        self.assertEqual(
+            picker(items, left_neighbor=1),
+            (left_seed, min(items, key=similarity_to(left_seed))),
+        )
+        self.assertEqual(
+            picker(items, left_neighbor=None),
+            (items[0], min(items, key=similarity_to(items[0]))),
+        )
+
+
+class TestQuickPick(unittest.TestCase):
+    def _assert_matches_recursive_quick_pick(self, items, add_to_left, **kwargs):
+        with patch.object(shuffling, "_shuffle", np.random.default_rng(0).shuffle):
+            expected = _recursive_quick_pick(items, add_to_left, **kwargs)
+
+        with patch.object(shuffling, "_shuffle", np.random.default_rng(0).shuffle):
+            self.assertEqual(quick_pick(items, add_to_left, **kwargs), expected)
+
+    def test_matches_recursive_quick_pick(self):
+        def add_to_left(left, right, item, items):
+            return (sum(left) - sum(right) + item) % 3 == 0
+
+        def seed_picker(items, left_neighbor):
+            left_seed = items[-1] if left_neighbor is None else min(items)
+
+            others = list(items)
+            others.remove(left_seed)
+
+            return left_seed, max(others)
+
+        for size in (0, 1, 2, 3, 10, 257):
+            items = [i % 40 for i in range(size)]
+
+            with self.subTest(size=size):
+                self._assert_matches_recursive_quick_pick(items, add_to_left)
+                self._assert_matches_recursive_quick_pick(
+                    items, add_to_left, seed_picker=seed_picker
+                )
+                self._assert_matches_recursive_quick_pick(
+                    items, add_to_left, seed_picker=seed_picker, left_neighbor=7
+                )
+
+    @patch("mmmusic.shuffling.get_scores_for_tracks")
+    def test_smart_shuffle_matches_recursive_quick_pick(
+        self, mock_get_scores_for_tracks
+    ):
+        rng = np.random.default_rng(1)
+
+        tracks = [_fake_track(i, artist=i % 11) for i in range(200)]
+        mock_get_scores_for_tracks.return_value = {
+            track: rng.random(12) * 100 for track in tracks
+        }
+
+        positions = range(len(tracks))
+
+        with patch.object(shuffling, "_shuffle", np.random.default_rng(2).shuffle):
+            expected = _recursive_quick_pick(
+                positions,
+                _radio_picker(tracks),
+                seed_picker=shuffling._smart_seed_picker(tracks),
+            )
+
+        with patch.object(shuffling, "_shuffle", np.random.default_rng(2).shuffle):
+            shuffled = smart_shuffle(tracks)
+
+        self.assertEqual(shuffled, [tracks[position] for position in expected])
+
+    def test_rng_makes_order_reproducible(self):
+        def add_to_left(left, right, item, items):
+            return item % 2 == 0
+
+        items = list(range(100))
+
+        with patch.object(shuffling, "_shuffle", np.random.default_rng(5).shuffle):
+            expected = quick_pick(items, add_to_left)
+
+        self.assertEqual(
+            quick_pick(items, add_to_left, rng=np.random.default_rng(5)), expected
+        )
+        self.assertEqual(quick_pick(items, add_to_left, rng=5), expected)
+
+    @patch("mmmusic.shuffling.get_scores_for_tracks")
+    def test_smart_shuffle_is_reproducible(self, mock_get_scores_for_tracks):
+        rng = np.random.default_rng(1)
+
+        tracks = [_fake_track(i, artist=i % 11) for i in range(100)]
+        mock_get_scores_for_tracks.return_value = {
+            track: rng.random(12) * 100 for track in tracks
+        }
+
+        self.assertEqual(smart_shuffle(tracks, rng=7), smart_shuffle(tracks, rng=7))
+        self.assertNotEqual(smart_shuffle(tracks, rng=7), smart_shuffle(tracks, rng=8))
+
+    @patch("mmmusic.shuffling.get_scores_for_tracks")
+    def test_seeded_chain_is_reproducible(self, mock_get_scores_for_tracks):
+        rng = np.random.default_rng(1)
+
+        tracks = [_fake_track(i, artist=i % 11) for i in range(100)]
+        all_scores = {track: rng.random(12) * 100 for track in tracks}
+        mock_get_scores_for_tracks.side_effect = lambda tracks: {
+            track: all_scores[track] for track in tracks
+        }
+
+        chain = take(80) & smart_shuffle
+
+        self.assertEqual(chain(tracks, rng=7), smart_shuffle(tracks[:80], rng=7))
+        self.assertEqual(chain(tracks, rng=7), chain(tracks, rng=7))
+
+
+@patch("mmmusic.shuffling.get_scores_for_tracks")
+class TestSmoothShuffle(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+
+        self.tracks = [_fake_track(i, artist=i % 5) for i in range(400)]
+        self.scores = {track: rng.random(12) * 100 for track in self.tracks}
+
+    def test_shuffles_every_track(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.scores
+
+        shuffled = smooth_shuffle(time_budget=0.1)(self.tracks)
+
+        self.assertCountEqual(shuffled, self.tracks)
+
+    def test_is_smoother_than_smart_shuffle(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.scores
+
+        self.assertGreater(
+            transition_smoothness(smooth_shuffle(time_budget=0.1)(self.tracks)),
+            transition_smoothness(smart_shuffle(self.tracks)),
+        )
+
+    def test_separates_tracks_by_the_same_artist(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.scores
+
+        with patch.object(shuffling, "_shuffle", np.random.default_rng(0).shuffle):
+            shuffled = smooth_shuffle(time_budget=0.1)(self.tracks)
+
+        same_artist_transitions = sum(
+            track.artist_ids == next_track.artist_ids
+            for track, next_track in zip(shuffled, shuffled[1:], strict=False)
+        )
+
+        # NOTE: The last few tracks may be left with no other artists to go between.
+        self.assertLessEqual(same_artist_transitions, 2)
+
+    def test_separates_tracks_by_common_artists(self, mock_get_scores_for_tracks):
+        rng = np.random.default_rng(4)
+
+        # A third of the tracks are by one artist, and a tenth by another, and their
+        # tracks are similar to each other.
+        artists = [0] * 100 + [1] * 30 + list(range(2, 172))
+        centers = rng.random((172, 12)) * 100
+
+        tracks = [_fake_track(i, artist=artist) for i, artist in enumerate(artists)]
+        mock_get_scores_for_tracks.return_value = {
+            track: centers[artist] + rng.normal(0, 1, 12)
+            for track, artist in zip(tracks, artists, strict=True)
+        }
+
+        shuffled = smooth_shuffle(time_budget=0.1)(tracks, rng=0)
+
+        self.assertCountEqual(shuffled, tracks)
+        self.assertEqual(same_artist_adjacency(shuffled), 0.0)
+
+    def test_transition_smoothness(self, mock_get_scores_for_tracks):
+        a, b, c = self.tracks[:3]
+
+        mock_get_scores_for_tracks.return_value = {
+            a: np.array([1.0, 0.0]),
+            b: np.array([1.0, 1.0]),
+            c: np.array([0.0, 2.0]),
+        }
+
+        self.assertAlmostEqual(transition_smoothness([a, b, c]), np.sqrt(0.5))
+
+    def test_same_artist_adjacency(self, mock_get_scores_for_tracks):
+        a, b, c, d = (_fake_track(i, artist=artist) for i, artist in enumerate("xxyy"))
+
+        self.assertEqual(same_artist_adjacency([a, b, c, d]), 2 / 3)
+        self.assertEqual(same_artist_adjacency([a, c, b, d]), 0.0)
+
+
+@patch("mmmusic.shuffling.get_scores_for_tracks")
+class TestReshuffle(unittest.TestCase):
+    def setUp(self):
+        self.tracks = [_fake_track(i, artist=i) for i in range(6)]
+
+        # Tracks lie on a quarter circle, so neighbors in angle are most similar.
+        self.scores = {
+            track: np.array([np.cos(angle), np.sin(angle)])
+            for track, angle in zip(
+                self.tracks, np.linspace(0, np.pi / 2, len(self.tracks)), strict=True
+            )
+        }
+
+    def test_drops_removed_tracks(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.scores
+
+        previous = self.tracks[::-1]
+
+        self.assertEqual(
+            reshuffle(previous, removed=[self.tracks[2]]),
+            [track for track in previous if track != self.tracks[2]],
+        )
+
+    def test_inserts_added_tracks_where_they_fit(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.return_value = self.scores
+
+        a, b, c, d, e, f = self.tracks
+
+        self.assertEqual(
+            reshuffle([a, b, d, e, f], added=[c], removed=[]), [a, b, c, d, e, f]
+        )
+        self.assertEqual(
+            reshuffle([f, e, d, b], added=[a], removed=[]), [f, e, d, b, a]
+        )
+
+    def test_keeps_tracks_by_the_same_artist_apart(self, mock_get_scores_for_tracks):
+        a, b, c, d, e, f = self.tracks
+
+        same_artist_as_c = _fake_track(6, artist=2)
+
+        mock_get_scores_for_tracks.return_value = {
+            **self.scores,
+            same_artist_as_c: self.scores[c],
+        }
+
+        reshuffled = reshuffle([a, b, c, d, e, f], added=[same_artist_as_c])
+
+        position = reshuffled.index(same_artist_as_c)
+
+        self.assertNotIn(c, reshuffled[position - 1 : position + 2])
+
+    def test_updates_index(self, mock_get_scores_for_tracks):
+        mock_get_scores_for_tracks.side_effect = lambda tracks, reference: {
+            track: self.scores[track] for track in tracks
+        }
+
+        a, b, c, d, e, f = self.tracks
+
+        index = SimilarityIndex(
+            {track.id: self.scores[track] for track in (a, b, e, f)}
+        )
+
+        self.assertEqual(
+            reshuffle([a, b, e, f], added=[c, d], removed=[e], index=index),
+            [a, b, c, d, f],
+        )
+
+        mock_get_scores_for_tracks.assert_called_once_with([c, d], reference=None)
+        self.assertCountEqual(index, [a.id, b.id, c.id, d.id, f.id])
@@ -0,0 +1,133 @@
+from pathlib import Path
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from mmmusic.features import similarity
+from mmmusic.similarity_index import SimilarityIndex
+
+
+class TestSimilarityIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+
+        self.vectors = {f"item_{i}": rng.random(5) * 100 for i in range(200)}
+
+    def test_top_k_matches_full_sort(self):
+        index = SimilarityIndex(self.vectors)
+
+        seed = "item_7"
+
+        expected = sorted(
+            self.vectors,
+            key=lambda item: similarity(self.vectors[item], self.vectors[seed]),
+            reverse=True,
+        )[:10]
+
+        self.assertEqual(index.top_k([seed], 10), expected)
+
+    def test_top_k_of_candidates(self):
+        index = SimilarityIndex(self.vectors)
+
+        candidates = ["item_3", "item_1", "item_4", "item_1"]
+
+        top = index.top_k(["item_0"], 3, candidates)
+
+        self.assertEqual(len(top), 3)
+        self.assertLessEqual(set(top), set(candidates))
+        self.assertEqual(index.top_k(["item_0"], 10, candidates).count("item_1"), 2)
+
+    def test_ties_keep_candidate_order(self):
+        index = SimilarityIndex({"a": [1, 0], "b": [2, 0], "c": [0, 1], "d": [3, 0]})
+
+        self.assertEqual(index.top_k(["a"], 2, ["c", "d", "b", "a"]), ["d", "b"])
+
+    def test_multiple_seeds(self):
+        index = SimilarityIndex({"x": [1, 0], "y": [0, 1], "xy": [1, 1], "z": [-1, 0]})
+
+        self.assertEqual(index.top_k(["x", "y"], 1), ["xy"])
+
+    def test_add(self):
+        items = list(self.vectors)
+
+        index = SimilarityIndex({item: self.vectors[item] for item in items[:50]})
+        index.add({item: self.vectors[item] for item in items[50:]})
+
+        self.assertEqual(len(index), 200)
+        self.assertEqual(
+            index.top_k(["item_7"], 10),
+            SimilarityIndex(self.vectors).top_k(["item_7"], 10),
+        )
+
+    def test_remove(self):
+        index = SimilarityIndex(self.vectors)
+        index.remove(["item_7", "item_199", "missing"])
+
+        self.assertEqual(len(index), 198)
+        self.assertNotIn("item_7", index)
+        self.assertCountEqual(index, set(self.vectors) - {"item_7", "item_199"})
+        self.assertEqual(
+            index.top_k(["item_3"], 10),
+            SimilarityIndex(
+                {
+                    item: vector
+                    for item, vector in self.vectors.items()
+                    if item not in {"item_7", "item_199"}
+                }
+            ).top_k(["item_3"], 10),
+        )
+
+
+class TestNearest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+
+        # Items lie around 50 centers, in groups of similar items.
+        centers = rng.normal(size=(50, 8))
+
+        self.vectors = {
+            f"item_{i}": centers[i % 50] + rng.normal(0, 0.1, 8) for i in range(2_000)
+        }
+
+    def test_nearest_mostly_matches_top_k(self):
+        index = SimilarityIndex(self.vectors)
+
+        found = 0
+
+        for item in list(self.vectors)[:100]:
+            found += len(set(index.nearest(item, 10)) & set(index.top_k([item], 10)))
+
+        self.assertGreater(found / 1_000, 0.95)
+
+    def test_nearest_finds_added_items(self):
+        items = list(self.vectors)
+
+        index = SimilarityIndex({item: self.vectors[item] for item in items[:1_500]})
+        index.cluster()
+        index.add({"copy": self.vectors["item_0"]})
+
+        self.assertEqual(set(index.nearest("item_0", 2)), {"item_0", "copy"})
+
+        index.remove(["copy"])
+
+        self.assertNotIn("copy", index.nearest("item_0", 10))
+
+    def test_save_and_load(self):
+        index = SimilarityIndex(self.vectors)
+        index.cluster()
+        index.add({"new": self.vectors["item_3"]})
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "index.npz"
+
+            index.save(path)
+
+            with patch.object(SimilarityIndex, "cluster") as mock_cluster:
+                loaded = SimilarityIndex.load(path)
+
+                self.assertEqual(list(loaded), list(index))
+                self.assertEqual(loaded.nearest("new", 5), index.nearest("new", 5))
+
+                mock_cluster.assert_not_called()
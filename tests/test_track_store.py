@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+
+from fakes import fake_album, fake_track, patch_track_store_lookups
+import numpy as np
+
+from mmmusic.track_store import MISSING_INTEGER, TrackStore
+
+
+@patch_track_store_lookups()
+class TestTrackStore(unittest.TestCase):
+    def test_columns(self):
+        tracks = [fake_track(i) for i in range(4)]
+
+        store = TrackStore(tracks)
+
+        self.assertEqual(len(store), 4)
+        self.assertEqual(list(store), tracks)
+
+        self.assertEqual(store["key"].dtype, np.int8)
+        self.assertEqual(store["key"].tolist(), [MISSING_INTEGER, 1, 2, 3])
+        self.assertTrue(np.isnan(store["energy"][0]))
+        self.assertEqual(store["popularity"].tolist(), [0, 10, 20, 30])
+        self.assertEqual(store["release_year"].tolist(), [1990, 1991, 1992, 1993])
+        self.assertEqual(store["genre_top"].tolist(), [1.0] * 4)
+        self.assertEqual(store.has_audio_features.tolist(), [False, True, True, True])
+
+        with self.assertRaises(ValueError):
+            store["key"][0] = 5
+
+    def test_fetches_only_columns_that_are_read(self):
+        tracks = [fake_track(i) for i in range(4)]
+
+        store = TrackStore(tracks[:2])
+        store.add(tracks[2:])
+
+        with (
+            patch("mmmusic.track_store.get_albums", autospec=True) as mock_get_albums,
+            patch(
+                "mmmusic.track_store.get_genre_attributes_for_tracks", autospec=True
+            ) as mock_get_genre_attributes_for_tracks,
+        ):
+            self.assertEqual(store["key"].tolist(), [MISSING_INTEGER, 1, 2, 3])
+            self.assertEqual(
+                store.has_audio_features.tolist(), [False, True, True, True]
+            )
+            self.assertEqual(store["popularity"].tolist(), [0, 10, 20, 30])
+
+            mock_get_albums.assert_not_called()
+
+            mock_get_albums.side_effect = lambda album_ids: tuple(
+                map(fake_album, album_ids)
+            )
+
+            self.assertEqual(store["release_year"].tolist(), [1990, 1991, 1992, 1993])
+
+            store.add([fake_track(4)])
+
+            self.assertEqual(store["release_year"].tolist()[-1], 1994)
+            self.assertEqual(mock_get_albums.call_count, 2)
+
+            mock_get_genre_attributes_for_tracks.assert_not_called()
+
+    def test_rows(self):
+        tracks = [fake_track(i) for i in range(4)]
+
+        store = TrackStore(tracks[:2])
+        store.add(tracks[1:])
+
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.rows_of(tracks[::-1]).tolist(), [3, 2, 1, 0])
+        self.assertEqual(store.row_of("fake_track_id_2"), 2)
+        self.assertEqual(store.rows_of(["fake_track_id_2", tracks[0]]).tolist(), [2, 0])
+        self.assertEqual(store.tracks_at([2, 0]), [tracks[2], tracks[0]])
+        self.assertIn(tracks[3], store)
+        self.assertNotIn(fake_track(4), store)
+
+    def test_matrix(self):
+        store = TrackStore([fake_track(i) for i in range(1, 4)])
+
+        matrix = store.matrix(["key", "tempo"], rows=np.array([2, 0]))
+
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_array_equal(matrix, [[3, 103], [1, 101]])